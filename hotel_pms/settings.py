@@ -177,6 +177,75 @@ LOGGING = {
 }
 
 
+# Availability Configuration
+# Seconds before the in-memory stay index (pms/availability.py) is reloaded
+# to pick up bookings written by other worker processes
+PMS_STAY_INDEX_TTL = int(os.getenv('PMS_STAY_INDEX_TTL', '60'))
+# Nights covered by the per-room availability bitmaps used for flexible-date search
+PMS_AVAILABILITY_HORIZON_DAYS = int(os.getenv('PMS_AVAILABILITY_HORIZON_DAYS', '730'))
+
+# Dashboard Configuration
+# Seconds a dashboard snapshot (pms/dashboard.py) is cached; writes invalidate it sooner
+PMS_DASHBOARD_CACHE_TTL = int(os.getenv('PMS_DASHBOARD_CACHE_TTL', '30'))
+
+# Caches
+# Report results, forecast models and dashboard snapshots are cached in the
+# default cache. The local-memory default is private to each process; with
+# several gunicorn workers set a shared backend, e.g.
+# DJANGO_CACHE_BACKEND=django.core.cache.backends.redis.RedisCache with
+# DJANGO_CACHE_LOCATION=redis://127.0.0.1:6379, or
+# django.core.cache.backends.db.DatabaseCache with a table name as the
+# location (create it with `manage.py createcachetable`)
+CACHES = {
+    'default': {
+        'BACKEND': os.getenv('DJANGO_CACHE_BACKEND', 'django.core.cache.backends.locmem.LocMemCache'),
+        'LOCATION': os.getenv('DJANGO_CACHE_LOCATION', ''),
+    }
+}
+
+# Report Cache
+# Report results (pms/report_cache.py) are cached per report and parameters;
+# writes expire the entries covering their dates. Entries ending before today
+# live PMS_REPORT_CACHE_TTL seconds, the others PMS_REPORT_CACHE_LIVE_TTL
+# (all of them with a per-process cache, which misses other workers' writes)
+PMS_REPORT_CACHE_ENABLED = os.getenv('PMS_REPORT_CACHE_ENABLED', 'True').lower() in ['true', '1']
+PMS_REPORT_CACHE_TTL = int(os.getenv('PMS_REPORT_CACHE_TTL', '604800'))
+PMS_REPORT_CACHE_LIVE_TTL = int(os.getenv('PMS_REPORT_CACHE_LIVE_TTL', '600'))
+
+# Background Report Jobs
+# Report windows of at least this many days are queued as ReportJob rows and
+# computed by `manage.py run_report_worker` instead of in the web request
+PMS_REPORT_JOB_MIN_DAYS = int(os.getenv('PMS_REPORT_JOB_MIN_DAYS', '500'))
+# Seconds a finished job is reused for an identical request
+PMS_REPORT_JOB_REUSE = int(os.getenv('PMS_REPORT_JOB_REUSE', '600'))
+# Seconds after which a running job is considered abandoned by its worker
+PMS_REPORT_JOB_TIMEOUT = int(os.getenv('PMS_REPORT_JOB_TIMEOUT', '1800'))
+
+# Forecasting
+# Days of ledger history the forecast models (pms/forecasting.py) are fitted
+# on; closed days are folded into the cached models as they pass and the
+# smoothing parameters are searched again every PMS_FORECAST_REFIT_DAYS days
+PMS_FORECAST_HISTORY_DAYS = int(os.getenv('PMS_FORECAST_HISTORY_DAYS', '730'))
+PMS_FORECAST_REFIT_DAYS = int(os.getenv('PMS_FORECAST_REFIT_DAYS', '28'))
+
+# Live Status Events
+# Pages subscribe to the /api/events/ stream only when this is on. Each open
+# stream holds a connection for as long as the page is open, which a sync
+# (WSGI) worker cannot afford: turn it on only when serving through ASGI.
+# Off, the dashboard polls its ETag'd JSON API instead
+PMS_LIVE_EVENTS = os.getenv('PMS_LIVE_EVENTS', 'False').lower() in ['true', '1']
+# Broker class fanning out /api/events/ (pms/events.py); the default only
+# reaches clients connected to the same process
+PMS_EVENT_BROKER = os.getenv('PMS_EVENT_BROKER', 'pms.events.InProcessBroker')
+# Seconds between keep-alive comments on idle event streams
+PMS_EVENT_KEEPALIVE = int(os.getenv('PMS_EVENT_KEEPALIVE', '15'))
+
+# API Responses
+# JSON bodies at least this large (pms/responses.py) are gzipped for clients
+# that accept it; 0 turns compression off
+PMS_JSON_GZIP_MIN_BYTES = int(os.getenv('PMS_JSON_GZIP_MIN_BYTES', '2048'))
+
+
 # IoT Configuration for Production
 # Note: ESP32 IP addresses are configured per room in the database
 # These are only default/fallback values for new ESP32 configurations
@@ -26,8 +26,10 @@ class ESP32Device(models.Model):
     def __str__(self):
         return f"ESP32 - Room {self.room.room_number} ({self.ip_address})"
     
-    def send_command(self, endpoint, data=None):
-        """Send command to ESP32 device with optional basic authentication"""
+    def send_command(self, endpoint, data=None, save=True):
+        """Send command to ESP32 device with optional basic authentication.
+        With save=False the online state is only set on the instance, for callers
+        that send several commands and save the device once."""
         try:
             url = f"http://{self.ip_address}/{endpoint}"
             
@@ -42,14 +44,16 @@ class ESP32Device(models.Model):
             if response.status_code == 200:
                 self.is_online = True
                 self.last_seen = timezone.now()
-                self.save(update_fields=['is_online', 'last_seen'])
+                if save:
+                    self.save(update_fields=['is_online', 'last_seen'])
                 return True, response.json() if response.content else {}
             else:
                 return False, {"error": f"HTTP {response.status_code}"}
                 
         except requests.exceptions.RequestException as e:
             self.is_online = False
-            self.save(update_fields=['is_online'])
+            if save:
+                self.save(update_fields=['is_online'])
             return False, {"error": str(e)}
     
     def get_status(self):
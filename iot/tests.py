@@ -1,3 +1,92 @@
-from django.test import TestCase
+import json
+from unittest import mock
 
-# Create your tests here.
+from pms.models import Room
+from pms.tests import QueryBudgetTestCase
+
+from .models import ESP32Configuration, ESP32Device, DeviceLog, RoomControls
+
+
+class FakeDeviceResponse:
+    """Stands in for the ESP32's HTTP reply; tests never reach the network."""
+    status_code = 200
+    content = b'{}'
+
+    def json(self):
+        return {}
+
+
+class IotQueryBudgetTests(QueryBudgetTestCase):
+    budgets = {
+        'iot:room_access': (0, 1),
+        'iot:legacy_room_access': (0, 1),
+        'iot:smart_room_access': (0, 1),
+        'iot:smart_room_control_room': (4, 1),
+        'iot:smart_room_config': (4, 1),
+        'iot:room_control': (4, 1),
+        'iot:esp32_configuration': (3, 1),
+        'iot:device_states': (5, 1),
+        # Room, controls, device, device state, log entry, controls save
+        'iot:control_device': (6, 1),
+        # Was one device save and one log insert per preset command
+        'iot:apply_preset': (6, 1),
+    }
+
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        # An occupied room, so the views also look up the in-house guest
+        Room.objects.update_statuses()
+        cls.room = Room.objects.filter(status='occupied').order_by('id').first()
+        # A configured room, so budgets measure steady state rather than first-use get_or_create inserts
+        device = ESP32Device.objects.create(room=cls.room, ip_address='192.168.1.100')
+        ESP32Configuration.objects.create(esp32_device=device)
+        RoomControls.objects.create(room=cls.room)
+
+    def setUp(self):
+        super().setUp()
+        response = FakeDeviceResponse()
+        for method in ('get', 'post'):
+            patcher = mock.patch(f'iot.models.requests.{method}', return_value=response)
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+    def test_every_url_has_a_budget(self):
+        from . import urls
+        self.assertUrlsBudgeted(urls.urlpatterns, namespace=f'{urls.app_name}:')
+
+    def test_pages(self):
+        room = {'room_number': self.room.room_number}
+        requests = [
+            ('iot:room_access', None, (200,)),
+            ('iot:smart_room_access', None, (200,)),
+            ('iot:smart_room_control_room', room, (200,)),
+            ('iot:smart_room_config', room, (200,)),
+            ('iot:device_states', room, (200,)),
+            # The legacy tablet templates are not shipped; only the views' queries are checked
+            ('iot:legacy_room_access', None, None),
+            ('iot:room_control', room, None),
+            ('iot:esp32_configuration', room, None),
+        ]
+        for name, kwargs, status in requests:
+            with self.subTest(url=name):
+                self._reset()
+                self.assertWithinBudget(name, kwargs, status=status)
+
+    def test_control_device(self):
+        response, _ = self.assertWithinBudget(
+            'iot:control_device', {'room_number': self.room.room_number}, method='post',
+            data=json.dumps({'device_type': 'main_light', 'action': 'toggle'}), content_type='application/json'
+        )
+        self.assertTrue(response.json()['success'])
+        self.assertEqual(DeviceLog.objects.filter(room=self.room).count(), 1)
+
+    def test_apply_preset_logs_in_one_insert(self):
+        response, executed = self.assertWithinBudget(
+            'iot:apply_preset', {'room_number': self.room.room_number}, method='post',
+            data=json.dumps({'preset': 'dark'}), content_type='application/json'
+        )
+        self.assertEqual(response.json()['commands_sent'], 4)
+        self.assertEqual(DeviceLog.objects.filter(room=self.room).count(), 4)
+        log_inserts = [sql for sql in executed if sql.startswith('INSERT INTO "iot_devicelog"')]
+        self.assertEqual(len(log_inserts), 1)
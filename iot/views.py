@@ -4,6 +4,7 @@ from django.views.decorators.csrf import csrf_exempt
 from django.views.decorators.http import require_http_methods
 from django.utils import timezone
 from pms.models import Room, Reservation
+from pms.responses import json_response
 from .models import ESP32Device, RoomControls, DeviceLog, ESP32Configuration
 import json
 from django.contrib import messages
@@ -26,7 +27,7 @@ def smart_room_control(request, room_number=None):
         guest_name = "Guest"
         
         if room.status == 'occupied':
-            current_reservation = Reservation.objects.filter(
+            current_reservation = Reservation.objects.select_related('guest').filter(
                 room=room, 
                 status='in_house'
             ).first()
@@ -71,7 +72,7 @@ def room_control(request, room_number):
     guest_name = "Guest"
     
     if room.status == 'occupied':
-        current_reservation = Reservation.objects.filter(
+        current_reservation = Reservation.objects.select_related('guest').filter(
             room=room, 
             status='in_house'
         ).first()
@@ -192,7 +193,7 @@ def control_device(request, room_number):
         if success:
             controls.save()
             
-        return JsonResponse({
+        return json_response({
             'success': success,
             'data': response_data,
             'command': command_sent,
@@ -207,7 +208,7 @@ def control_device(request, room_number):
                 'bedside_light_on': controls.bedside_light_on,
                 'current_preset': controls.current_preset,
             }
-        })
+        }, request)
         
     except Exception as e:
         return JsonResponse({'success': False, 'error': str(e)}, status=400)
@@ -269,24 +270,29 @@ def apply_preset(request, room_number):
             
             success_count = 0
             failed_commands = []
+            logs = []
             
             for endpoint, cmd_data, description in commands:
-                success, response = esp32.send_command(endpoint, cmd_data)
+                success, response = esp32.send_command(endpoint, cmd_data, save=False)
                 
                 # Log each command
-                DeviceLog.objects.create(
+                logs.append(DeviceLog(
                     room=room,
                     command=f"Preset {preset_name.title()}: {description}",
                     success=success,
                     response_data=response if success else None,
                     error_message=response.get('error', '') if not success else ''
-                )
+                ))
                 
                 if success:
                     success_count += 1
                 else:
                     failed_commands.append(description)
             
+            # One write for the device's online state and one for all log entries
+            esp32.save(update_fields=['is_online', 'last_seen'])
+            DeviceLog.objects.bulk_create(logs)
+            
             return JsonResponse({
                 'success': success_count == len(commands),
                 'preset': preset_name,
@@ -323,7 +329,7 @@ def get_device_states(request, room_number):
     # Get live status from ESP32 (optional)
     live_status = esp32.get_status()
     
-    return JsonResponse({
+    return json_response({
         'room_number': room.room_number,
         'room_type': room.get_room_type_display(),
         'controls': {
@@ -345,9 +351,9 @@ def get_device_states(request, room_number):
             'current_preset': controls.current_preset,
         },
         'esp32_online': esp32.is_online,
-        'esp32_last_seen': esp32.last_seen.isoformat() if esp32.last_seen else None,
+        'esp32_last_seen': esp32.last_seen,
         'live_status': live_status
-    })
+    }, request)
 
 
 def esp32_configuration(request, room_number):
@@ -0,0 +1,370 @@
+"""Room availability and booking conflict checks.
+
+``stay_index`` is a process-local index of active stays, kept sorted per
+room and updated from reservation signals (see pms/signals.py). It answers
+"is room R free for [a, b)" with a binary search, so the booking form's
+AJAX checks do not hit the database on every date change.
+
+``availability_calendar`` keeps one bitmap per room over a rolling horizon
+for flexible-date searches and inventory counts.
+
+Both structures can lag behind writes made by other processes, so anything
+that commits a booking must verify with ``overlapping_reservations``, which
+always asks the database.
+"""
+import bisect
+import threading
+import time
+from datetime import date, timedelta
+
+from django.conf import settings
+
+from .models import Room, Reservation
+
+# Statuses that block a room for new bookings
+ACTIVE_STATUSES = ['confirmed', 'expected_arrival', 'in_house']
+
+
+def overlapping_reservations(room, check_in, check_out, exclude_pk=None):
+    """Active reservations of ``room`` overlapping [check_in, check_out), from the database."""
+    overlapping = Reservation.objects.filter(
+        room=room,
+        check_in__lt=check_out,
+        check_out__gt=check_in,
+        status__in=ACTIVE_STATUSES
+    )
+    if exclude_pk:
+        overlapping = overlapping.exclude(pk=exclude_pk)
+    return overlapping
+
+
+class StayIndex:
+    """Active stays per room, sorted by check-in.
+
+    For every room the index keeps the stays ordered by check-in plus a
+    running maximum of check-out, which makes an overlap test a single
+    ``bisect`` even when legacy data contains overlapping stays. The whole
+    index is reloaded after ``PMS_STAY_INDEX_TTL`` seconds to pick up writes
+    from other processes.
+    """
+
+    def __init__(self, ttl=None):
+        self.ttl = ttl
+        self._lock = threading.RLock()
+        self._stays = None
+        self._locations = {}
+        self._loaded_at = 0
+
+    def _get_ttl(self):
+        if self.ttl is not None:
+            return self.ttl
+        return getattr(settings, 'PMS_STAY_INDEX_TTL', 60)
+
+    @classmethod
+    def from_rows(cls, rows):
+        """A fixed snapshot built from (room_id, check_in, check_out, id) rows."""
+        index = cls(ttl=float('inf'))
+        index._load(rows)
+        return index
+
+    def _load(self, rows=None):
+        stays = {}
+        if rows is None:
+            rows = Reservation.objects.filter(status__in=ACTIVE_STATUSES).values_list('room_id', 'check_in', 'check_out', 'id').iterator()
+        for room_id, check_in, check_out, reservation_id in rows:
+            stays.setdefault(room_id, []).append((check_in, check_out, reservation_id))
+        self._stays = {}
+        self._locations = {}
+        for room_id, room_stays in stays.items():
+            room_stays.sort()
+            self._set_room(room_id, room_stays)
+        self._loaded_at = time.monotonic()
+
+    def _set_room(self, room_id, room_stays):
+        running_end = []
+        latest = None
+        for _, check_out, reservation_id in room_stays:
+            latest = check_out if latest is None or check_out > latest else latest
+            running_end.append(latest)
+            self._locations[reservation_id] = room_id
+        self._stays[room_id] = (room_stays, [stay[0] for stay in room_stays], running_end)
+
+    def _ensure_loaded(self):
+        if self._stays is None or time.monotonic() - self._loaded_at > self._get_ttl():
+            self._load()
+
+    def invalidate(self):
+        """Drop the index; it is reloaded on next use."""
+        with self._lock:
+            self._stays = None
+
+    def update(self, reservation_id, room_id=None, check_in=None, check_out=None, status=None):
+        """Apply one reservation write (or a delete, when only the id is given)."""
+        with self._lock:
+            if self._stays is None:
+                return
+            old_room = self._locations.pop(reservation_id, None)
+            if old_room is not None:
+                room_stays = [stay for stay in self._stays[old_room][0] if stay[2] != reservation_id]
+                self._set_room(old_room, room_stays)
+            if room_id is not None and status in ACTIVE_STATUSES:
+                room_stays = list(self._stays.get(room_id, ((), (), ()))[0])
+                bisect.insort(room_stays, (check_in, check_out, reservation_id))
+                self._set_room(room_id, room_stays)
+
+    def conflicts(self, room_id, check_in, check_out, exclude_pk=None):
+        """Ids of active reservations of a room overlapping [check_in, check_out)."""
+        with self._lock:
+            self._ensure_loaded()
+            room_stays, starts, running_end = self._stays.get(room_id, ((), (), ()))
+            # Stays starting before check_out are candidates; walk back while any may still end after check_in
+            found = []
+            i = bisect.bisect_left(starts, check_out) - 1
+            while i >= 0 and running_end[i] > check_in:
+                stay_in, stay_out, reservation_id = room_stays[i]
+                if stay_out > check_in and reservation_id != exclude_pk:
+                    found.append(reservation_id)
+                i -= 1
+            return found
+
+    def is_free(self, room_id, check_in, check_out, exclude_pk=None):
+        """True when no active stay of the room overlaps [check_in, check_out)."""
+        if exclude_pk is not None:
+            return not self.conflicts(room_id, check_in, check_out, exclude_pk=exclude_pk)
+        with self._lock:
+            self._ensure_loaded()
+            _, starts, running_end = self._stays.get(room_id, ((), (), ()))
+            i = bisect.bisect_left(starts, check_out) - 1
+            return i < 0 or running_end[i] <= check_in
+
+    def free_rooms(self, room_ids, check_in, check_out):
+        """The subset of ``room_ids`` with no active stay overlapping [check_in, check_out)."""
+        return [room_id for room_id in room_ids if self.is_free(room_id, check_in, check_out)]
+
+
+stay_index = StayIndex()
+
+
+def first_conflict(room_id, check_in, check_out, exclude_pk=None):
+    """The lowest-id active reservation overlapping [check_in, check_out), or None.
+
+    The index may still hold stays another process has since deleted,
+    canceled or moved, so its candidates are confirmed in the database; when
+    none still conflicts the index is reloaded and asked once more.
+    """
+    for _ in range(2):
+        conflict_ids = stay_index.conflicts(room_id, check_in, check_out, exclude_pk=exclude_pk)
+        if not conflict_ids:
+            return None
+        reservation = Reservation.objects.select_related('guest').filter(
+            pk__in=conflict_ids,
+            check_in__lt=check_out,
+            check_out__gt=check_in,
+            status__in=ACTIVE_STATUSES
+        ).order_by('pk').first()
+        if reservation is not None:
+            return reservation
+        stay_index.invalidate()
+    return None
+
+
+def search_availability(searches):
+    """Answer many availability searches from one shared load.
+
+    ``searches`` is a list of dicts with ``check_in`` and ``check_out`` dates
+    and optional ``room_type`` and ``guests``. Bookable rooms and every active
+    reservation overlapping the union of the ranges are fetched once (two
+    queries in total) and each search is answered from that snapshot. Returns
+    one list of bookable rooms per search, in the same order.
+    """
+    if not searches:
+        return []
+
+    rooms = list(Room.objects.filter(status='vacant_clean').order_by('id'))
+    window_start = min(search['check_in'] for search in searches)
+    window_end = max(search['check_out'] for search in searches)
+    snapshot = StayIndex.from_rows(Reservation.objects.filter(
+        check_in__lt=window_end,
+        check_out__gt=window_start,
+        status__in=ACTIVE_STATUSES
+    ).values_list('room_id', 'check_in', 'check_out', 'id'))
+
+    results = []
+    for search in searches:
+        room_type = search.get('room_type')
+        guests = search.get('guests') or 1
+        results.append([
+            room for room in rooms
+            if (not room_type or room.room_type == room_type)
+            and room.max_occupancy >= guests
+            and snapshot.is_free(room.id, search['check_in'], search['check_out'])
+        ])
+    return results
+
+
+class AvailabilityCalendar:
+    """One bitmap per room over a rolling horizon, one bit per night.
+
+    Bit ``i`` of a room's bitmap is set when night ``start + i`` is blocked
+    by an active reservation or by maintenance. Python integers serve as the
+    bitsets, so "is there a free N-night run" becomes a handful of shifts and
+    ANDs per room, and inventory counts one ``bit_count()`` per night over
+    the transposed bitsets (one bit per room), instead of a query per
+    candidate window. Rebuilt lazily when invalidated, when the
+    date rolls over, or after ``PMS_STAY_INDEX_TTL`` seconds.
+    """
+
+    # Room statuses that block the room until its maintenance end date
+    BLOCKING_STATUSES = ['maintenance', 'out_of_order', 'out_of_service']
+
+    def __init__(self, horizon_days=None, ttl=None):
+        self.horizon_days = horizon_days
+        self.ttl = ttl
+        self._lock = threading.RLock()
+        self._rooms = None
+        self._night_masks = None
+        self._loaded_at = 0
+
+    def get_horizon_days(self):
+        if self.horizon_days is not None:
+            return self.horizon_days
+        return getattr(settings, 'PMS_AVAILABILITY_HORIZON_DAYS', 730)
+
+    def _get_ttl(self):
+        if self.ttl is not None:
+            return self.ttl
+        return getattr(settings, 'PMS_STAY_INDEX_TTL', 60)
+
+    def _block(self, bitmap, first, last):
+        """Set bits for the nights [first, last), clipped to the horizon."""
+        first = max((first - self.start).days, 0)
+        last = min((last - self.start).days, self.days)
+        if last > first:
+            bitmap |= ((1 << (last - first)) - 1) << first
+        return bitmap
+
+    def _load(self):
+        self.start = date.today()
+        self.days = self.get_horizon_days()
+        self.full_mask = (1 << self.days) - 1
+        end = self.start + timedelta(days=self.days)
+
+        rooms = {}
+        for room in Room.objects.only('id', 'room_number', 'room_type', 'max_occupancy', 'rate', 'status',
+                                      'maintenance_start_date', 'maintenance_end_date'):
+            busy = 0
+            if room.status in self.BLOCKING_STATUSES:
+                until = room.maintenance_end_date + timedelta(days=1) if room.maintenance_end_date else end
+                busy = self._block(busy, self.start, until)
+            if room.maintenance_start_date:
+                until = room.maintenance_end_date + timedelta(days=1) if room.maintenance_end_date else end
+                busy = self._block(busy, room.maintenance_start_date, until)
+            rooms[room.id] = [room, busy]
+
+        stays = Reservation.objects.filter(
+            check_in__lt=end,
+            check_out__gt=self.start,
+            status__in=ACTIVE_STATUSES
+        ).values_list('room_id', 'check_in', 'check_out')
+        for room_id, check_in, check_out in stays.iterator():
+            if room_id in rooms:
+                rooms[room_id][1] = self._block(rooms[room_id][1], check_in, check_out)
+
+        self._rooms = rooms
+        self._night_masks = None
+        self._loaded_at = time.monotonic()
+
+    def _ensure_loaded(self):
+        if (self._rooms is None or self.start != date.today()
+                or time.monotonic() - self._loaded_at > self._get_ttl()):
+            self._load()
+
+    def invalidate(self):
+        """Drop the bitmaps; they are rebuilt on next use."""
+        with self._lock:
+            self._rooms = None
+
+    def _candidates(self, room_type=None, guests=1):
+        return [
+            (room, busy) for room, busy in self._rooms.values()
+            if (not room_type or room.room_type == room_type) and room.max_occupancy >= guests
+        ]
+
+    def flexible_search(self, nights, first_check_in, days, room_type=None, guests=1):
+        """Rooms with ``nights`` consecutive free nights, per possible check-in date.
+
+        Check-in dates run from ``first_check_in`` for ``days`` days. Returns a
+        list of (check_in, [rooms]) for every date with at least one room.
+        """
+        with self._lock:
+            self._ensure_loaded()
+            offset = (first_check_in - self.start).days
+            # Windows must start inside the horizon and end before it runs out
+            first = max(offset, 0)
+            last = min(offset + days, self.days - nights + 1)
+            if nights < 1 or last <= first:
+                return []
+            start_mask = ((1 << (last - first)) - 1) << first
+
+            matches = {}
+            for room, busy in self._candidates(room_type, guests):
+                free = ~busy & self.full_mask
+                # Bit i survives only if nights i .. i + nights - 1 are all free
+                runs = free
+                for shift in range(1, nights):
+                    runs &= free >> shift
+                runs &= start_mask
+                while runs:
+                    low = runs & -runs
+                    matches.setdefault(low.bit_length() - 1, []).append(room)
+                    runs ^= low
+
+            return [
+                (self.start + timedelta(days=i), sorted(matches[i], key=lambda room: room.room_number))
+                for i in sorted(matches)
+            ]
+
+    def _get_night_masks(self):
+        """Per night, a bitset of the rooms (by position in ``_rooms``) blocked that night.
+
+        The transpose of the room bitmaps, built on first use after a load.
+        """
+        if self._night_masks is None:
+            masks = [0] * self.days
+            for position, (_, busy) in enumerate(self._rooms.values()):
+                bit = 1 << position
+                while busy:
+                    low = busy & -busy
+                    masks[low.bit_length() - 1] |= bit
+                    busy ^= low
+            self._night_masks = masks
+        return self._night_masks
+
+    def inventory(self, first_date, days, room_type=None, guests=1):
+        """Free rooms per night for ``days`` nights starting at ``first_date``."""
+        with self._lock:
+            self._ensure_loaded()
+            night_masks = self._get_night_masks()
+            candidates = 0
+            for position, (room, _) in enumerate(self._rooms.values()):
+                if (not room_type or room.room_type == room_type) and room.max_occupancy >= guests:
+                    candidates |= 1 << position
+            total = candidates.bit_count()
+
+            offset = (first_date - self.start).days
+            return [
+                total - (night_masks[i] & candidates).bit_count() if 0 <= i < self.days else None
+                for i in range(offset, offset + days)
+            ]
+
+    def free_for(self, room_id, check_in, check_out):
+        """True when every night of [check_in, check_out) is free for the room."""
+        with self._lock:
+            self._ensure_loaded()
+            entry = self._rooms.get(room_id)
+            if entry is None:
+                return False
+            return not entry[1] & self._block(0, check_in, check_out)
+
+
+availability_calendar = AvailabilityCalendar()
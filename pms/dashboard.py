@@ -0,0 +1,136 @@
+"""Dashboard snapshot service.
+
+Everything the dashboard shows - status counters, occupancy figures and the
+guests listed on each room card - is computed by ``dashboard_snapshot`` with
+a fixed number of queries and cached per business date for
+``PMS_DASHBOARD_CACHE_TTL`` seconds. Reservation and room writes call
+``invalidate_dashboard`` (see pms/signals.py), so the cache only saves work
+between changes. ``dashboard_version`` gives polling clients a cheap token
+that changes with any reservation or room write.
+"""
+import hashlib
+from calendar import monthrange
+from datetime import date, timedelta, timezone as dt_timezone
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import connection
+from django.db.models import Count
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+from .models import Room, Reservation
+from .occupancy import OccupancyMatrix
+
+# Statuses listed on the room cards, in display order, with their icon and label
+ROOM_CARD_STATUSES = [
+    ('in_house', 'bi-person-fill', 'In House'),
+    ('confirmed', 'bi-check-circle', 'Confirmed'),
+    ('expected_arrival', 'bi-box-arrow-in-right', 'Expected Arrival'),
+    ('expected_departure', 'bi-box-arrow-right', 'Expected Departure'),
+]
+
+
+def _cache_key(business_date, version=None):
+    key = f'dashboard_snapshot_{business_date.isoformat()}'
+    return f'{key}_{version}' if version else key
+
+
+def invalidate_dashboard():
+    """Drop the cached snapshot of the current business date."""
+    cache.delete(_cache_key(date.today()))
+
+
+def _as_datetime(value):
+    # SQLite returns raw aggregates as text; stored values are UTC
+    if isinstance(value, str):
+        value = parse_datetime(value)
+    if timezone.is_naive(value):
+        value = timezone.make_aware(value, dt_timezone.utc)
+    return value
+
+
+def dashboard_version(business_date=None):
+    """Version token and last-modified time of the dashboard data.
+
+    Derived from the latest ``updated_at`` and the row counts of Reservation
+    and Room (counts catch deletes), read in one query over indexed columns.
+    Returns (token, last_modified); last_modified is None with no data.
+    """
+    business_date = business_date or date.today()
+    reservations = Reservation._meta.db_table
+    rooms = Room._meta.db_table
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f'SELECT (SELECT MAX(updated_at) FROM {reservations}), (SELECT COUNT(*) FROM {reservations}), '
+            f'(SELECT MAX(updated_at) FROM {rooms}), (SELECT COUNT(*) FROM {rooms})'
+        )
+        reservations_at, reservation_count, rooms_at, room_count = cursor.fetchone()
+
+    stamps = [_as_datetime(value) for value in (reservations_at, rooms_at) if value is not None]
+    raw = f'{business_date.isoformat()}|{reservations_at}|{reservation_count}|{rooms_at}|{room_count}'
+    token = hashlib.md5(raw.encode()).hexdigest()
+    return token, max(stamps) if stamps else None
+
+
+def dashboard_snapshot(business_date=None, version=None):
+    """Dashboard figures for ``business_date`` (default today), cached.
+
+    Passing the ``dashboard_version`` token keys the cache entry by it, so a
+    snapshot cached by another process before a write is never served
+    under the newer token.
+    """
+    business_date = business_date or date.today()
+    key = _cache_key(business_date, version)
+    snapshot = cache.get(key)
+    if snapshot is None:
+        snapshot = build_dashboard_snapshot(business_date)
+        cache.set(key, snapshot, getattr(settings, 'PMS_DASHBOARD_CACHE_TTL', 30))
+    return snapshot
+
+
+def build_dashboard_snapshot(business_date):
+    """Compute the dashboard figures with a constant number of queries:
+    rooms, the occupancy overlap, the status GROUP BY and the room card guests."""
+    today = business_date
+    week_start = today - timedelta(days=today.weekday())
+    week_end = week_start + timedelta(days=6)
+    month_start = date(today.year, today.month, 1)
+    month_end = date(today.year, today.month, monthrange(today.year, today.month)[1])
+
+    rooms = list(Room.objects.all())
+    occupancy = OccupancyMatrix(min(week_start, month_start), max(week_end, month_end), rooms=Room.objects.all())
+
+    # Every counter from one GROUP BY over the status each reservation has today
+    status_counts = {status: 0 for status, _ in Reservation.STATUS_CHOICES}
+    grouped = Reservation.objects.with_effective_status(today).values('effective_status').annotate(
+        total=Count('id')
+    ).order_by()
+    for row in grouped:
+        status_counts[row['effective_status']] = row['total']
+
+    # Guests shown on the room cards
+    guests = {}
+    card_statuses = [status for status, _, _ in ROOM_CARD_STATUSES]
+    card_reservations = Reservation.objects.with_effective_status(today).filter(
+        effective_status__in=card_statuses
+    ).values_list('id', 'room_id', 'guest__name', 'effective_status').order_by('id')
+    for reservation_id, room_id, guest_name, status in card_reservations:
+        guests.setdefault((room_id, status), []).append((reservation_id, guest_name))
+    for room in rooms:
+        room.current_guests = [
+            {'id': reservation_id, 'name': guest_name, 'icon': icon, 'label': label}
+            for status, icon, label in ROOM_CARD_STATUSES
+            for reservation_id, guest_name in guests.get((room.id, status), [])
+        ]
+
+    return {
+        'business_date': today,
+        'rooms': rooms,
+        'status_counts': status_counts,
+        'total_reservations': sum(status_counts.values()),
+        'daily_occupancy': occupancy.occupancy_rate(today, today),
+        'weekly_occupancy': occupancy.occupancy_rate(week_start, week_end),
+        'monthly_occupancy': occupancy.occupancy_rate(month_start, month_end),
+        'monthly_nights_sold': occupancy.occupied_nights(month_start, month_end),
+    }
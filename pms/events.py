@@ -0,0 +1,107 @@
+"""Live reservation and room status events.
+
+Signal handlers (pms/signals.py) publish small JSON events after commit and
+the ``/api/events/`` server-sent event stream fans them out to connected
+dashboards; pages only open it when ``PMS_LIVE_EVENTS`` is on, which needs
+an ASGI server. ``InProcessBroker`` only reaches subscribers of the same
+process, so writes from other workers and from management commands
+(``night_audit``, ``run_report_worker``) never reach them; set
+``PMS_EVENT_BROKER`` to the dotted path of another class with the same
+``publish``/``subscribe``/``unsubscribe`` methods (e.g. one backed by Redis
+pub/sub) for those.
+"""
+import asyncio
+import itertools
+import threading
+import time
+from collections import deque
+
+from django.conf import settings
+from django.utils.module_loading import import_string
+
+
+class Subscription:
+    """One connected client: a bounded queue on the client's event loop."""
+
+    def __init__(self, loop, max_pending):
+        self.loop = loop
+        self.queue = asyncio.Queue(maxsize=max_pending)
+        self.dropped = 0
+
+    def _deliver(self, event):
+        # Runs on the subscriber's loop; a client that stops reading loses its oldest events
+        if self.queue.full():
+            self.queue.get_nowait()
+            self.dropped += 1
+        self.queue.put_nowait(event)
+
+    async def get(self):
+        return await self.queue.get()
+
+
+class InProcessBroker:
+    """Fan-out of events to the subscribers of this process.
+
+    ``publish`` may be called from any thread (signal handlers run in sync
+    code); delivery is handed to each subscriber's loop with
+    ``call_soon_threadsafe``, so idle subscribers cost nothing but a queue.
+    The last ``history`` events are kept so reconnecting clients can resume
+    from ``Last-Event-ID``.
+    """
+
+    def __init__(self, history=256, max_pending=100):
+        self.max_pending = max_pending
+        self._lock = threading.Lock()
+        self._subscribers = set()
+        self._history = deque(maxlen=history)
+        self._ids = itertools.count(1)
+
+    def publish(self, event_type, data):
+        with self._lock:
+            event = {'id': next(self._ids), 'type': event_type, 'data': data, 'time': time.time()}
+            self._history.append(event)
+            subscribers = list(self._subscribers)
+        for subscription in subscribers:
+            try:
+                subscription.loop.call_soon_threadsafe(subscription._deliver, event)
+            except RuntimeError:
+                # Loop already closed; the stream's finally block will unsubscribe it
+                pass
+        return event
+
+    def subscribe(self, last_event_id=None):
+        """Register the running event loop's client; replays history after ``last_event_id``."""
+        subscription = Subscription(asyncio.get_running_loop(), self.max_pending)
+        with self._lock:
+            self._subscribers.add(subscription)
+            missed = [event for event in self._history if last_event_id is not None and event['id'] > last_event_id]
+        for event in missed[-self.max_pending:]:
+            subscription._deliver(event)
+        return subscription
+
+    def unsubscribe(self, subscription):
+        with self._lock:
+            self._subscribers.discard(subscription)
+
+    @property
+    def subscriber_count(self):
+        return len(self._subscribers)
+
+
+_broker = None
+_broker_lock = threading.Lock()
+
+
+def get_broker():
+    """The process-wide broker configured by ``PMS_EVENT_BROKER``."""
+    global _broker
+    if _broker is None:
+        with _broker_lock:
+            if _broker is None:
+                _broker = import_string(getattr(settings, 'PMS_EVENT_BROKER', 'pms.events.InProcessBroker'))()
+    return _broker
+
+
+def publish(event_type, data):
+    """Publish an event to every connected client."""
+    return get_broker().publish(event_type, data)
@@ -0,0 +1,215 @@
+"""Seasonal forecasts of room nights and revenue from the RoomNight ledger.
+
+Daily sold nights and revenue of the last ``PMS_FORECAST_HISTORY_DAYS``
+closed days (one grouped query over the ledger) are fitted with additive
+Holt-Winters models: a damped trend plus a weekly season, with the
+smoothing parameters picked by a grid search on the one-step errors. The
+fitted models are cached. As days close they are folded into the cached
+state without searching the parameters again, which happens every
+``PMS_FORECAST_REFIT_DAYS`` days or when a write touches a closed month
+(see ``data_generations`` in pms/report_cache.py). Edits to closed days of
+the month still in progress reach the models at the next search. A
+forecast is then a few arithmetic steps per projected day.
+"""
+import math
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import Count, Sum
+
+from .models import RoomNight
+from .report_cache import cache_is_shared, data_generations
+
+CACHE_KEY = 'pms_forecast_models'
+
+# Weekly seasonality of daily figures
+PERIOD = 7
+# Trend damping: long horizons level off instead of extrapolating a line
+PHI = 0.98
+# Normal quantile of the 95% prediction interval
+Z_95 = 1.96
+
+ALPHAS = (0.05, 0.1, 0.2, 0.35, 0.5)
+BETAS = (0.01, 0.05, 0.15)
+GAMMAS = (0.05, 0.15, 0.3)
+
+
+class HoltWinters:
+    """Additive Holt-Winters model with a damped trend, updated one observation at a time."""
+
+    def __init__(self, alpha, beta, gamma, level, trend, seasonals):
+        self.alpha = alpha
+        self.beta = beta
+        self.gamma = gamma
+        self.level = level
+        self.trend = trend
+        self.seasonals = list(seasonals)
+        self.observations = 0
+        self.sse = 0.0
+
+    @classmethod
+    def start(cls, series, alpha, beta, gamma, period=PERIOD):
+        """A model with the given parameters, its state initialized from the first two periods of ``series``."""
+        if len(series) < 2 * period:
+            # Too short to separate trend and season: a flat level
+            level = sum(series) / len(series) if series else 0.0
+            return cls(alpha, beta, gamma, level, 0.0, [0.0] * period)
+        level = sum(series[:period]) / period
+        trend = (sum(series[period:2 * period]) / period - level) / period
+        return cls(alpha, beta, gamma, level, trend, [value - level for value in series[:period]])
+
+    @classmethod
+    def fit(cls, series, period=PERIOD):
+        """The model with the smallest one-step squared error on ``series`` over the parameter grid."""
+        grid = [(alpha, beta, gamma) for alpha in ALPHAS for beta in BETAS for gamma in GAMMAS]
+        if len(series) < 2 * period:
+            grid = [(ALPHAS[2], BETAS[0], GAMMAS[0])]
+        best = None
+        for alpha, beta, gamma in grid:
+            model = cls.start(series, alpha, beta, gamma, period)
+            model.update(series)
+            if best is None or model.sse < best.sse:
+                best = model
+        return best
+
+    def update(self, values):
+        """Fold the next observations into the state."""
+        period = len(self.seasonals)
+        for value in values:
+            index = self.observations % period
+            seasonal = self.seasonals[index]
+            damped = PHI * self.trend
+            error = value - (self.level + damped + seasonal)
+            level = self.alpha * (value - seasonal) + (1 - self.alpha) * (self.level + damped)
+            self.trend = self.beta * (level - self.level) + (1 - self.beta) * damped
+            self.level = level
+            self.seasonals[index] = self.gamma * (value - level) + (1 - self.gamma) * seasonal
+            self.observations += 1
+            self.sse += error * error
+
+    @property
+    def sigma(self):
+        """Standard deviation of the one-step errors."""
+        return math.sqrt(self.sse / self.observations) if self.observations else 0.0
+
+    def forecast(self, horizon, z=Z_95):
+        """[(value, low, high)] for the next ``horizon`` observations.
+
+        The interval widens with the horizon by the usual additive
+        Holt-Winters variance, sigma^2 * (1 + sum of c_j^2 for j < h).
+        """
+        period = len(self.seasonals)
+        sigma = self.sigma
+        results = []
+        damped_sum = 0.0
+        variance_sum = 0.0
+        for h in range(1, horizon + 1):
+            damped_sum += PHI ** h
+            value = self.level + damped_sum * self.trend + self.seasonals[(self.observations + h - 1) % period]
+            spread = z * sigma * math.sqrt(1 + variance_sum)
+            results.append((value, value - spread, value + spread))
+            # Coefficient c_h of the next step's variance
+            c = self.alpha * (1 + self.beta * PHI * (1 - PHI ** h) / (1 - PHI))
+            if h % period == 0:
+                c += self.gamma
+            variance_sum += c * c
+        return results
+
+
+def _daily(start_date, end_date):
+    """Sold nights and revenue per day from ``start_date`` to ``end_date``, as float lists."""
+    days = (end_date - start_date).days + 1
+    nights = [0.0] * days
+    revenue = [0.0] * days
+    rows = RoomNight.objects.filter(date__gte=start_date, date__lte=end_date).values_list('date').annotate(
+        nights=Count('id'), revenue=Sum('revenue')
+    ).order_by()
+    for night, count, amount in rows:
+        index = (night - start_date).days
+        nights[index] = float(count)
+        revenue[index] = float(amount or 0)
+    return nights, revenue
+
+
+def _fit(first_date, closed_date):
+    nights, revenue = _daily(first_date, closed_date)
+    # Days before the first sold night would read as a collapse in demand
+    start = next((i for i, count in enumerate(nights) if count), len(nights))
+    return {
+        'first_date': first_date,
+        'fitted_on': closed_date,
+        'fitted_through': closed_date,
+        'nights': HoltWinters.fit(nights[start:]),
+        'revenue': HoltWinters.fit(revenue[start:]),
+    }
+
+
+def history_start(today):
+    """Earliest ledger date the models used on ``today`` can have been fitted from.
+
+    A fit reads ``PMS_FORECAST_HISTORY_DAYS`` days back and is kept for up to
+    ``PMS_FORECAST_REFIT_DAYS`` days, so cached pages built from the models
+    must depend on the whole span.
+    """
+    return today - timedelta(
+        days=getattr(settings, 'PMS_FORECAST_HISTORY_DAYS', 730) + getattr(settings, 'PMS_FORECAST_REFIT_DAYS', 28)
+    )
+
+
+def _closed_months(first_date, closed_date):
+    # The month in progress is written to by every booking; only the months before it are checked
+    return data_generations(first_date, closed_date.replace(day=1) - timedelta(days=1))
+
+
+def ledger_models(today):
+    """The cached {'nights', 'revenue'} models, fitted on the ledger up to the day before ``today``."""
+    closed_date = today - timedelta(days=1)
+    entry = cache.get(CACHE_KEY)
+    if entry is not None and (
+        entry['fitted_through'] > closed_date
+        or (closed_date - entry['fitted_on']).days >= getattr(settings, 'PMS_FORECAST_REFIT_DAYS', 28)
+        or _closed_months(entry['first_date'], entry['fitted_through']) != entry['generations']
+    ):
+        entry = None
+
+    if entry is None:
+        first_date = closed_date - timedelta(days=getattr(settings, 'PMS_FORECAST_HISTORY_DAYS', 730) - 1)
+        # Read before the ledger, so a write made while fitting expires the result
+        generations = _closed_months(first_date, closed_date)
+        entry = _fit(first_date, closed_date)
+    elif entry['fitted_through'] < closed_date:
+        generations = _closed_months(entry['first_date'], closed_date)
+        # Fold in the days closed since the last request with the fitted parameters
+        nights, revenue = _daily(entry['fitted_through'] + timedelta(days=1), closed_date)
+        entry['nights'].update(nights)
+        entry['revenue'].update(revenue)
+        entry['fitted_through'] = closed_date
+    else:
+        return entry
+
+    entry['generations'] = generations
+    # A per-process cache misses other workers' writes: refit after the live report TTL there
+    cache.set(CACHE_KEY, entry, None if cache_is_shared() else getattr(settings, 'PMS_REPORT_CACHE_LIVE_TTL', 600))
+    return entry
+
+
+def ledger_forecast(days, today, rooms=None):
+    """[{date, nights, nights_low, nights_high, revenue, revenue_low, revenue_high}] from ``today`` on.
+
+    Bounds are the 95% prediction interval; nights are capped at ``rooms``.
+    """
+    models = ledger_models(today)
+    capacity = float('inf') if rooms is None else rooms
+    projections = []
+    for offset, (nights, revenue) in enumerate(zip(models['nights'].forecast(days), models['revenue'].forecast(days))):
+        projections.append({
+            'date': today + timedelta(days=offset),
+            'nights': min(max(nights[0], 0), capacity),
+            'nights_low': min(max(nights[1], 0), capacity),
+            'nights_high': min(max(nights[2], 0), capacity),
+            'revenue': max(revenue[0], 0),
+            'revenue_low': max(revenue[1], 0),
+            'revenue_high': max(revenue[2], 0),
+        })
+    return projections
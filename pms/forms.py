@@ -39,6 +39,7 @@ class CheckInGuestForm(forms.ModelForm):
         }
 from django import forms
 from .models import Room, Guest, Reservation, PaymentMethod, Agent
+from .availability import overlapping_reservations
 from django.core.exceptions import ValidationError
 from django.utils import timezone
 from datetime import date
@@ -103,16 +104,9 @@ class ReservationForm(forms.ModelForm):
                 raise ValidationError('Check-out date must be after check-in date')
 
         if room and check_in and check_out:
-            # Check for overlapping reservations
-            active_statuses = ['confirmed', 'in_house', 'expected_arrival']
-            overlapping = Reservation.objects.filter(
-                room=room,
-                check_in__lt=check_out,
-                check_out__gt=check_in,
-                status__in=active_statuses
-            )
-            if self.instance.pk:
-                overlapping = overlapping.exclude(pk=self.instance.pk)
+            # Check for overlapping reservations against the database, not the
+            # in-memory stay index, since this guards the actual write
+            overlapping = overlapping_reservations(room, check_in, check_out, exclude_pk=self.instance.pk)
             if overlapping.exists():
                 raise ValidationError(f"Room {room.room_number} is already booked for the selected dates.")
 
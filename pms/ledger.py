@@ -0,0 +1,123 @@
+"""Materialized RoomNight inventory ledger.
+
+Every reservation in an occupying status owns one RoomNight row per night
+(check-out day excluded) carrying the room, status and prorated revenue.
+Reservation.save() rewrites the rows of the saved reservation and deleting
+a reservation cascades to its rows. ``rebuild_ledger`` regenerates the whole
+table and ``check_ledger`` reports drift between the ledger and Reservation.
+"""
+from datetime import timedelta
+from decimal import Decimal, ROUND_HALF_UP
+
+from django.db import transaction
+
+from .models import Reservation, RoomNight
+from .occupancy import OCCUPIED_STATUSES
+
+CENT = Decimal('0.01')
+
+
+def nightly_revenue(total_amount, nights):
+    """Split a reservation total into per-night amounts that add up exactly.
+
+    Each night gets the rounded average and the last night absorbs the
+    rounding remainder.
+    """
+    if nights <= 0:
+        return []
+    total = Decimal(str(total_amount or 0)).quantize(CENT)
+    share = (total / nights).quantize(CENT, rounding=ROUND_HALF_UP)
+    amounts = [share] * nights
+    amounts[-1] = total - share * (nights - 1)
+    return amounts
+
+
+def build_nights(reservation_id, room_id, check_in, check_out, status, total_amount):
+    """Unsaved RoomNight rows for one reservation."""
+    if status not in OCCUPIED_STATUSES or not check_in or not check_out:
+        return []
+    nights = (check_out - check_in).days
+    return [
+        RoomNight(
+            reservation_id=reservation_id,
+            room_id=room_id,
+            date=check_in + timedelta(days=i),
+            status=status,
+            revenue=amount,
+        )
+        for i, amount in enumerate(nightly_revenue(total_amount, nights))
+    ]
+
+
+def _ledger_fields(reservation):
+    return (reservation.id, reservation.room_id, reservation.check_in,
+            reservation.check_out, reservation.status, reservation.total_amount)
+
+
+def sync_reservation(reservation):
+    """Rewrite the ledger rows of a single reservation."""
+    with transaction.atomic():
+        RoomNight.objects.filter(reservation_id=reservation.pk).delete()
+        RoomNight.objects.bulk_create(build_nights(*_ledger_fields(reservation)))
+
+
+def sync_reservations(reservations, batch_size=1000):
+    """Rewrite the ledger rows of every reservation in a queryset.
+
+    Used after set-based writes (``bulk_create``, ``queryset.update``) that
+    bypass Reservation.save().
+    """
+    rows = reservations.values_list('id', 'room_id', 'check_in', 'check_out', 'status', 'total_amount')
+    with transaction.atomic():
+        RoomNight.objects.filter(reservation__in=reservations.values('id')).delete()
+        batch = []
+        for fields in rows.iterator(chunk_size=batch_size):
+            batch.extend(build_nights(*fields))
+            if len(batch) >= batch_size:
+                RoomNight.objects.bulk_create(batch, batch_size=batch_size)
+                batch = []
+        RoomNight.objects.bulk_create(batch, batch_size=batch_size)
+
+
+def sync_reservation_ids(reservation_ids, chunk_size=500):
+    """Rewrite the ledger rows of the given reservation ids, a chunk at a time
+    to stay below the database's bound-parameter limit."""
+    reservation_ids = list(reservation_ids)
+    with transaction.atomic():
+        for i in range(0, len(reservation_ids), chunk_size):
+            sync_reservations(Reservation.objects.filter(pk__in=reservation_ids[i:i + chunk_size]))
+
+
+def rebuild_ledger(batch_size=1000):
+    """Regenerate the whole ledger from Reservation. Returns the row count."""
+    with transaction.atomic():
+        RoomNight.objects.all().delete()
+        sync_reservations(Reservation.objects.filter(status__in=OCCUPIED_STATUSES), batch_size=batch_size)
+    return RoomNight.objects.count()
+
+
+def check_ledger(batch_size=1000):
+    """Compare the ledger with what Reservation implies.
+
+    Returns a dict with the reservation ids whose rows are ``missing``,
+    ``unexpected`` (rows for reservations that should have none) or
+    ``mismatched`` (wrong dates, room, status or revenue).
+    """
+    expected = {}
+    reservations = Reservation.objects.values_list('id', 'room_id', 'check_in', 'check_out', 'status', 'total_amount')
+    for fields in reservations.iterator(chunk_size=batch_size):
+        nights = build_nights(*fields)
+        if nights:
+            expected[fields[0]] = {(n.room_id, n.date, n.status, n.revenue) for n in nights}
+
+    actual = {}
+    rows = RoomNight.objects.values_list('reservation_id', 'room_id', 'date', 'status', 'revenue')
+    for reservation_id, room_id, night, status, revenue in rows.iterator(chunk_size=batch_size):
+        actual.setdefault(reservation_id, set()).add((room_id, night, status, revenue))
+
+    return {
+        'missing': sorted(set(expected) - set(actual)),
+        'unexpected': sorted(set(actual) - set(expected)),
+        'mismatched': sorted(pk for pk in set(expected) & set(actual) if expected[pk] != actual[pk]),
+    }
+
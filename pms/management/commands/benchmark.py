@@ -0,0 +1,422 @@
+import asyncio
+import json
+import time
+import tracemalloc
+from datetime import date, timedelta
+from unittest import mock
+
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from django.db.models import Q
+from django.http import JsonResponse
+from django.test import RequestFactory, override_settings
+
+from pms.models import Room, Guest, Reservation
+from pms.occupancy import OccupancyMatrix, OCCUPIED_STATUSES
+from pms.seed import seed_hotel, seed_guests
+from pms.events import get_broker
+from pms import responses
+from pms.pagination import ClosestDatePaginator
+from pms.revenue import RevenueSummary
+from pms.search import search_guests, search_reservations, search_index_available
+from pms.trends import BookingTrends, add_months, month_end
+from pms.forecasting import ledger_forecast
+
+
+def legacy_occupied_nights(start_date, end_date, rooms):
+    """The original per-room, per-day exists() loop, kept as a reference."""
+    occupied = 0
+    for current_date in [start_date + timedelta(days=i) for i in range((end_date - start_date).days + 1)]:
+        for room in rooms:
+            if Reservation.objects.filter(
+                room=room,
+                check_in__lte=current_date,
+                check_out__gt=current_date,
+                status__in=OCCUPIED_STATUSES
+            ).exists():
+                occupied += 1
+    return occupied
+
+
+def legacy_daily_revenue(start_date, end_date):
+    """The original revenue_report daily loop: a filtered queryset per day, prorated in Python."""
+    reservations = Reservation.objects.filter(check_in__lte=end_date, check_out__gte=start_date, status__in=OCCUPIED_STATUSES)
+    occupied_nights = 0
+    revenue = 0
+    for current_date in [start_date + timedelta(days=i) for i in range((end_date - start_date).days + 1)]:
+        day_reservations = reservations.filter(check_in__lte=current_date, check_out__gt=current_date)
+        for res in day_reservations:
+            if res.total_amount:
+                nights = (res.check_out - res.check_in).days
+                revenue += res.total_amount / nights if nights > 0 else 0
+        occupied_nights += day_reservations.count()
+    return occupied_nights, revenue
+
+
+def legacy_booking_trends(start_date, end_date, today):
+    """The original forecast_report loops: a queryset per 30-day step back, per quarter and a weekday scan."""
+    historical = Reservation.objects.filter(check_in__range=[start_date, end_date], status__in=OCCUPIED_STATUSES)
+    revenue = 0
+    for i in range(12):
+        month_start = (today.replace(day=1) - timedelta(days=30 * i)).replace(day=1)
+        month_end_date = (month_start + timedelta(days=32)).replace(day=1) - timedelta(days=1)
+        month = Reservation.objects.filter(check_in__range=[month_start, month_end_date], status__in=OCCUPIED_STATUSES)
+        revenue += sum(r.total_amount for r in month)
+        month.count()
+    for months in [[1, 2, 3], [4, 5, 6], [7, 8, 9], [10, 11, 12]]:
+        quarter = historical.filter(check_in__month__in=months)
+        sum(r.total_amount for r in quarter)
+        quarter.count()
+    for i in range(7):
+        sum(r.total_amount for r in historical if r.check_in.weekday() == i)
+    return revenue
+
+
+class Command(BaseCommand):
+    help = 'Benchmark query counts and timings of hot code paths'
+
+    scenarios = ['occupancy', 'events', 'search', 'closest', 'calendar', 'json', 'revenue', 'reports', 'trends', 'forecast']
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            'scenario',
+            choices=self.scenarios,
+            help='Benchmark scenario to run',
+        )
+        parser.add_argument(
+            '--seed-rooms',
+            type=int,
+            default=0,
+            help='Seed this many synthetic rooms first (rolled back afterwards)',
+        )
+        parser.add_argument(
+            '--seed-reservations',
+            type=int,
+            default=5000,
+            help='Number of synthetic reservations to seed (use with --seed-rooms)',
+        )
+        parser.add_argument(
+            '--legacy',
+            action='store_true',
+            help='Also run the legacy implementation for comparison',
+        )
+        parser.add_argument(
+            '--seed-guests',
+            type=int,
+            default=0,
+            help='Seed this many synthetic guests first (rolled back afterwards)',
+        )
+        parser.add_argument(
+            '--subscribers',
+            type=int,
+            default=500,
+            help='Connected event stream clients (events scenario)',
+        )
+        parser.add_argument(
+            '--idle-seconds',
+            type=float,
+            default=5,
+            help='How long to measure idle subscribers (events scenario)',
+        )
+
+    def handle(self, *args, **options):
+        # Run inside a transaction that is always rolled back so seeded data never persists
+        with transaction.atomic():
+            if options['seed_rooms']:
+                self.stdout.write(f"Seeding {options['seed_rooms']} rooms / {options['seed_reservations']} reservations...")
+                seed_hotel(rooms=options['seed_rooms'], reservations=options['seed_reservations'])
+            if options['seed_guests']:
+                self.stdout.write(f"Seeding {options['seed_guests']} guests...")
+                seed_guests(options['seed_guests'])
+            getattr(self, f"run_{options['scenario']}")(**options)
+            transaction.set_rollback(True)
+
+    def measure(self, func, *args, **kwargs):
+        # Count with an execute wrapper; the debug query log is capped at 9000 entries
+        executed = []
+
+        def counter(execute, sql, params, many, context):
+            executed.append(sql)
+            return execute(sql, params, many, context)
+
+        with connection.execute_wrapper(counter):
+            started = time.perf_counter()
+            result = func(*args, **kwargs)
+            elapsed = (time.perf_counter() - started) * 1000
+        return result, len(executed), elapsed
+
+    def report(self, label, queries, elapsed, extra=''):
+        self.stdout.write(f"  {label:<28} {queries:>7} queries {elapsed:>10.1f} ms  {extra}")
+
+    def run_occupancy(self, legacy=False, **options):
+        rooms = Room.objects.all()
+        room_count = rooms.count()
+        today = date.today()
+        self.stdout.write(self.style.SUCCESS(f'Occupancy engine ({room_count} rooms)'))
+
+        for days in [7, 31, 90, 365]:
+            start_date = today - timedelta(days=days // 2)
+            end_date = start_date + timedelta(days=days - 1)
+            self.stdout.write(f"{days} days ({room_count * days} room-days):")
+
+            matrix, queries, elapsed = self.measure(OccupancyMatrix, start_date, end_date, rooms)
+            nights = matrix.occupied_nights()
+            self.report('matrix', queries, elapsed, f'{nights} occupied nights')
+
+            if legacy:
+                legacy_nights, queries, elapsed = self.measure(legacy_occupied_nights, start_date, end_date, list(rooms))
+                self.report('legacy exists() loop', queries, elapsed, f'{legacy_nights} occupied nights')
+                if legacy_nights != nights:
+                    self.stdout.write(self.style.ERROR('  Mismatch between matrix and legacy results!'))
+
+    def run_events(self, subscribers=500, idle_seconds=5, **options):
+        # Measured as deployed under ASGI, with the stream enabled
+        with override_settings(PMS_LIVE_EVENTS=True):
+            asyncio.run(self.events_load(subscribers, idle_seconds))
+
+    async def events_load(self, subscribers, idle_seconds, events=10):
+        from pms.views import status_events
+
+        self.stdout.write(self.style.SUCCESS(f'Status event stream ({subscribers} subscribers)'))
+        broker = get_broker()
+        factory = RequestFactory()
+        received = [0]
+
+        async def client():
+            response = await status_events(factory.get('/api/events/'))
+            async for chunk in response.streaming_content:
+                if chunk.startswith(b'id:'):
+                    received[0] += 1
+
+        tracemalloc.start()
+        memory_before = tracemalloc.get_traced_memory()[0]
+        started = time.perf_counter()
+        tasks = [asyncio.create_task(client()) for _ in range(subscribers)]
+        while broker.subscriber_count < subscribers:
+            await asyncio.sleep(0.01)
+        connect_ms = (time.perf_counter() - started) * 1000
+        memory_kb = (tracemalloc.get_traced_memory()[0] - memory_before) / 1024
+        tracemalloc.stop()
+        self.stdout.write(f'  connect                      {connect_ms:>10.1f} ms  {memory_kb / subscribers:.1f} KiB per subscriber')
+
+        cpu_started = time.process_time()
+        await asyncio.sleep(idle_seconds)
+        cpu = time.process_time() - cpu_started
+        self.stdout.write(f'  idle {idle_seconds:g}s                      {cpu * 1000:>10.1f} ms CPU  ({cpu / idle_seconds * 100:.2f}% of one core)')
+
+        # Publish from another thread, as signal handlers do
+        started = time.perf_counter()
+        for i in range(events):
+            await asyncio.to_thread(broker.publish, 'reservation_status', {'ids': [i], 'status': 'confirmed'})
+        while received[0] < subscribers * events:
+            await asyncio.sleep(0.001)
+        fanout_ms = (time.perf_counter() - started) * 1000
+        self.stdout.write(f'  fan-out {events} events            {fanout_ms:>10.1f} ms  {subscribers * events} deliveries')
+
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        if broker.subscriber_count:
+            self.stdout.write(self.style.ERROR(f'  {broker.subscriber_count} subscriptions leaked'))
+
+    def run_search(self, legacy=False, **options):
+        guest_count = Guest.objects.count()
+        index = 'FTS5 trigram index' if search_index_available() else 'no index (icontains fallback)'
+        self.stdout.write(self.style.SUCCESS(f'Guest search ({guest_count} guests, {index})'))
+
+        for term in ['Santoso', 'yuki.tan', 'Hana Kim 4', '812 55', 'S0001', 'zzzz']:
+            self.stdout.write(f"'{term}':")
+            guests, queries, elapsed = self.measure(lambda: list(search_guests(Guest.objects.all(), term).values_list('id', flat=True)[:50]))
+            self.report('guests (first 50)', queries, elapsed, f'{len(guests)} rows')
+            count, queries, elapsed = self.measure(lambda: search_guests(Guest.objects.all(), term).count())
+            self.report('guests (count)', queries, elapsed, f'{count} matches')
+            reservations, queries, elapsed = self.measure(lambda: list(search_reservations(Reservation.objects.all(), term).values_list('id', flat=True)[:50]))
+            self.report('reservations (first 50)', queries, elapsed, f'{len(reservations)} rows')
+
+            if legacy:
+                legacy_count, queries, elapsed = self.measure(lambda: Guest.objects.filter(
+                    Q(name__icontains=term) | Q(email__icontains=term) | Q(phone__icontains=term)
+                ).count())
+                self.report('icontains (count)', queries, elapsed, f'{legacy_count} matches')
+                if legacy_count != count:
+                    self.stdout.write(self.style.ERROR('  Mismatch between index and icontains results!'))
+
+    def run_closest(self, legacy=False, **options):
+        reservations = Reservation.objects.select_related('guest', 'room', 'payment_method')
+        today = date.today()
+        self.stdout.write(self.style.SUCCESS(f'Closest-to-today ordering ({reservations.count()} reservations)'))
+
+        paginator = ClosestDatePaginator(reservations, 'check_in', page_size=50, anchor=today)
+        page, queries, elapsed = self.measure(paginator.page)
+        self.report('first page (merged ranges)', queries, elapsed, f'{len(page)} rows')
+        for _ in range(19):
+            if page.has_next:
+                page = paginator.page(page.next_cursor)
+        if page.has_next:
+            page, queries, elapsed = self.measure(paginator.page, page.next_cursor)
+            self.report('21st page (merged ranges)', queries, elapsed, f'{len(page)} rows')
+
+        if legacy:
+            ordered = reservations.extra(
+                select={'date_diff': "ABS(JULIANDAY(date(check_in)) - JULIANDAY(date('%s')))" % today},
+                order_by=['date_diff']
+            )
+            for label, offset in [('first page', 0), ('21st page', 1000)]:
+                rows, queries, elapsed = self.measure(lambda: list(ordered[offset:offset + 51]))
+                self.report(f'{label} (JULIANDAY sort)', queries, elapsed, f'{len(rows[:50])} rows')
+
+    def run_calendar(self, legacy=False, **options):
+        from django.utils import timezone
+        from pms.views import calendar_data, _calendar_event
+
+        factory = RequestFactory()
+        today = date.today()
+        month_start = date(today.year, today.month, 1)
+        self.stdout.write(self.style.SUCCESS(f'Calendar feed ({Reservation.objects.count()} reservations)'))
+
+        for label, days in [('week window', 7), ('month window', 42), ('quarter window', 91)]:
+            request = factory.get('/calendar/data/', {
+                'start': (month_start - timedelta(days=6)).isoformat(),
+                'end': (month_start - timedelta(days=6) + timedelta(days=days)).isoformat(),
+            })
+            response, queries, elapsed = self.measure(calendar_data, request)
+            self.report(label, queries, elapsed, f'{len(response.content) / 1024:.1f} KiB')
+
+        # Room timeline over a quarter: one object per stay vs columnar arrays
+        quarter = {'start': month_start.isoformat(), 'end': (month_start + timedelta(days=90)).isoformat()}
+        for label, params in [('90-day events', quarter), ('90-day timeline', {**quarter, 'layout': 'timeline'})]:
+            response, queries, elapsed = self.measure(calendar_data, factory.get('/calendar/data/', params))
+            self.report(label, queries, elapsed, f'{len(response.content) / 1024:.1f} KiB')
+
+        request = factory.get('/calendar/data/', {
+            'start': (month_start - timedelta(days=6)).isoformat(),
+            'end': (month_start + timedelta(days=36)).isoformat(),
+            'since': timezone.now().isoformat(),
+        })
+        response, queries, elapsed = self.measure(calendar_data, request)
+        self.report('since poll (no changes)', queries, elapsed, f'{len(response.content)} bytes')
+
+        if legacy:
+            def full_feed():
+                return [_calendar_event({
+                    'id': reservation.id, 'check_in': reservation.check_in, 'check_out': reservation.check_out,
+                    'status': reservation.status, 'guest__name': reservation.guest.name,
+                    'room__room_number': reservation.room.room_number,
+                }) for reservation in Reservation.objects.all()]
+            events, queries, elapsed = self.measure(full_feed)
+            self.report('legacy full history', queries, elapsed, f'{len(events)} events')
+
+    def best_of(self, func, repeat=20):
+        # Encoding microbenchmarks: the fastest of several runs, in ms
+        timings = []
+        for _ in range(repeat):
+            started = time.perf_counter()
+            func()
+            timings.append((time.perf_counter() - started) * 1000)
+        return min(timings)
+
+    def run_json(self, **options):
+        from pms.views import calendar_data, guest_list_json, check_available_rooms
+        from iot.views import control_device, get_device_states
+
+        factory = RequestFactory()
+        today = date.today()
+        room = Room.objects.order_by('room_number').first()
+        window = {'start': today.isoformat(), 'end': (today + timedelta(days=90)).isoformat()}
+        endpoints = [
+            ('calendar_data', calendar_data, lambda: factory.get('/calendar/data/', window)),
+            ('calendar_data timeline', calendar_data, lambda: factory.get('/calendar/data/', {**window, 'layout': 'timeline'})),
+            ('guest_list_json', guest_list_json, lambda: factory.get('/guests/json/')),
+            ('check_available_rooms', check_available_rooms, lambda: factory.get('/check-available-rooms/', {
+                'check_in': today.isoformat(), 'check_out': (today + timedelta(days=2)).isoformat(),
+            })),
+            ('get_device_states', lambda request: get_device_states(request, room.room_number),
+             lambda: factory.get('/iot/states/')),
+            ('control_device', lambda request: control_device(request, room.room_number),
+             lambda: factory.post('/iot/control/', json.dumps({'device_type': 'main_light', 'action': 'toggle'}),
+                                  content_type='application/json')),
+        ]
+        encoder = 'orjson' if responses.orjson is not None else 'stdlib (orjson not installed)'
+        self.stdout.write(self.style.SUCCESS(f'JSON responses (encoder: {encoder})'))
+
+        # The ESP32 endpoints talk to the device; answer for it so only the view is measured
+        device = mock.Mock(status_code=200, content=b'{}', json=lambda: {})
+        with mock.patch('iot.models.requests.get', return_value=device), \
+                mock.patch('iot.models.requests.post', return_value=device):
+            for label, view, make_request in endpoints:
+                self.stdout.write(f'{label}:')
+                response, queries, elapsed = self.measure(view, make_request())
+                payload = json.loads(response.content)
+                self.report('view', queries, elapsed, f'{len(response.content) / 1024:.1f} KiB')
+
+                request = make_request()
+                request.META['HTTP_ACCEPT_ENCODING'] = 'gzip'
+                response, queries, elapsed = self.measure(view, request)
+                self.report('view, gzip', queries, elapsed, f'{len(response.content) / 1024:.1f} KiB')
+
+                # Encoding only, on the endpoint's own payload
+                legacy = self.best_of(lambda: JsonResponse(payload, safe=False))
+                fast = self.best_of(lambda: responses.dumps(payload))
+                with mock.patch('pms.responses.orjson', None):
+                    fallback = self.best_of(lambda: responses.dumps(payload))
+                self.report('encode JsonResponse', 0, legacy)
+                self.report('encode json_response', 0, fast, f'{legacy / fast:.1f}x')
+                self.report('encode stdlib fallback', 0, fallback, f'{legacy / fallback:.1f}x')
+
+    def run_revenue(self, legacy=False, **options):
+        today = date.today()
+        self.stdout.write(self.style.SUCCESS(f'Revenue report ({Reservation.objects.count()} reservations)'))
+        for days in [31, 90, 365]:
+            start_date = today - timedelta(days=days // 2)
+            end_date = start_date + timedelta(days=days - 1)
+            summary, queries, elapsed = self.measure(RevenueSummary, start_date, end_date)
+            self.report(f'{days} days ledger', queries, elapsed, f'{summary.occupied_nights} nights, {summary.total_revenue:,.0f}')
+            if legacy:
+                (nights, revenue), queries, elapsed = self.measure(legacy_daily_revenue, start_date, end_date)
+                self.report(f'{days} days legacy loop', queries, elapsed, f'{nights} nights, {revenue:,.0f}')
+
+    def run_reports(self, **options):
+        from django.core.cache import cache
+        from django.test import Client
+        from django.urls import reverse
+        from pms.report_cache import REPORTS
+
+        client = Client()
+        cache.clear()
+        self.stdout.write(self.style.SUCCESS(f'Report cache ({Reservation.objects.count()} reservations)'))
+        for name, title in REPORTS:
+            response, queries, elapsed = self.measure(client.get, reverse(name))
+            self.report(f'{title} (miss)', queries, elapsed)
+            response, queries, elapsed = self.measure(client.get, reverse(name))
+            self.report(f'{title} (hit)', queries, elapsed)
+
+    def run_trends(self, legacy=False, **options):
+        today = date.today()
+        current_month = today.replace(day=1)
+        self.stdout.write(self.style.SUCCESS(f'Forecast trends ({Reservation.objects.count()} reservations)'))
+        for days in [365, 730, 1095]:
+            start_date = today - timedelta(days=days)
+
+            def fold():
+                trends = BookingTrends(min(start_date, add_months(current_month, -11)), month_end(current_month))
+                trends.quarterly(start_date, today)
+                trends.by_weekday(start_date, today)
+                return sum(totals['revenue'] for _, totals in trends.monthly(current_month, 12))
+
+            revenue, queries, elapsed = self.measure(fold)
+            self.report(f'{days} days history', queries, elapsed, f'12 months {revenue:,.0f}')
+            if legacy:
+                revenue, queries, elapsed = self.measure(legacy_booking_trends, start_date, today, today)
+                self.report(f'{days} days legacy loops', queries, elapsed, f'12 months {revenue:,.0f}')
+
+    def run_forecast(self, **options):
+        from django.core.cache import cache
+
+        today = date.today()
+        rooms = Room.objects.count()
+        cache.clear()
+        self.stdout.write(self.style.SUCCESS(f'Ledger forecast ({Reservation.objects.count()} reservations)'))
+        for label, day in [('fit', today), ('cached', today), ('next day', today + timedelta(days=1))]:
+            projections, queries, elapsed = self.measure(ledger_forecast, 365, day, rooms)
+            nights = sum(projection['nights'] for projection in projections)
+            self.report(f'365 days, {label}', queries, elapsed, f'{nights:,.0f} nights')
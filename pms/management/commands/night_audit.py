@@ -0,0 +1,48 @@
+from datetime import date
+
+from django.core.management.base import BaseCommand, CommandError
+from pms.night_audit import run_night_audit
+
+
+class Command(BaseCommand):
+    help = 'Apply no-show, expected arrival and expected departure transitions for a business date'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--date',
+            help='Business date to audit (YYYY-MM-DD, default today)',
+        )
+        parser.add_argument(
+            '--dry-run',
+            action='store_true',
+            help='Report what would change without writing anything',
+        )
+        parser.add_argument(
+            '--no-notify',
+            action='store_true',
+            help='Do not send email notifications for the transitions',
+        )
+
+    def handle(self, *args, **options):
+        business_date = date.today()
+        if options['date']:
+            try:
+                business_date = date.fromisoformat(options['date'])
+            except ValueError:
+                raise CommandError(f"Invalid date '{options['date']}', expected YYYY-MM-DD")
+
+        changed = run_night_audit(
+            business_date,
+            notify=not options['no_notify'],
+            dry_run=options['dry_run'],
+        )
+
+        prefix = 'Would move' if options['dry_run'] else 'Moved'
+        for status, ids in changed.items():
+            self.stdout.write(f'{prefix} {len(ids)} reservation(s) to {status}')
+
+        total = sum(len(ids) for ids in changed.values())
+        outcome = 'would be updated' if options['dry_run'] else 'updated'
+        self.stdout.write(
+            self.style.SUCCESS(f'Night audit for {business_date}: {total} reservation(s) {outcome}')
+        )
@@ -0,0 +1,44 @@
+from django.core.management.base import BaseCommand
+from pms.ledger import rebuild_ledger, check_ledger
+
+
+class Command(BaseCommand):
+    help = 'Rebuild or verify the RoomNight inventory ledger'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--check',
+            action='store_true',
+            help='Only report differences between the ledger and reservations',
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=1000,
+            help='Rows per insert batch',
+        )
+
+    def handle(self, *args, **options):
+        if options['check']:
+            self.report_consistency(options['batch_size'])
+            return
+
+        rows = rebuild_ledger(batch_size=options['batch_size'])
+        self.stdout.write(
+            self.style.SUCCESS(f'Rebuilt room-night ledger: {rows} nights')
+        )
+
+    def report_consistency(self, batch_size):
+        problems = check_ledger(batch_size=batch_size)
+        if not any(problems.values()):
+            self.stdout.write(self.style.SUCCESS('Room-night ledger is consistent'))
+            return
+
+        for kind, reservation_ids in problems.items():
+            if reservation_ids:
+                preview = ', '.join(str(pk) for pk in reservation_ids[:20])
+                more = f' (+{len(reservation_ids) - 20} more)' if len(reservation_ids) > 20 else ''
+                self.stdout.write(
+                    self.style.ERROR(f'{kind}: {len(reservation_ids)} reservation(s): {preview}{more}')
+                )
+        self.stdout.write(self.style.WARNING('Run without --check to rebuild the ledger'))
@@ -0,0 +1,92 @@
+import os
+import time
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+
+from django.core.management.base import BaseCommand
+from django.db import connections
+
+from pms.models import ReportJob
+from pms.report_jobs import claim_jobs, fail_stale_jobs, mark_failed, run_job
+
+
+def init_worker_process():
+    # Forked children must not share the parent's database connections;
+    # spawned ones have to load Django first
+    import django
+    django.setup()
+    connections.close_all()
+
+
+class Command(BaseCommand):
+    help = 'Compute queued background report jobs in a pool of worker processes'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--processes',
+            type=int,
+            default=min(os.cpu_count() or 1, 4),
+            help='Jobs computed in parallel (0 runs them one at a time in this process)',
+        )
+        parser.add_argument(
+            '--poll',
+            type=float,
+            default=2,
+            help='Seconds between checks for new jobs',
+        )
+        parser.add_argument(
+            '--once',
+            action='store_true',
+            help='Exit once the queue is empty instead of waiting for new jobs',
+        )
+
+    def handle(self, *args, **options):
+        stale = fail_stale_jobs()
+        if stale:
+            self.stdout.write(self.style.WARNING(f'Marked {stale} abandoned jobs as failed'))
+
+        if options['processes'] <= 0:
+            self.run_inline(options['poll'], options['once'])
+        else:
+            self.run_pool(options['processes'], options['poll'], options['once'])
+
+    def report(self, job_id, succeeded):
+        if succeeded:
+            self.stdout.write(self.style.SUCCESS(f'Report job {job_id} done'))
+        else:
+            job = ReportJob.objects.only('error').get(pk=job_id)
+            self.stdout.write(self.style.ERROR(f'Report job {job_id} failed: {job.error}'))
+
+    def run_inline(self, poll, once):
+        while True:
+            job_ids = claim_jobs(1)
+            for job_id in job_ids:
+                self.report(job_id, run_job(job_id))
+            if not job_ids:
+                if once:
+                    return
+                time.sleep(poll)
+
+    def run_pool(self, processes, poll, once):
+        self.stdout.write(f'Report worker started with {processes} processes')
+        # Connections must not be inherited by the forked pool processes
+        connections.close_all()
+        with ProcessPoolExecutor(max_workers=processes, initializer=init_worker_process) as pool:
+            running = {}
+            while True:
+                for job_id in claim_jobs(processes - len(running)):
+                    running[pool.submit(run_job, job_id)] = job_id
+                if not running:
+                    if once:
+                        return
+                    time.sleep(poll)
+                    continue
+                done, _ = wait(running, timeout=poll, return_when=FIRST_COMPLETED)
+                for future in done:
+                    job_id = running.pop(future)
+                    try:
+                        succeeded = future.result()
+                    except Exception as e:
+                        # The process died (e.g. killed); run_job records its own errors otherwise
+                        mark_failed(job_id, str(e) or type(e).__name__)
+                        succeeded = False
+                    self.report(job_id, succeeded)
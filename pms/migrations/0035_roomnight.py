@@ -0,0 +1,30 @@
+# Generated by Django 5.2.18 on 2026-10-18 10:37
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('pms', '0034_alter_reservation_check_in_and_more'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='RoomNight',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date', models.DateField()),
+                ('status', models.CharField(choices=[('pending', 'Pending'), ('confirmed', 'Confirmed'), ('expected_arrival', 'Expected Arrival'), ('in_house', 'In House'), ('expected_departure', 'Expected Departure'), ('checked_out', 'Checked Out'), ('canceled', 'Canceled'), ('no_show', 'No-Show')], max_length=20)),
+                ('revenue', models.DecimalField(decimal_places=2, default=0, help_text='Prorated share of the reservation total for this night', max_digits=10)),
+                ('reservation', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='room_nights', to='pms.reservation')),
+                ('room', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='room_nights', to='pms.room')),
+            ],
+            options={
+                'ordering': ['date', 'room'],
+                'indexes': [models.Index(fields=['room', 'date'], name='roomnight_room_date_idx'), models.Index(fields=['date', 'status'], name='roomnight_date_status_idx')],
+                'constraints': [models.UniqueConstraint(fields=('reservation', 'date'), name='unique_reservation_night')],
+            },
+        ),
+    ]
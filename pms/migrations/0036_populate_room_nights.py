@@ -0,0 +1,51 @@
+from datetime import timedelta
+from decimal import Decimal, ROUND_HALF_UP
+
+from django.db import migrations
+
+
+OCCUPIED_STATUSES = ['confirmed', 'expected_arrival', 'expected_departure', 'in_house', 'checked_out', 'no_show']
+
+
+def populate_room_nights(apps, schema_editor):
+    """Build the room-night ledger for existing reservations"""
+    Reservation = apps.get_model('pms', 'Reservation')
+    RoomNight = apps.get_model('pms', 'RoomNight')
+    cent = Decimal('0.01')
+
+    batch = []
+    for reservation in Reservation.objects.filter(status__in=OCCUPIED_STATUSES).iterator():
+        nights = (reservation.check_out - reservation.check_in).days
+        if nights <= 0:
+            continue
+        total = Decimal(str(reservation.total_amount or 0)).quantize(cent)
+        share = (total / nights).quantize(cent, rounding=ROUND_HALF_UP)
+        for i in range(nights):
+            batch.append(RoomNight(
+                reservation_id=reservation.id,
+                room_id=reservation.room_id,
+                date=reservation.check_in + timedelta(days=i),
+                status=reservation.status,
+                revenue=share if i < nights - 1 else total - share * (nights - 1),
+            ))
+        if len(batch) >= 1000:
+            RoomNight.objects.bulk_create(batch)
+            batch = []
+    RoomNight.objects.bulk_create(batch)
+
+
+def clear_room_nights(apps, schema_editor):
+    """Empty the room-night ledger"""
+    RoomNight = apps.get_model('pms', 'RoomNight')
+    RoomNight.objects.all().delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('pms', '0035_roomnight'),
+    ]
+
+    operations = [
+        migrations.RunPython(populate_room_nights, clear_room_nights),
+    ]
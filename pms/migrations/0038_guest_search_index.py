@@ -0,0 +1,67 @@
+from django.db import migrations, transaction
+from django.db.utils import OperationalError
+
+# FTS5 mirror of pms_guest for substring search (see pms/search.py). External
+# content table: only the index is stored, the triggers keep it in step with
+# every insert, update and delete, including bulk_create and queryset.update.
+CREATE_SQL = [
+    """CREATE VIRTUAL TABLE pms_guest_search USING fts5(
+        name, email, phone,
+        content='pms_guest', content_rowid='id', tokenize='trigram'
+    )""",
+    """CREATE TRIGGER pms_guest_search_insert AFTER INSERT ON pms_guest BEGIN
+        INSERT INTO pms_guest_search(rowid, name, email, phone)
+        VALUES (new.id, new.name, new.email, new.phone);
+    END""",
+    """CREATE TRIGGER pms_guest_search_delete AFTER DELETE ON pms_guest BEGIN
+        INSERT INTO pms_guest_search(pms_guest_search, rowid, name, email, phone)
+        VALUES ('delete', old.id, old.name, old.email, old.phone);
+    END""",
+    """CREATE TRIGGER pms_guest_search_update AFTER UPDATE OF name, email, phone ON pms_guest BEGIN
+        INSERT INTO pms_guest_search(pms_guest_search, rowid, name, email, phone)
+        VALUES ('delete', old.id, old.name, old.email, old.phone);
+        INSERT INTO pms_guest_search(rowid, name, email, phone)
+        VALUES (new.id, new.name, new.email, new.phone);
+    END""",
+    "INSERT INTO pms_guest_search(pms_guest_search) VALUES ('rebuild')",
+]
+
+DROP_SQL = [
+    "DROP TRIGGER IF EXISTS pms_guest_search_insert",
+    "DROP TRIGGER IF EXISTS pms_guest_search_delete",
+    "DROP TRIGGER IF EXISTS pms_guest_search_update",
+    "DROP TABLE IF EXISTS pms_guest_search",
+]
+
+
+def create_search_index(apps, schema_editor):
+    connection = schema_editor.connection
+    if connection.vendor != 'sqlite':
+        return
+    try:
+        with transaction.atomic(using=connection.alias), connection.cursor() as cursor:
+            for statement in CREATE_SQL:
+                cursor.execute(statement)
+    except OperationalError:
+        # SQLite built without FTS5 or older than 3.34 (no trigram tokenizer);
+        # search falls back to icontains
+        pass
+
+
+def drop_search_index(apps, schema_editor):
+    if schema_editor.connection.vendor != 'sqlite':
+        return
+    with schema_editor.connection.cursor() as cursor:
+        for statement in DROP_SQL:
+            cursor.execute(statement)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('pms', '0037_reservation_updated_at'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_search_index, drop_search_index),
+    ]
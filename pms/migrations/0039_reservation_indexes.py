@@ -0,0 +1,25 @@
+# Generated by Django 5.2.18 on 2026-10-18 10:58
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('pms', '0038_guest_search_index'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='reservation',
+            index=models.Index(fields=['room', 'status', 'check_in', 'check_out'], name='reservation_room_stay_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='reservation',
+            index=models.Index(fields=['status', 'check_in', 'check_out'], name='reservation_status_dates_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='reservation',
+            index=models.Index(condition=models.Q(('status', 'in_house')), fields=['check_out'], name='reservation_in_house_idx'),
+        ),
+    ]
@@ -1,7 +1,12 @@
 from django.db import models
+from django.dispatch import Signal
 from datetime import date, datetime, time
 from django.core.exceptions import ValidationError
 
+# Sent by RoomQuerySet.update_statuses() after its bulk_update, which sends no post_save.
+# Arguments: rooms (the rooms whose status changed)
+rooms_status_changed = Signal()
+
 class HotelSettings(models.Model):
     earliest_check_in_time = models.TimeField(default=time(14, 0))  # Default 2 PM
     latest_check_in_time = models.TimeField(default=time(22, 0))   # Default 10 PM
@@ -82,6 +87,49 @@ class PaymentMethod(models.Model):
     def __str__(self):
         return self.name
 
+class RoomQuerySet(models.QuerySet):
+    def update_statuses(self, date=None, mark_dirty=False):
+        """Recompute the occupied/vacant status of every room in the queryset.
+
+        Same rules as Room.update_status(), but occupancy for all rooms comes
+        from one query and only rooms whose status actually changes are
+        written, in a single bulk_update announced by ``rooms_status_changed``.
+        With ``mark_dirty`` the rooms are
+        set to vacant_dirty instead (after a check-out or cancellation).
+        Returns the number of rooms updated.
+        """
+        from django.db.models import Exists, OuterRef
+        from django.utils import timezone
+        from datetime import date as date_class
+
+        if date is None:
+            date = date_class.today()
+
+        active = Reservation.objects.filter(
+            room=OuterRef('pk'),
+            check_in__lte=date,
+            check_out__gt=date,
+            status__in=Room.ROOM_OCCUPYING_STATUSES
+        )
+        rooms = self.only('id', 'room_number', 'status').annotate(is_occupied=Exists(active))
+
+        now = timezone.now()
+        changed = []
+        for room in rooms:
+            new_status = 'vacant_dirty' if mark_dirty else room.recomputed_status(room.is_occupied)
+            if new_status != room.status:
+                room.status = new_status
+                room.status_changed_at = now
+                room.updated_at = now
+                changed.append(room)
+
+        if changed:
+            Room.objects.bulk_update(changed, ['status', 'status_changed_at', 'updated_at'])
+            # Its receiver (pms/signals.py) refreshes the bitmaps, dashboard and reports and notifies clients
+            rooms_status_changed.send(sender=Room, rooms=changed)
+        return len(changed)
+
+
 class Room(models.Model):
     ROOM_TYPES = [
         ('garden_view', 'Garden View'),
@@ -129,7 +177,14 @@ class Room(models.Model):
     has_minibar = models.BooleanField(default=False)
     
     created_at = models.DateTimeField(auto_now_add=True)
-    updated_at = models.DateTimeField(auto_now=True)
+    updated_at = models.DateTimeField(auto_now=True, db_index=True)
+
+    # Reservation statuses that make a room occupied on a date
+    ROOM_OCCUPYING_STATUSES = ['confirmed', 'in_house', 'expected_arrival', 'expected_departure']
+    # Statuses set by staff that update_status() leaves alone
+    MANUAL_STATUSES = ['vacant_dirty', 'out_of_order', 'maintenance', 'out_of_service']
+
+    objects = RoomQuerySet.as_manager()
 
     def __str__(self):
         return f"Room {self.room_number}"
@@ -144,45 +199,41 @@ class Room(models.Model):
         if date is None:
             date = date_class.today()
         
-        # If the room is marked as vacant_dirty, do not auto-update
-        if self.status == 'vacant_dirty':
-            self.save()
-            return
-        # If the room is marked as out_of_order, maintenance, or out_of_service, do not auto-update
-        if self.status in ['out_of_order', 'maintenance', 'out_of_service']:
-            self.save()
+        # Manually set statuses (dirty, out of order, maintenance) are not auto-updated
+        if self.status in self.MANUAL_STATUSES:
             return
         # Check if there are any active reservations for this room on the given date
         is_occupied = Reservation.objects.filter(
             Q(room=self) &
             Q(check_in__lte=date) &
             Q(check_out__gt=date) &
-            Q(status__in=['confirmed', 'in_house', 'expected_arrival', 'expected_departure'])
+            Q(status__in=self.ROOM_OCCUPYING_STATUSES)
         ).exists()
         
-        if is_occupied:
-            self.status = 'occupied'
-        else:
-            if self.status != 'vacant_dirty':
-                self.status = 'vacant_clean'
-        self.save()
+        new_status = self.recomputed_status(is_occupied)
+        # Only write (and move status_changed_at) when the status really changes
+        if new_status != self.status:
+            self.status = new_status
+            self.save(update_fields=['status', 'status_changed_at', 'updated_at'])
+
+    def recomputed_status(self, is_occupied):
+        """Status the room should have given whether a reservation occupies it."""
+        if self.status in self.MANUAL_STATUSES:
+            return self.status
+        return 'occupied' if is_occupied else 'vacant_clean'
 
     def is_available(self, check_in, check_out):
-        """Check if room is available for the given date range."""
-        from django.db.models import Q
+        """Check if room is available for the given date range.
+        Answered from the in-memory stay index; booking writes re-check the database."""
+        from .availability import stay_index
         # A room is available if there are no overlapping active reservations
-        overlapping = Reservation.objects.filter(
-            Q(room=self) &
-            Q(check_in__lt=check_out) &  # New booking starts before existing booking ends
-            Q(check_out__gt=check_in) &  # New booking ends after existing booking starts
-            Q(status__in=['confirmed', 'in_house', 'expected_arrival'])
-        ).exists()
+        overlapping = not stay_index.is_free(self.id, check_in, check_out)
         # Room must also be vacant_clean to be bookable
         return not overlapping and self.status == 'vacant_clean'
     
     def get_reservation_history(self, limit=10):
         """Get recent reservation history for this room"""
-        return Reservation.objects.filter(room=self).order_by('-check_in')[:limit]
+        return Reservation.objects.filter(room=self).select_related('guest').order_by('-check_in')[:limit]
     
     def get_occupancy_rate(self, start_date=None, end_date=None):
         """Calculate occupancy rate for a given period"""
@@ -314,6 +365,74 @@ class Guest(models.Model):
     def __str__(self):
         return self.name
 
+class ReservationQuerySet(models.QuerySet):
+    """Queries over the status a reservation should have on a given day.
+
+    The stored status only advances when the night audit runs. These methods
+    derive the status Reservation.update_status() would assign, so lists and
+    counts are right between audits without writing anything.
+    """
+
+    def with_effective_status(self, today=None):
+        """Annotate each reservation with ``effective_status``."""
+        from django.db.models import Case, When, Value, F
+
+        today = today or date.today()
+        return self.annotate(effective_status=Case(
+            When(status__in=['confirmed', 'expected_arrival'], check_in__lt=today, then=Value('no_show')),
+            When(status='confirmed', check_in=today, then=Value('expected_arrival')),
+            When(status='in_house', check_out=today, then=Value('expected_departure')),
+            default=F('status'),
+            output_field=models.CharField(max_length=20),
+        ))
+
+    def in_effective_status(self, status, today=None):
+        """Reservations whose effective status is ``status``.
+
+        Expressed directly on status/check_in/check_out rather than on the
+        annotation so the database can use their indexes.
+        """
+        from django.db.models import Q
+
+        today = today or date.today()
+        if status == 'no_show':
+            condition = Q(status='no_show') | Q(status__in=['confirmed', 'expected_arrival'], check_in__lt=today)
+        elif status == 'expected_arrival':
+            condition = Q(status='confirmed', check_in=today) | Q(status='expected_arrival', check_in__gte=today)
+        elif status == 'confirmed':
+            condition = Q(status='confirmed', check_in__gt=today)
+        elif status == 'in_house':
+            condition = Q(status='in_house') & ~Q(check_out=today)
+        elif status == 'expected_departure':
+            condition = Q(status='expected_departure') | Q(status='in_house', check_out=today)
+        else:
+            condition = Q(status=status)
+        return self.filter(condition)
+
+    def set_status(self, status, notify=True):
+        """Move every reservation in the queryset to ``status`` with one UPDATE.
+
+        queryset.update() sends no post_save, so the ``reservations_status_changed``
+        signal is sent instead; its receivers resync the ledger and the
+        availability structures and queue the email notifications. Returns
+        the ids of the reservations whose status changed.
+        """
+        from django.db import transaction
+        from django.utils import timezone
+        from .signals import reservations_status_changed
+
+        with transaction.atomic():
+            pending = self.exclude(status=status)
+            ids = list(pending.select_for_update().values_list('id', flat=True))
+            if ids:
+                # update() skips auto_now, so bump updated_at explicitly
+                pending.update(status=status, updated_at=timezone.now())
+                reservations_status_changed.send(
+                    sender=Reservation, reservation_ids=ids, status=status, notify=notify
+                )
+        return ids
+
+
 class Reservation(models.Model):
     STATUS_CHOICES = [
         ('pending', 'Pending'),
@@ -343,14 +462,54 @@ class Reservation(models.Model):
     payment_notes = models.TextField(blank=True, default='')  # New field
     agent = models.ForeignKey(Agent, on_delete=models.SET_NULL, null=True, blank=True, help_text="Booking agent/source for this reservation")
     created_at = models.DateTimeField(auto_now_add=True)  # Reservation creation timestamp
+    updated_at = models.DateTimeField(auto_now=True, db_index=True)  # Last modification, feeds the dashboard API version
     cancellation_reason = models.TextField(blank=True, default='')  # Reason for cancellation
     total_amount = models.DecimalField(max_digits=10, decimal_places=2, null=True, blank=True, help_text="Final amount after discounts, taxes, and fees")
     base_amount = models.DecimalField(max_digits=10, decimal_places=2, null=True, blank=True, help_text="Base room rate before discounts")
     discount_amount = models.DecimalField(max_digits=10, decimal_places=2, default=0, help_text="Total discount applied")
 
+    objects = ReservationQuerySet.as_manager()
+
+    class Meta:
+        indexes = [
+            # Overlap checks for one room: room = ? AND status IN (...) AND check_in < ? AND check_out > ?
+            models.Index(fields=['room', 'status', 'check_in', 'check_out'], name='reservation_room_stay_idx'),
+            # Status plus date range (reports, night audit, dashboard buckets)
+            models.Index(fields=['status', 'check_in', 'check_out'], name='reservation_status_dates_idx'),
+            # In-house stays by departure date (night audit, expected departures). Partial
+            # indexes only match an equality on the status: SQLite cannot prove that
+            # a bound status IN (...) list falls inside the index condition
+            models.Index(fields=['check_out'], name='reservation_in_house_idx', condition=models.Q(status='in_house')),
+        ]
+
+    # Attributes whose database values are remembered on load for change detection
+    TRACKED_FIELDS = ['status', 'room_id', 'check_in', 'check_out', 'total_amount']
+
     def __str__(self):
         return f"{self.guest.name} - {self.room.room_number} ({self.status})"
 
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        instance._snapshot()
+        return instance
+
+    def _snapshot(self):
+        # Deferred fields are missing from __dict__ and are simply not tracked
+        self._loaded_values = {name: self.__dict__[name] for name in self.TRACKED_FIELDS if name in self.__dict__}
+
+    def loaded_value(self, field):
+        """Value of a tracked field as last loaded from or saved to the database (None if unknown)."""
+        return getattr(self, '_loaded_values', {}).get(field)
+
+    def has_changed(self, *fields):
+        """True if any of the tracked ``fields`` differs from its database value.
+        Instances that were never loaded or saved count as changed."""
+        loaded = getattr(self, '_loaded_values', None)
+        if loaded is None:
+            return True
+        return any(field not in loaded or loaded[field] != getattr(self, field) for field in fields or self.TRACKED_FIELDS)
+
     def update_status(self):
         """Automatically update status based on current date."""
         today = date.today()
@@ -388,15 +547,10 @@ class Reservation(models.Model):
         print(f"Debug: No status update needed")
 
     def has_overlap(self):
-        """Check if there are any overlapping active reservations for the same room."""
-        active_statuses = ['confirmed', 'in_house', 'expected_arrival']
-        overlapping = Reservation.objects.filter(
-            room=self.room,
-            check_in__lt=self.check_out,
-            check_out__gt=self.check_in,
-            status__in=active_statuses
-        ).exclude(pk=self.pk)
-        return overlapping.exists()
+        """Check if there are any overlapping active reservations for the same room.
+        Always verified against the database since it guards writes."""
+        from .availability import overlapping_reservations
+        return overlapping_reservations(self.room, self.check_in, self.check_out, exclude_pk=self.pk).exists()
 
     def clean(self):
         # Add check-out date validation
@@ -426,6 +580,81 @@ class Reservation(models.Model):
             self.base_amount = self.room.rate * (self.check_out - self.check_in).days if self.room and self.check_in and self.check_out else 0
             self.total_amount = self.calculate_total_amount()
         super().save(*args, **kwargs)
+        # Keep the room-night ledger in step with dates, room, status and amount
+        if self.has_changed():
+            from .ledger import sync_reservation
+            sync_reservation(self)
+        self._snapshot()
+
+
+class RoomNight(models.Model):
+    """One sold night of a room, materialized from Reservation writes.
+
+    Rows are rewritten by Reservation.save() and removed with the reservation
+    (cascade), so occupancy, availability and nightly revenue can be read with
+    indexed date range scans. See pms/ledger.py.
+    """
+    room = models.ForeignKey(Room, on_delete=models.CASCADE, related_name='room_nights')
+    reservation = models.ForeignKey(Reservation, on_delete=models.CASCADE, related_name='room_nights')
+    date = models.DateField()
+    status = models.CharField(max_length=20, choices=Reservation.STATUS_CHOICES)
+    revenue = models.DecimalField(max_digits=10, decimal_places=2, default=0, help_text="Prorated share of the reservation total for this night")
+
+    class Meta:
+        ordering = ['date', 'room']
+        constraints = [
+            models.UniqueConstraint(fields=['reservation', 'date'], name='unique_reservation_night'),
+        ]
+        indexes = [
+            models.Index(fields=['room', 'date'], name='roomnight_room_date_idx'),
+            models.Index(fields=['date', 'status'], name='roomnight_date_status_idx'),
+        ]
+
+    def __str__(self):
+        return f"Room {self.room_id} - {self.date} ({self.status})"
+
+
+class ReportJob(models.Model):
+    """A report computed in the background by the ``run_report_worker`` command.
+
+    Report views enqueue one for windows too long to compute within a
+    request (see pms/report_jobs.py); the worker stores the rendered page in
+    ``result``, which the job page shows and offers for download.
+    """
+    STATUS_CHOICES = [
+        ('queued', 'Queued'),
+        ('running', 'Running'),
+        ('done', 'Done'),
+        ('failed', 'Failed'),
+    ]
+    REPORT_CHOICES = [
+        ('occupancy_report', 'Occupancy Report'),
+        ('forecast_report', 'Forecast & Trends'),
+    ]
+
+    report = models.CharField(max_length=50, choices=REPORT_CHOICES)
+    params = models.JSONField(default=dict, blank=True, help_text="GET parameters of the report request")
+    params_key = models.CharField(max_length=32, db_index=True, help_text="Hash of report and parameters, to find an identical job")
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='queued')
+    progress = models.PositiveSmallIntegerField(default=0, help_text="Percent complete")
+    result = models.TextField(blank=True, help_text="Rendered report page")
+    error = models.TextField(blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    started_at = models.DateTimeField(null=True, blank=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['status', 'created_at'], name='reportjob_status_created_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.get_report_display()} #{self.pk} ({self.status})"
+
+    @property
+    def finished(self):
+        return self.status in ('done', 'failed')
 
 
 class EmailNotificationSettings(models.Model):
@@ -0,0 +1,46 @@
+"""Night audit: date-driven reservation status transitions.
+
+Applies the same transitions as Reservation.update_status() - no-shows,
+expected arrivals and expected departures - for a whole business date with
+one UPDATE per transition instead of a query and a save() per reservation.
+Running it twice for the same date changes nothing the second time.
+"""
+from datetime import date
+
+from django.db import transaction
+from django.db.models import Q
+
+from .models import Room, Reservation
+
+# (new status, condition for a business date) in the order update_status() checks them
+TRANSITIONS = [
+    ('no_show', lambda day: Q(check_in__lt=day, status__in=['confirmed', 'expected_arrival'])),
+    ('expected_arrival', lambda day: Q(check_in=day, status='confirmed')),
+    ('expected_departure', lambda day: Q(check_out=day, status='in_house')),
+]
+
+
+def run_night_audit(business_date=None, notify=True, dry_run=False):
+    """Apply the status transitions due on ``business_date`` (default today).
+
+    Each transition is one ReservationQuerySet.set_status() call, whose signal
+    resyncs the ledger and availability indexes and queues the guest emails
+    until commit. Returns a dict mapping each new status to the ids of the
+    reservations moved into it. With ``dry_run`` nothing is written.
+    """
+    business_date = business_date or date.today()
+    changed = {}
+
+    with transaction.atomic():
+        for new_status, condition in TRANSITIONS:
+            due = Reservation.objects.filter(condition(business_date))
+            if dry_run:
+                changed[new_status] = list(due.values_list('id', flat=True))
+            else:
+                changed[new_status] = due.set_status(new_status, notify=notify)
+
+        if not dry_run:
+            # Rooms held by no-shows may be free again; only rooms whose status changes are written
+            Room.objects.update_statuses(business_date)
+
+    return changed
@@ -0,0 +1,242 @@
+"""Keyset (cursor) pagination.
+
+Instead of OFFSET, which makes the database walk every skipped row, each
+page continues from the sort values of the last row shown: ``WHERE (k1, k2,
+id) > (v1, v2, last_id)``. With an index on the sort column a page costs
+the same whether it is the first or the ten-thousandth.
+
+``ClosestDatePaginator`` applies the same idea to "closest to a date first"
+ordering, which no single index can serve: it walks the dates on or after
+the anchor upwards and the earlier dates downwards, as two index range
+scans, and merges them.
+"""
+import base64
+import heapq
+import json
+from datetime import date
+from itertools import islice
+
+from django.core.exceptions import ValidationError
+from django.db.models import F, Q, Value
+from django.db.models.functions import Coalesce
+
+
+def encode_cursor(direction, values):
+    payload = json.dumps([direction, [value.isoformat() if isinstance(value, date) else value for value in values]])
+    return base64.urlsafe_b64encode(payload.encode()).decode().rstrip('=')
+
+
+def decode_cursor(cursor):
+    """(direction, values) from a cursor string, or (None, None) if it is malformed."""
+    try:
+        padded = cursor + '=' * (-len(cursor) % 4)
+        direction, values = json.loads(base64.urlsafe_b64decode(padded.encode()))
+        if direction in ('after', 'before') and isinstance(values, list):
+            return direction, values
+    except (ValueError, TypeError):
+        pass
+    return None, None
+
+
+class KeysetPage:
+    def __init__(self, object_list, next_cursor=None, previous_cursor=None):
+        self.object_list = object_list
+        self.next_cursor = next_cursor
+        self.previous_cursor = previous_cursor
+
+    @property
+    def has_next(self):
+        return self.next_cursor is not None
+
+    @property
+    def has_previous(self):
+        return self.previous_cursor is not None
+
+    def __iter__(self):
+        return iter(self.object_list)
+
+    def __len__(self):
+        return len(self.object_list)
+
+
+class KeysetPaginator:
+    """Pages over ``queryset`` ordered by ``ordering``.
+
+    ``ordering`` is a list of field paths, each optionally prefixed with
+    ``-``; the primary key is appended as a tie-breaker. ``nullable`` maps
+    field paths that may be NULL to the value they sort as, since NULL
+    cannot be compared in a keyset condition.
+    """
+
+    def __init__(self, queryset, ordering, page_size=50, nullable=None):
+        self.page_size = page_size
+        nullable = nullable or {}
+        fields = list(ordering)
+        if not fields or fields[-1].lstrip('-') != 'id':
+            # The tie-breaker follows the direction of the leading sort key
+            fields.append(('-' if fields and fields[0].startswith('-') else '') + 'id')
+        self.keys = []
+        annotations = {}
+        for i, field in enumerate(fields):
+            descending = field.startswith('-')
+            field = field.lstrip('-')
+            alias = f'keyset_{i}'
+            expression = F(field)
+            if field in nullable:
+                expression = Coalesce(field, Value(nullable[field]))
+            annotations[alias] = expression
+            self.keys.append((alias, descending))
+        self.queryset = queryset.annotate(**annotations)
+        # Model fields of the keys, to convert cursor values back to their types
+        self.fields = [self.queryset.query.annotations[alias].output_field for alias, _ in self.keys]
+
+    def _order(self, reverse=False):
+        return [f"{'-' if descending != reverse else ''}{alias}" for alias, descending in self.keys]
+
+    def _seek(self, values, reverse=False):
+        # (k1 > v1) OR (k1 = v1 AND k2 > v2) OR ... with > / < per key direction
+        condition = Q()
+        equal = Q()
+        lookups = []
+        for (alias, descending), value in zip(self.keys, values):
+            lookup = 'lt' if descending != reverse else 'gt'
+            lookups.append(lookup)
+            condition |= equal & Q(**{f'{alias}__{lookup}': value})
+            equal &= Q(**{alias: value})
+        # Redundant k1 >= v1 bound so the database can range-scan an index on k1
+        return Q(**{f'{self.keys[0][0]}__{lookups[0]}e': values[0]}) & condition
+
+    def _cursor_values(self, obj):
+        return [getattr(obj, alias) for alias, _ in self.keys]
+
+    def _decode(self, cursor):
+        """(direction, values) of ``cursor`` as the key fields' types, or (None, None) if it does not fit them."""
+        direction, values = decode_cursor(cursor) if cursor else (None, None)
+        if values is None or len(values) != len(self.keys):
+            return None, None
+        try:
+            values = [field.to_python(value) for field, value in zip(self.fields, values)]
+        except (ValidationError, TypeError, ValueError):
+            return None, None
+        # Keys are never NULL (nullable ones are coalesced), and NULL cannot be compared
+        if any(value is None for value in values):
+            return None, None
+        return direction, values
+
+    def page(self, cursor=None):
+        """The page after (or before) ``cursor``; the first page without one."""
+        direction, values = self._decode(cursor)
+        backwards = direction == 'before'
+
+        queryset = self.queryset
+        if values is not None:
+            queryset = queryset.filter(self._seek(values, reverse=backwards))
+        rows = list(queryset.order_by(*self._order(reverse=backwards))[:self.page_size + 1])
+        more = len(rows) > self.page_size
+        rows = rows[:self.page_size]
+        if backwards:
+            rows.reverse()
+        if not rows:
+            return KeysetPage([])
+
+        has_next = (more and not backwards) or backwards
+        has_previous = (more and backwards) or (values is not None and not backwards)
+        return KeysetPage(
+            rows,
+            next_cursor=encode_cursor('after', self._cursor_values(rows[-1])) if has_next else None,
+            previous_cursor=encode_cursor('before', self._cursor_values(rows[0])) if has_previous else None,
+        )
+
+
+class ClosestDatePaginator:
+    """Pages over ``queryset`` ordered by distance of the date ``field`` from ``anchor`` (default today).
+
+    Upcoming rows (``field >= anchor``, ascending) and past rows (``field <
+    anchor``, descending) are read as two ranges of at most a page each and
+    merged lazily. At equal distance upcoming rows come first; ties within a
+    range are broken by id, away from the anchor. The anchor travels in the
+    cursor so pages stay consistent across midnight.
+    """
+
+    def __init__(self, queryset, field, page_size=50, anchor=None):
+        self.queryset = queryset
+        self.field = field
+        self.page_size = page_size
+        self.anchor = anchor or date.today()
+
+    def _position(self, check_date, pk, anchor):
+        # Sort key in the merged order: (distance, range, id away from the anchor)
+        upcoming = check_date >= anchor
+        return (abs((check_date - anchor).days), 0 if upcoming else 1, pk if upcoming else -pk)
+
+    def _ranges(self, anchor, values, backwards):
+        """Querysets of the upcoming and past rows beyond the cursor ``values``, nearest to it first."""
+        field = self.field
+        upcoming = self.queryset.filter(**{f'{field}__gte': anchor})
+        past = self.queryset.filter(**{f'{field}__lt': anchor})
+        if values is not None:
+            check_date, pk = values
+            distance = abs(check_date - anchor)
+            if check_date >= anchor:
+                # Cursor row is upcoming: same-date upcoming rows are split by id,
+                # past rows at the same distance come after it
+                same = Q(**{field: check_date})
+                if backwards:
+                    upcoming = upcoming.filter(Q(**{f'{field}__lt': check_date}) | same & Q(id__lt=pk))
+                    past = past.filter(**{f'{field}__gt': anchor - distance})
+                else:
+                    upcoming = upcoming.filter(Q(**{f'{field}__gte': check_date}),
+                                               Q(**{f'{field}__gt': check_date}) | same & Q(id__gt=pk))
+                    past = past.filter(**{f'{field}__lte': anchor - distance})
+            else:
+                # Cursor row is past: upcoming rows at the same distance come before it
+                same = Q(**{field: check_date})
+                if backwards:
+                    upcoming = upcoming.filter(**{f'{field}__lte': anchor + distance})
+                    past = past.filter(Q(**{f'{field}__gt': check_date}) | same & Q(id__gt=pk))
+                else:
+                    upcoming = upcoming.filter(**{f'{field}__gt': anchor + distance})
+                    past = past.filter(Q(**{f'{field}__lte': check_date}),
+                                       Q(**{f'{field}__lt': check_date}) | same & Q(id__lt=pk))
+        if backwards:
+            return upcoming.order_by(f'-{field}', '-id'), past.order_by(field, 'id')
+        return upcoming.order_by(field, 'id'), past.order_by(f'-{field}', '-id')
+
+    def page(self, cursor=None):
+        """The page after (or before) ``cursor``; the first page without one."""
+        direction, values = decode_cursor(cursor) if cursor else (None, None)
+        anchor = self.anchor
+        try:
+            if values is not None:
+                anchor = date.fromisoformat(values[0])
+                values = (date.fromisoformat(values[1]), int(values[2]))
+        except (IndexError, TypeError, ValueError):
+            direction, values = None, None
+        backwards = direction == 'before'
+
+        # At most one page from each range; heapq.merge interleaves them by distance
+        limit = self.page_size + 1
+        upcoming, past = self._ranges(anchor, values, backwards)
+
+        def position(obj):
+            return self._position(getattr(obj, self.field), obj.pk, anchor)
+
+        merged = heapq.merge(upcoming[:limit], past[:limit], key=position, reverse=backwards)
+        rows = list(islice(merged, limit))
+        more = len(rows) > self.page_size
+        rows = rows[:self.page_size]
+        if backwards:
+            rows.reverse()
+        if not rows:
+            return KeysetPage([])
+
+        def cursor_for(direction, obj):
+            return encode_cursor(direction, [anchor, getattr(obj, self.field), obj.pk])
+
+        has_next = (more and not backwards) or backwards
+        has_previous = (more and backwards) or (values is not None and not backwards)
+        return KeysetPage(
+            rows,
+            next_cursor=cursor_for('after', rows[-1]) if has_next else None,
+            previous_cursor=cursor_for('before', rows[0]) if has_previous else None,
+        )
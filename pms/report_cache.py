@@ -0,0 +1,217 @@
+"""Report result cache.
+
+``cached_report`` caches the template context of a report view, keyed by
+the report name and its normalized GET parameters. Views return
+``report_response`` with the range of dates their figures are read from;
+the entry records a generation counter for every month of that range, and
+``invalidate_reports`` (called by the Reservation and Room signal handlers
+in pms/signals.py) bumps the counters of the months a write touches. An
+entry is served only while none of its counters has moved, so a closed
+month stays cached for ``PMS_REPORT_CACHE_TTL`` while the current month is
+recomputed after every booking change in it.
+
+Counters live in the default cache, so with several worker processes it
+must be shared (see CACHES in settings). A per-process local-memory cache
+only sees the writes of its own process, so with it every entry, past
+dates included, is kept for ``PMS_REPORT_CACHE_LIVE_TTL`` at most.
+"""
+import hashlib
+import time
+from datetime import date, timedelta
+from functools import wraps
+from urllib.parse import urlencode
+
+from django.conf import settings
+from django.core.cache import cache, caches
+from django.core.cache.backends.dummy import DummyCache
+from django.core.cache.backends.locmem import LocMemCache
+from django.template.response import TemplateResponse
+
+# Counter bumped by every write: a catch-all for reports that read all-time figures
+WRITES = 'writes'
+# Counter bumped by room status changes, for reports showing the live room board
+ROOMS = 'rooms'
+# Counter bumped by invalidate_reports() without dates; every entry depends on it
+EPOCH = 'epoch'
+
+# Cached reports and their titles on the reports hub
+REPORTS = [
+    ('occupancy_report', 'Occupancy Report'),
+    ('revenue_report', 'Revenue Report'),
+    ('guest_analytics', 'Guest Analytics'),
+    ('booking_sources_report', 'Booking Sources'),
+    ('operational_report', 'Operational Report'),
+    ('forecast_report', 'Forecast & Trends'),
+]
+
+
+def cache_is_shared():
+    """False when the default cache lives inside each process, out of reach of other workers' writes."""
+    return not isinstance(caches['default'], (LocMemCache, DummyCache))
+
+
+def entry_timeout(live):
+    """Seconds to keep a report entry; ``live`` entries cover today or later."""
+    live_ttl = getattr(settings, 'PMS_REPORT_CACHE_LIVE_TTL', 600)
+    if live or not cache_is_shared():
+        return live_ttl
+    return getattr(settings, 'PMS_REPORT_CACHE_TTL', 604800)
+
+
+def _counter_key(counter):
+    return f'report_cache_gen_{counter}'
+
+
+def _stats_key(name, outcome):
+    return f'report_cache_stats_{name}_{outcome}'
+
+
+def _months(start_date, end_date):
+    month = date(start_date.year, start_date.month, 1)
+    while month <= end_date:
+        yield f'month_{month:%Y-%m}'
+        month = (month + timedelta(days=32)).replace(day=1)
+
+
+def _generations(counters):
+    """Current value of each counter, starting missing (or evicted) ones at a fresh value."""
+    keys = [_counter_key(counter) for counter in counters]
+    values = cache.get_many(keys)
+    for key in keys:
+        if key not in values:
+            # A clock-based start never repeats a value an evicted counter had
+            cache.add(key, time.time_ns(), None)
+            values[key] = cache.get(key)
+    return tuple(values[key] for key in keys)
+
+
+def _bump(counters):
+    for counter in counters:
+        key = _counter_key(counter)
+        try:
+            cache.incr(key)
+        except ValueError:
+            cache.add(key, time.time_ns(), None)
+
+
+def _record(name, outcome):
+    key = _stats_key(name, outcome)
+    try:
+        cache.incr(key)
+    except ValueError:
+        cache.add(key, 1, None)
+
+
+def invalidate_reports(*date_ranges, rooms=False):
+    """Expire cached reports covering any of ``date_ranges`` ((start, end) date pairs, inclusive).
+
+    Without ranges (and without ``rooms``) every cached report is expired.
+    """
+    if not date_ranges and not rooms:
+        _bump([EPOCH])
+        return
+    counters = {ROOMS} if rooms else set()
+    for start_date, end_date in date_ranges:
+        if start_date and end_date:
+            counters.update(_months(min(start_date, end_date), max(start_date, end_date)))
+    if date_ranges:
+        counters.add(WRITES)
+    _bump(sorted(counters))
+
+
+def data_generations(start_date, end_date):
+    """Counters of the months from ``start_date`` to ``end_date``; they change when a write touches those dates.
+
+    For caches outside the report views, such as the fitted forecast models.
+    """
+    return _generations([EPOCH, *_months(start_date, end_date)])
+
+
+def report_response(request, template, context, start_date=None, end_date=None, rooms=False):
+    """Render a report, telling ``cached_report`` which data it depends on.
+
+    ``start_date``/``end_date`` bound the dates of the reservations the report
+    reads; leave them out for reports with all-time figures. Pass ``rooms``
+    when the report shows current room statuses.
+    """
+    response = TemplateResponse(request, template, context)
+    response.report_span = (start_date, end_date)
+    response.report_rooms = rooms
+    return response
+
+
+def _counters(span, rooms):
+    start_date, end_date = span
+    counters = [EPOCH]
+    if start_date and end_date:
+        counters.extend(_months(start_date, end_date))
+    else:
+        counters.append(WRITES)
+    if rooms:
+        counters.append(ROOMS)
+    return counters
+
+
+def cached_report(name, dated_params=('start_date', 'end_date'), relative=False):
+    """Cache the context of a report view returning ``report_response``.
+
+    Without all of ``dated_params`` the view falls back to dates relative to
+    today, so today joins the cache key; ``relative`` reports (trends up to
+    today, forecasts from today) always key on it.
+    """
+    def decorator(view):
+        @wraps(view)
+        def wrapper(request, *args, **kwargs):
+            if request.method != 'GET' or not getattr(settings, 'PMS_REPORT_CACHE_ENABLED', True):
+                return view(request, *args, **kwargs)
+
+            today = date.today()
+            params = sorted((key, value) for key, values in request.GET.lists() for value in values if value)
+            if relative or not all(request.GET.get(param) for param in dated_params):
+                params.append(('_today', today.isoformat()))
+            key = f'report_cache_{name}_' + hashlib.md5(urlencode(params).encode()).hexdigest()
+
+            entry = cache.get(key)
+            if entry is not None and _generations(entry['counters']) == entry['generations']:
+                _record(name, 'hits')
+                return TemplateResponse(request, entry['template'], entry['context'])
+
+            _record(name, 'misses')
+            # A write committed while the report is computed may not be in it; don't keep that result
+            writes_before = _generations([EPOCH, WRITES, ROOMS])
+            response = view(request, *args, **kwargs)
+            if not isinstance(response, TemplateResponse) or response.status_code != 200:
+                return response
+            counters = _counters(response.report_span, response.report_rooms)
+            generations = _generations(counters)
+            if _generations([EPOCH, WRITES, ROOMS]) == writes_before:
+                end_date = response.report_span[1]
+                timeout = entry_timeout(live=end_date is None or end_date >= today)
+                cache.set(key, {
+                    'template': response.template_name,
+                    'context': response.context_data,
+                    'counters': counters,
+                    'generations': generations,
+                }, timeout)
+            return response
+        return wrapper
+    return decorator
+
+
+def report_cache_stats():
+    """[{name, title, hits, misses, hit_rate}] per cached report; hit_rate in percent, None before any request."""
+    keys = [_stats_key(name, outcome) for name, _ in REPORTS for outcome in ('hits', 'misses')]
+    values = cache.get_many(keys)
+    stats = []
+    for name, title in REPORTS:
+        hits = values.get(_stats_key(name, 'hits'), 0)
+        misses = values.get(_stats_key(name, 'misses'), 0)
+        total = hits + misses
+        stats.append({
+            'name': name,
+            'title': title,
+            'hits': hits,
+            'misses': misses,
+            'hit_rate': hits / total * 100 if total else None,
+        })
+    return stats
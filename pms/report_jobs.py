@@ -0,0 +1,129 @@
+"""Background report jobs.
+
+Report views call ``run_in_background`` once they know the window they
+cover; when it is at least ``PMS_REPORT_JOB_MIN_DAYS`` long a ReportJob is
+queued (or an identical recent one reused) and the browser is sent to the
+job page, which polls ``report_job_status`` until the rendered page is
+ready. The ``run_report_worker`` command claims queued jobs and runs the
+report view for each in a pool of processes, so the web worker's latency
+does not depend on the window size.
+"""
+import hashlib
+import json
+from datetime import timedelta
+from urllib.parse import urlencode
+
+from django.conf import settings
+from django.contrib.auth.models import AnonymousUser
+from django.db.models import Q
+from django.http import HttpRequest, QueryDict
+from django.shortcuts import redirect
+from django.urls import resolve, reverse
+from django.utils import timezone
+
+from .models import ReportJob
+
+
+def _params(query):
+    return {key: value for key, value in sorted(query.items()) if value}
+
+
+def _params_key(report, params):
+    return hashlib.md5(json.dumps([report, params]).encode()).hexdigest()
+
+
+def enqueue(report, query):
+    """Queue ``report`` with the GET parameters ``query``.
+
+    An identical job from today is reused while it is pending, or for
+    ``PMS_REPORT_JOB_REUSE`` seconds after it finished.
+    """
+    params = _params(query)
+    key = _params_key(report, params)
+    now = timezone.localtime()
+    today_start = now.replace(hour=0, minute=0, second=0, microsecond=0)
+    done_after = max(today_start, now - timedelta(seconds=getattr(settings, 'PMS_REPORT_JOB_REUSE', 600)))
+    existing = ReportJob.objects.filter(params_key=key, created_at__gte=today_start).filter(
+        Q(status__in=['queued', 'running']) | Q(status='done', finished_at__gte=done_after)
+    ).order_by('-created_at').first()
+    if existing is not None:
+        return existing
+    return ReportJob.objects.create(report=report, params=params, params_key=key)
+
+
+def run_in_background(request, report, days):
+    """Redirect to a queued job when ``days`` is too long a window to compute in the request.
+
+    Returns None (compute inline) for short windows and inside the worker itself.
+    """
+    if getattr(request, 'report_job', None) is not None:
+        return None
+    if days < getattr(settings, 'PMS_REPORT_JOB_MIN_DAYS', 500):
+        return None
+    job = enqueue(report, request.GET)
+    return redirect('report_job', job_id=job.pk)
+
+
+def set_progress(request, percent):
+    """Record the progress of the job a report view is computing; a no-op for web requests."""
+    job = getattr(request, 'report_job', None)
+    if job is not None:
+        ReportJob.objects.filter(pk=job.pk).update(progress=percent)
+
+
+def claim_jobs(limit):
+    """Mark up to ``limit`` queued jobs as running and return their ids, oldest first.
+
+    The conditional UPDATE makes a claim atomic, so several workers can share the queue.
+    """
+    claimed = []
+    if limit <= 0:
+        return claimed
+    for job_id in ReportJob.objects.filter(status='queued').order_by('created_at').values_list('id', flat=True)[:limit]:
+        if ReportJob.objects.filter(pk=job_id, status='queued').update(status='running', progress=5, started_at=timezone.now()):
+            claimed.append(job_id)
+    return claimed
+
+
+def fail_stale_jobs():
+    """Fail running jobs older than ``PMS_REPORT_JOB_TIMEOUT`` seconds (their worker stopped)."""
+    started_before = timezone.now() - timedelta(seconds=getattr(settings, 'PMS_REPORT_JOB_TIMEOUT', 1800))
+    return ReportJob.objects.filter(status='running', started_at__lt=started_before).update(
+        status='failed', error='Timed out: the worker stopped before finishing', finished_at=timezone.now()
+    )
+
+
+def mark_failed(job_id, error):
+    """Record that a job failed with ``error``."""
+    ReportJob.objects.filter(pk=job_id).update(status='failed', error=error, finished_at=timezone.now())
+
+
+def _job_request(job, path):
+    """A plain GET request for ``path`` carrying the job's parameters, as the report view expects."""
+    request = HttpRequest()
+    request.method = 'GET'
+    request.path = request.path_info = path
+    request.GET = QueryDict(urlencode(job.params))
+    request.META = {'SERVER_NAME': 'localhost', 'SERVER_PORT': '80', 'QUERY_STRING': request.GET.urlencode()}
+    request.user = AnonymousUser()
+    request.report_job = job
+    return request
+
+
+def run_job(job_id):
+    """Compute a claimed job: run its report view on a synthetic GET and store the rendered page."""
+    job = ReportJob.objects.get(pk=job_id)
+    try:
+        path = reverse(job.report)
+        response = resolve(path).func(_job_request(job, path))
+        if hasattr(response, 'render'):
+            response.render()
+        if response.status_code != 200:
+            raise RuntimeError(f'Report returned HTTP {response.status_code}')
+    except Exception as e:
+        mark_failed(job_id, str(e) or type(e).__name__)
+        return False
+    ReportJob.objects.filter(pk=job_id).update(
+        status='done', progress=100, result=response.content.decode(response.charset), finished_at=timezone.now()
+    )
+    return True
@@ -0,0 +1,62 @@
+"""JSON responses for the high-volume API endpoints.
+
+``json_response`` encodes with orjson when it is installed and falls back to
+the stdlib encoder otherwise; both write compact UTF-8 and accept Decimal
+(as a number), date, datetime, time and UUID values, so views can pass model
+values straight through. Bodies of at least ``PMS_JSON_GZIP_MIN_BYTES`` are
+gzipped for clients that accept it.
+"""
+import gzip
+import json
+import re
+import uuid
+from datetime import date, time
+from decimal import Decimal
+
+from django.conf import settings
+from django.http import HttpResponse
+from django.utils.cache import patch_vary_headers
+from django.utils.functional import Promise
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+# Fast compression: these bodies are built per request, not cached
+GZIP_LEVEL = 5
+_accepts_gzip = re.compile(r'\bgzip\b')
+
+
+def _default(value):
+    if isinstance(value, Decimal):
+        return float(value)
+    # orjson handles these itself; the stdlib encoder needs them spelled out
+    if isinstance(value, (date, time)):
+        return value.isoformat()
+    if isinstance(value, (uuid.UUID, Promise)):
+        return str(value)
+    raise TypeError(f'Object of type {type(value).__name__} is not JSON serializable')
+
+
+def dumps(data):
+    """``data`` as compact UTF-8 JSON bytes."""
+    if orjson is not None:
+        return orjson.dumps(data, default=_default, option=orjson.OPT_NON_STR_KEYS)
+    return json.dumps(data, default=_default, separators=(',', ':'), ensure_ascii=False).encode()
+
+
+def json_response(data, request=None, status=200, headers=None):
+    """An ``application/json`` response of ``data``, gzipped when large and ``request`` accepts it."""
+    body = dumps(data)
+    min_bytes = getattr(settings, 'PMS_JSON_GZIP_MIN_BYTES', 2048)
+    compress = request is not None and min_bytes > 0
+    if compress and len(body) >= min_bytes and _accepts_gzip.search(request.headers.get('Accept-Encoding', '')):
+        compressed = gzip.compress(body, compresslevel=GZIP_LEVEL, mtime=0)
+        if len(compressed) < len(body):
+            body = compressed
+            headers = {**(headers or {}), 'Content-Encoding': 'gzip'}
+    response = HttpResponse(body, content_type='application/json', status=status, headers=headers)
+    if compress:
+        patch_vary_headers(response, ('Accept-Encoding',))
+    return response
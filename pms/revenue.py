@@ -0,0 +1,93 @@
+"""Prorated room-night revenue engine.
+
+Every sold night in the RoomNight ledger (pms/ledger.py) already carries its
+share of the reservation total, so revenue for a window is a sum over an
+indexed date range. One grouped query returns nights and revenue per date,
+room type, payment method and agent; daily revenue, occupied nights, ADR,
+RevPAR and the breakdowns are folded from those rows in a single pass.
+Stays crossing the window edges only contribute the nights inside it.
+"""
+from datetime import timedelta
+from decimal import Decimal
+
+from django.db.models import Count, Sum
+
+from .models import Room, RoomNight
+
+ZERO = Decimal('0')
+
+
+def _add(totals, key, nights, revenue):
+    entry = totals.get(key)
+    if entry is None:
+        totals[key] = {'nights': nights, 'revenue': revenue}
+    else:
+        entry['nights'] += nights
+        entry['revenue'] += revenue
+
+
+class RevenueSummary:
+    """Revenue and sold nights for an inclusive date window, optionally for one room type."""
+
+    def __init__(self, start_date, end_date, room_type=''):
+        self.start_date = start_date
+        self.end_date = end_date
+        self.num_days = max((end_date - start_date).days + 1, 0)
+
+        nights = RoomNight.objects.filter(date__gte=start_date, date__lte=end_date)
+        rooms = Room.objects.all()
+        if room_type:
+            nights = nights.filter(room__room_type=room_type)
+            rooms = rooms.filter(room_type=room_type)
+        self.room_count = rooms.count()
+
+        self.daily_revenue = [ZERO] * self.num_days
+        self.daily_nights = [0] * self.num_days
+        self.by_room_type = {}
+        self.by_payment_method = {}
+        self.by_agent = {}
+        if not self.num_days:
+            return
+
+        rows = nights.values_list(
+            'date', 'room__room_type', 'reservation__payment_method_id', 'reservation__agent_id'
+        ).annotate(nights=Count('id'), revenue=Sum('revenue')).order_by()
+        for night, type_code, payment_method_id, agent_id, count, revenue in rows:
+            revenue = revenue or ZERO
+            index = (night - start_date).days
+            self.daily_revenue[index] += revenue
+            self.daily_nights[index] += count
+            _add(self.by_room_type, type_code, count, revenue)
+            _add(self.by_payment_method, payment_method_id, count, revenue)
+            _add(self.by_agent, agent_id, count, revenue)
+
+    @property
+    def dates(self):
+        return [self.start_date + timedelta(days=i) for i in range(self.num_days)]
+
+    @property
+    def total_revenue(self):
+        return sum(self.daily_revenue, ZERO)
+
+    @property
+    def occupied_nights(self):
+        return sum(self.daily_nights)
+
+    @property
+    def adr(self):
+        """Average daily rate: revenue per sold night."""
+        nights = self.occupied_nights
+        return self.total_revenue / nights if nights else ZERO
+
+    @property
+    def revpar(self):
+        """Revenue per available room night."""
+        available = self.room_count * self.num_days
+        return self.total_revenue / available if available else ZERO
+
+    def daily(self):
+        """[{date, revenue, occupied_rooms}] for each day of the window."""
+        return [
+            {'date': day, 'revenue': revenue, 'occupied_rooms': nights}
+            for day, revenue, nights in zip(self.dates, self.daily_revenue, self.daily_nights)
+        ]
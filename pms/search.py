@@ -0,0 +1,71 @@
+"""Guest and reservation text search.
+
+On SQLite, guest name, email and phone are mirrored into the FTS5 table
+``pms_guest_search`` (trigram tokenizer, kept in sync by triggers created in
+migration 0038). A trigram index answers substring queries - what
+``icontains`` does with ``LIKE '%x%'`` - without scanning the guest table.
+Queries shorter than three characters, and databases without the index,
+fall back to ``icontains``.
+"""
+from django.db import connection
+from django.db.models import Q
+from django.db.models.expressions import RawSQL
+
+from .models import Guest, Room
+
+SEARCH_TABLE = 'pms_guest_search'
+# Trigrams need at least three characters to match anything
+MIN_INDEXED_LENGTH = 3
+
+_index_available = None
+
+
+def search_index_available():
+    """True when the FTS5 guest index exists in the database."""
+    global _index_available
+    if _index_available is None:
+        _index_available = connection.vendor == 'sqlite' and SEARCH_TABLE in connection.introspection.table_names()
+    return _index_available
+
+
+def _match_expression(text):
+    # One quoted phrase: a substring match on any column, with FTS syntax characters escaped
+    return '"' + text.replace('"', '""') + '"'
+
+
+def matching_guest_ids(text):
+    """Subquery expression of the ids of guests whose name, email or phone contains ``text``,
+    or None when the index cannot answer it."""
+    if len(text) < MIN_INDEXED_LENGTH or not search_index_available():
+        return None
+    return RawSQL(f'SELECT rowid FROM {SEARCH_TABLE} WHERE {SEARCH_TABLE} MATCH %s', [_match_expression(text)])
+
+
+def search_guests(queryset, text):
+    """Filter a Guest queryset to guests whose name, email or phone contains ``text``."""
+    guest_ids = matching_guest_ids(text)
+    if guest_ids is None:
+        return queryset.filter(Q(name__icontains=text) | Q(email__icontains=text) | Q(phone__icontains=text))
+    return queryset.filter(id__in=guest_ids)
+
+
+def search_reservations(queryset, text):
+    """Filter a Reservation queryset by guest name, email, phone or room number."""
+    guest_ids = matching_guest_ids(text)
+    if guest_ids is None:
+        return queryset.filter(
+            Q(guest__name__icontains=text) |
+            Q(guest__email__icontains=text) |
+            Q(room__room_number__icontains=text) |
+            Q(guest__phone__icontains=text)
+        )
+    # Rooms are few, so room numbers are matched directly
+    room_ids = Room.objects.filter(room_number__icontains=text).values('id')
+    return queryset.filter(Q(guest_id__in=guest_ids) | Q(room_id__in=room_ids))
+
+
+def rebuild_search_index():
+    """Re-read every guest into the index (after restoring a database copy, for example)."""
+    if search_index_available():
+        with connection.cursor() as cursor:
+            cursor.execute(f"INSERT INTO {SEARCH_TABLE}({SEARCH_TABLE}) VALUES ('rebuild')")
@@ -0,0 +1,101 @@
+"""Synthetic hotel data used by benchmarks and query-budget tests."""
+import random
+from datetime import date, timedelta
+from decimal import Decimal
+
+from .ledger import sync_reservations
+from .models import Room, Guest, Reservation
+
+
+def seed_hotel(rooms=50, reservations=2000, start_date=None, seed=0, prefix='S'):
+    """Create ``rooms`` rooms and about ``reservations`` back-to-back stays.
+
+    Stays are laid out per room so active reservations never overlap, and
+    statuses follow the stay's position relative to today. Everything is
+    written with ``bulk_create`` so seeding tens of thousands of rows is fast.
+    """
+    rng = random.Random(seed)
+    today = date.today()
+    room_types = [code for code, _ in Room.ROOM_TYPES]
+
+    Room.objects.bulk_create([
+        Room(
+            room_number=f"{prefix}{i:04d}",
+            room_type=room_types[i % len(room_types)],
+            rate=Decimal(rng.choice([450000, 650000, 850000])),
+            floor=i // 20 + 1,
+            max_occupancy=rng.choice([2, 2, 3, 4]),
+        )
+        for i in range(rooms)
+    ])
+    created_rooms = list(Room.objects.filter(room_number__startswith=prefix).order_by('room_number'))
+
+    guest_count = max(reservations // 3, 1)
+    Guest.objects.bulk_create([
+        Guest(name=f"Guest {prefix}{i}", email=f"guest{prefix.lower()}{i}@example.com", phone=f"08{i:09d}")
+        for i in range(guest_count)
+    ])
+    guest_ids = list(Guest.objects.filter(name__startswith=f"Guest {prefix}").values_list('id', flat=True))
+
+    per_room = max(reservations // max(rooms, 1), 1)
+    if start_date is None:
+        # Centre the history on today so there are past, current and future stays
+        start_date = today - timedelta(days=per_room * 3)
+
+    batch = []
+    for room in created_rooms:
+        cursor = start_date + timedelta(days=rng.randint(0, 3))
+        for _ in range(per_room):
+            nights = rng.randint(1, 5)
+            check_in = cursor
+            check_out = check_in + timedelta(days=nights)
+            cursor = check_out + timedelta(days=rng.randint(0, 2))
+
+            if check_out < today:
+                status = rng.choice(['checked_out'] * 8 + ['canceled', 'no_show'])
+            elif check_in <= today:
+                status = 'in_house'
+            else:
+                status = rng.choice(['confirmed'] * 3 + ['pending'])
+
+            amount = room.rate * nights
+            batch.append(Reservation(
+                guest_id=rng.choice(guest_ids),
+                room=room,
+                check_in=check_in,
+                check_out=check_out,
+                num_guests=rng.randint(1, room.max_occupancy),
+                status=status,
+                base_amount=amount,
+                total_amount=amount,
+            ))
+    Reservation.objects.bulk_create(batch, batch_size=1000)
+    # bulk_create bypasses Reservation.save(), so fill the ledger explicitly
+    sync_reservations(Reservation.objects.filter(room__in=created_rooms))
+    return created_rooms
+
+
+FIRST_NAMES = ['Ayu', 'Budi', 'Citra', 'Dewi', 'Eka', 'Fajar', 'Gita', 'Hadi', 'Indah', 'Joko', 'Kadek', 'Lina',
+               'Made', 'Nyoman', 'Oka', 'Putu', 'Rina', 'Sari', 'Tono', 'Wayan', 'Anna', 'James', 'Maria', 'Oliver',
+               'Sophie', 'Lucas', 'Emma', 'Noah', 'Mia', 'Liam', 'Yuki', 'Hana', 'Chen', 'Wei', 'Lars', 'Ingrid']
+LAST_NAMES = ['Santoso', 'Wijaya', 'Pratama', 'Saputra', 'Kusuma', 'Hartono', 'Suryadi', 'Gunawan', 'Sudarma',
+              'Smith', 'Jones', 'Brown', 'Miller', 'Garcia', 'Martin', 'Muller', 'Rossi', 'Tanaka', 'Suzuki',
+              'Nguyen', 'Kim', 'Wong', 'Larsen', 'Jensen', 'Dubois', 'Novak', 'Silva', 'Costa', 'Murphy', 'Kelly']
+
+
+def seed_guests(count, seed=0, batch_size=5000):
+    """Create ``count`` guests with varied names, emails and phone numbers."""
+    rng = random.Random(seed)
+    created = 0
+    while created < count:
+        batch = []
+        for i in range(created, min(created + batch_size, count)):
+            first, last = rng.choice(FIRST_NAMES), rng.choice(LAST_NAMES)
+            batch.append(Guest(
+                name=f"{first} {last} {i}",
+                email=f"{first.lower()}.{last.lower()}{i}@example.com",
+                phone=f"+62 8{rng.randint(10, 99)} {rng.randint(1000000, 9999999)}",
+            ))
+        Guest.objects.bulk_create(batch)
+        created += len(batch)
+    return created
@@ -1,34 +1,44 @@
-from django.db.models.signals import post_save, pre_save
-from django.dispatch import receiver
-from django.core.cache import cache
-from .models import Reservation
+from django.db import transaction
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver, Signal
+from .models import Reservation, Room, rooms_status_changed
 from .email_service import email_service
+from .availability import stay_index, availability_calendar
+from .dashboard import invalidate_dashboard
+from .report_cache import invalidate_reports
+from .events import publish
 import logging
 
 logger = logging.getLogger(__name__)
 
-@receiver(pre_save, sender=Reservation)
-def store_previous_status(sender, instance, **kwargs):
-    """Store the previous status before saving to detect status changes"""
-    if instance.pk:
-        try:
-            previous = Reservation.objects.get(pk=instance.pk)
-            cache.set(f'reservation_previous_status_{instance.pk}', previous.status, timeout=300)
-        except Reservation.DoesNotExist:
-            pass
+# Statuses that trigger a guest email when a reservation moves into them
+NOTIFY_STATUSES = ['pending', 'confirmed', 'expected_arrival', 'expected_departure']
+
+# Sent by ReservationQuerySet.set_status() after a bulk status UPDATE, which sends no post_save.
+# Arguments: reservation_ids, status, notify
+reservations_status_changed = Signal()
+
+
+def notify_reservation(reservation, notification_type):
+    """Send one reservation notification email, logging the outcome"""
+    try:
+        success = email_service.send_reservation_notification(reservation, notification_type)
+        if success:
+            logger.info(f"Email notification sent for reservation {reservation.id} - {notification_type}")
+        else:
+            logger.warning(f"Failed to send email notification for reservation {reservation.id} - {notification_type}")
+    except Exception as e:
+        logger.error(f"Error sending email notification for reservation {reservation.id}: {str(e)}")
+
 
 @receiver(post_save, sender=Reservation)
 def send_reservation_notification(sender, instance, created, **kwargs):
     """Send email notification when reservation status changes"""
     
-    # Get previous status from cache
-    previous_status = cache.get(f'reservation_previous_status_{instance.pk}')
+    # Status as loaded from the database (see Reservation.from_db); no extra query needed
+    previous_status = instance.loaded_value('status')
     current_status = instance.status
     
-    # Clear the cache
-    if instance.pk:
-        cache.delete(f'reservation_previous_status_{instance.pk}')
-    
     # Determine if we should send an email
     should_send_email = False
     notification_type = None
@@ -39,17 +49,142 @@ def send_reservation_notification(sender, instance, created, **kwargs):
         notification_type = 'pending'
     elif previous_status and previous_status != current_status:
         # Status changed
-        if current_status in ['pending', 'confirmed', 'expected_arrival', 'expected_departure']:
+        if current_status in NOTIFY_STATUSES:
             should_send_email = True
             notification_type = current_status
     
     # Send email if conditions are met
     if should_send_email and notification_type:
-        try:
-            success = email_service.send_reservation_notification(instance, notification_type)
-            if success:
-                logger.info(f"Email notification sent for reservation {instance.id} - {notification_type}")
-            else:
-                logger.warning(f"Failed to send email notification for reservation {instance.id} - {notification_type}")
-        except Exception as e:
-            logger.error(f"Error sending email notification for reservation {instance.id}: {str(e)}")
\ No newline at end of file
+        notify_reservation(instance, notification_type)
+
+
+@receiver(reservations_status_changed)
+def handle_bulk_status_change(sender, reservation_ids, status, notify=True, **kwargs):
+    """Bring the ledger and in-memory indexes up to date after a bulk status change,
+    then queue the notifications until the transaction commits"""
+    from .ledger import sync_reservation_ids
+
+    sync_reservation_ids(reservation_ids)
+    transaction.on_commit(stay_index.invalidate)
+    transaction.on_commit(availability_calendar.invalidate)
+    transaction.on_commit(invalidate_dashboard)
+
+    reservation_ids = list(reservation_ids)
+    ranges = stay_ranges(reservation_ids)
+    transaction.on_commit(lambda: invalidate_reports(*ranges))
+    transaction.on_commit(lambda: publish('reservation_status', {'ids': reservation_ids, 'status': status}))
+
+    if notify and status in NOTIFY_STATUSES:
+        transaction.on_commit(lambda: send_bulk_notifications(reservation_ids, status))
+
+
+def stay_ranges(reservation_ids, chunk_size=500):
+    """(first check-in, last check-out) of each chunk of ``reservation_ids``, for report invalidation"""
+    from django.db.models import Max, Min
+
+    ranges = []
+    for i in range(0, len(reservation_ids), chunk_size):
+        span = Reservation.objects.filter(pk__in=reservation_ids[i:i + chunk_size]).aggregate(
+            first=Min('check_in'), last=Max('check_out')
+        )
+        ranges.append((span['first'], span['last']))
+    return ranges
+
+
+def send_bulk_notifications(reservation_ids, notification_type, chunk_size=500):
+    """Notify every reservation that is still in ``notification_type``"""
+    for i in range(0, len(reservation_ids), chunk_size):
+        reservations = Reservation.objects.filter(
+            pk__in=reservation_ids[i:i + chunk_size], status=notification_type
+        ).select_related('guest', 'room')
+        for reservation in reservations:
+            notify_reservation(reservation, notification_type)
+
+
+@receiver(post_save, sender=Reservation)
+def update_stay_index(sender, instance, **kwargs):
+    """Apply the saved reservation to the in-memory stay index once committed"""
+    fields = (instance.pk, instance.room_id, instance.check_in, instance.check_out, instance.status)
+    transaction.on_commit(lambda: stay_index.update(*fields))
+    transaction.on_commit(availability_calendar.invalidate)
+
+
+@receiver(post_delete, sender=Reservation)
+def remove_from_stay_index(sender, instance, **kwargs):
+    """Drop the deleted reservation from the in-memory stay index once committed"""
+    reservation_id = instance.pk
+    transaction.on_commit(lambda: stay_index.update(reservation_id))
+    transaction.on_commit(availability_calendar.invalidate)
+
+
+@receiver(post_save, sender=Room)
+def refresh_availability_calendar(sender, instance, **kwargs):
+    """Room status and maintenance dates feed the availability bitmaps"""
+    transaction.on_commit(availability_calendar.invalidate)
+
+
+@receiver([post_save, post_delete], sender=Reservation)
+@receiver([post_save, post_delete], sender=Room)
+def refresh_dashboard_snapshot(sender, **kwargs):
+    """Counters and room cards change with any reservation or room write"""
+    transaction.on_commit(invalidate_dashboard)
+
+
+@receiver([post_save, post_delete], sender=Reservation)
+def expire_cached_reports(sender, instance, **kwargs):
+    """Cached reports covering the stay's dates, before and after the write, are stale"""
+    ranges = [(instance.check_in, instance.check_out)]
+    if instance.loaded_value('check_in') is not None:
+        ranges.append((instance.loaded_value('check_in'), instance.loaded_value('check_out')))
+    transaction.on_commit(lambda: invalidate_reports(*ranges))
+
+
+@receiver(post_save, sender=Room)
+def expire_cached_room_reports(sender, instance, created=False, **kwargs):
+    """A new room changes every report's inventory; other room writes only the live room board"""
+    if created:
+        transaction.on_commit(invalidate_reports)
+    else:
+        transaction.on_commit(lambda: invalidate_reports(rooms=True))
+
+
+@receiver(post_delete, sender=Room)
+def expire_reports_for_deleted_room(sender, **kwargs):
+    transaction.on_commit(invalidate_reports)
+
+
+@receiver(post_save, sender=Reservation)
+def publish_reservation_status(sender, instance, created, **kwargs):
+    """Push new reservations and status transitions to live dashboards"""
+    previous_status = instance.loaded_value('status')
+    if created or previous_status != instance.status:
+        data = {'ids': [instance.pk], 'status': instance.status, 'previous_status': previous_status}
+        transaction.on_commit(lambda: publish('reservation_status', data))
+
+
+@receiver(post_save, sender=Room)
+def publish_room_status(sender, instance, update_fields=None, **kwargs):
+    """Push room status changes (including Room.update_status) to live dashboards"""
+    if update_fields is None or 'status' in update_fields:
+        data = {'rooms': [room_event_data(instance)]}
+        transaction.on_commit(lambda: publish('room_status', data))
+
+
+@receiver(rooms_status_changed)
+def handle_bulk_room_status_change(sender, rooms, **kwargs):
+    """Refresh the availability bitmaps, dashboard and reports after a bulk room status
+    update, and push the new statuses to live dashboards once committed"""
+    transaction.on_commit(availability_calendar.invalidate)
+    transaction.on_commit(invalidate_dashboard)
+    transaction.on_commit(lambda: invalidate_reports(rooms=True))
+    data = {'rooms': [room_event_data(room) for room in rooms]}
+    transaction.on_commit(lambda: publish('room_status', data))
+
+
+def room_event_data(room):
+    return {
+        'id': room.pk,
+        'room_number': room.room_number,
+        'status': room.status,
+        'status_display': room.get_status_display(),
+    }
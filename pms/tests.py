@@ -1,3 +1,1713 @@
-from django.test import TestCase
+import asyncio
+import json
+import os
+import re
+import gzip
+import io
+import time
+import uuid
+from datetime import date, datetime, timedelta
+from decimal import Decimal
+from unittest import mock, skipUnless
 
-# Create your tests here.
+from django.core.cache import cache
+from django.core.management import CommandError, call_command
+from django.db import connection, transaction
+from django.db.models import Count, Exists, OuterRef, Q
+from django.test import RequestFactory, SimpleTestCase, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import URLPattern, URLResolver, reverse
+from django.utils import timezone
+
+from .availability import AvailabilityCalendar, StayIndex, first_conflict, overlapping_reservations, stay_index
+from .dashboard import dashboard_snapshot
+from .events import InProcessBroker, publish
+from .forecasting import HoltWinters, ledger_forecast, ledger_models
+from .ledger import check_ledger, nightly_revenue, sync_reservation, sync_reservations
+from .models import Room, RoomNight, Guest, Reservation, PaymentMethod, Agent, ReportJob, rooms_status_changed
+from .night_audit import run_night_audit
+from .occupancy import OCCUPIED_STATUSES, OccupancyMatrix
+from .pagination import ClosestDatePaginator, KeysetPaginator, encode_cursor
+from .report_cache import REPORTS, cache_is_shared, entry_timeout, report_cache_stats
+from .responses import json_response
+from .revenue import RevenueSummary
+from .search import SEARCH_TABLE, search_guests, search_index_available, search_reservations
+from .seed import seed_hotel
+from .trends import BookingTrends, add_months, month_end
+from .views import status_events
+
+class JsonResponseTests(SimpleTestCase):
+    payload = {
+        'rate': Decimal('450000.50'),
+        'day': date(2025, 8, 1),
+        'seen': datetime.fromisoformat('2025-08-01T09:30:15+00:00'),
+        'id': uuid.UUID(int=1),
+        1: 'non-string key',
+        'name': 'Kamar Bunga',
+    }
+    expected = {
+        'rate': 450000.5,
+        'day': '2025-08-01',
+        'seen': '2025-08-01T09:30:15+00:00',
+        'id': '00000000-0000-0000-0000-000000000001',
+        '1': 'non-string key',
+        'name': 'Kamar Bunga',
+    }
+
+    def test_encoders_agree(self):
+        fast = json_response(self.payload)
+        with mock.patch('pms.responses.orjson', None):
+            fallback = json_response(self.payload)
+        self.assertEqual(json.loads(fast.content), self.expected)
+        self.assertEqual(fast.content, fallback.content)
+        self.assertEqual(fast['Content-Type'], 'application/json')
+
+    @override_settings(PMS_JSON_GZIP_MIN_BYTES=1024)
+    def test_gzip_large_bodies(self):
+        factory = RequestFactory()
+        rows = [self.payload] * 100
+        compressed = json_response(rows, factory.get('/', HTTP_ACCEPT_ENCODING='gzip, deflate'))
+        self.assertEqual(compressed['Content-Encoding'], 'gzip')
+        self.assertEqual(compressed['Vary'], 'Accept-Encoding')
+        self.assertEqual(json.loads(gzip.decompress(compressed.content)), [self.expected] * 100)
+
+        self.assertFalse(json_response(rows, factory.get('/')).has_header('Content-Encoding'))
+        small = json_response(self.payload, factory.get('/', HTTP_ACCEPT_ENCODING='gzip'))
+        self.assertFalse(small.has_header('Content-Encoding'))
+        self.assertEqual(small['Vary'], 'Accept-Encoding')
+
+
+# Tables that grow with every booking; queries on them must be served by an index
+INDEXED_TABLES = ['pms_reservation', 'pms_roomnight']
+
+
+@skipUnless(connection.vendor == 'sqlite', 'EXPLAIN QUERY PLAN output is SQLite specific')
+class QueryPlanTests(TestCase):
+    """Fails when a hot query falls back to a full scan of a large table.
+
+    Every query a code path runs is captured with its parameters and run
+    through ``EXPLAIN QUERY PLAN``; a ``SCAN`` of ``pms_reservation`` or
+    ``pms_roomnight`` (under any alias) is reported with the offending SQL.
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        seed_hotel(rooms=6, reservations=120)
+        cls.room = Room.objects.order_by('id').first()
+        cls.today = date.today()
+
+    def setUp(self):
+        # Make the stay index load inside the test, so its query is checked too
+        stay_index.invalidate()
+
+    def capture(self, func, *args, **kwargs):
+        """Run ``func`` and return its result and the (sql, params) of every SELECT it executed."""
+        executed = []
+
+        def recorder(execute, sql, params, many, context):
+            if sql.lstrip().upper().startswith('SELECT'):
+                executed.append((sql, params))
+            return execute(sql, params, many, context)
+
+        with connection.execute_wrapper(recorder):
+            result = func(*args, **kwargs)
+        return result, executed
+
+    def full_scans(self, sql, params):
+        """Plan lines of ``sql`` that scan one of INDEXED_TABLES."""
+        names = set(INDEXED_TABLES)
+        for table in INDEXED_TABLES:
+            # Subqueries refer to the table by an alias such as U0
+            names.update(re.findall(rf'"{table}" (\w+)', sql))
+        with connection.cursor() as cursor:
+            cursor.execute(f'EXPLAIN QUERY PLAN {sql}', params)
+            plan = [row[-1] for row in cursor.fetchall()]
+        return [line for line in plan if re.match(r'SCAN (\w+)', line) and line.split()[1] in names]
+
+    def assertIndexed(self, queries):
+        self.assertTrue(queries, 'No queries were captured')
+        for sql, params in queries:
+            scans = self.full_scans(sql, params)
+            self.assertFalse(scans, f'Full table scan {scans} in:\n{sql}')
+
+    def assertQuerysetIndexed(self, queryset):
+        self.assertIndexed([queryset.query.sql_with_params()])
+
+    def test_overlapping_reservations(self):
+        self.assertQuerysetIndexed(overlapping_reservations(self.room, self.today, self.today + timedelta(days=3)))
+
+    def test_check_reservation_conflict(self):
+        stay = Reservation.objects.filter(room=self.room, status='in_house').first() or \
+            Reservation.objects.filter(room=self.room, check_in__gt=self.today, status='confirmed').first()
+        response, queries = self.capture(self.client.get, reverse('check_reservation_conflict'), {
+            'room_id': self.room.id,
+            'check_in': stay.check_in.isoformat(),
+            'check_out': stay.check_out.isoformat(),
+        })
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.json()['conflict'])
+        self.assertIndexed(queries)
+
+    def test_check_available_rooms(self):
+        response, queries = self.capture(self.client.get, reverse('check_available_rooms'), {
+            'check_in': self.today.isoformat(),
+            'check_out': (self.today + timedelta(days=2)).isoformat(),
+        })
+        self.assertEqual(response.status_code, 200)
+        self.assertIndexed(queries)
+
+    def test_room_update_status(self):
+        self.room.status = 'vacant_clean'
+        _, queries = self.capture(self.room.update_status, self.today)
+        self.assertIndexed(queries)
+
+    def test_room_update_statuses(self):
+        _, queries = self.capture(Room.objects.update_statuses, self.today)
+        self.assertIndexed(queries)
+
+    def test_room_occupied_subquery(self):
+        active = Reservation.objects.filter(
+            room=OuterRef('pk'), check_in__lte=self.today, check_out__gt=self.today,
+            status__in=Room.ROOM_OCCUPYING_STATUSES
+        )
+        self.assertQuerysetIndexed(Room.objects.annotate(is_occupied=Exists(active)))
+
+    def test_in_house_departures(self):
+        self.assertQuerysetIndexed(Reservation.objects.filter(check_out=self.today, status='in_house'))
+
+    def test_effective_status(self):
+        for status, _ in Reservation.STATUS_CHOICES:
+            with self.subTest(status=status):
+                self.assertQuerysetIndexed(Reservation.objects.in_effective_status(status, self.today))
+
+    def test_report_views(self):
+        for name in ['occupancy_report', 'revenue_report', 'forecast_report', 'operational_report', 'booking_sources_report', 'guest_analytics']:
+            with self.subTest(report=name):
+                response, queries = self.capture(self.client.get, reverse(name))
+                self.assertEqual(response.status_code, 200)
+                self.assertIndexed(queries)
+
+
+def url_names(patterns, namespace=''):
+    """Names (with namespace prefix) of every named pattern in ``patterns``, recursively."""
+    names = set()
+    for pattern in patterns:
+        if isinstance(pattern, URLResolver):
+            prefix = f'{namespace}{pattern.namespace}:' if pattern.namespace else namespace
+            names |= url_names(pattern.url_patterns, prefix)
+        elif isinstance(pattern, URLPattern) and pattern.name:
+            names.add(f'{namespace}{pattern.name}')
+    return names
+
+
+class QueryBudgetTestCase(TestCase):
+    """Base class for query and time budget tests against a realistic hotel.
+
+    A hotel of ``ROOMS`` rooms and ``RESERVATIONS`` reservations is seeded
+    once per class. ``budgets`` maps URL names to (max queries, max seconds);
+    ``exempt`` maps URL names that cannot be requested here to the reason.
+    ``assertUrlsBudgeted`` fails when a URL of the app has neither, so new
+    views cannot skip the harness. Set ``PMS_TEST_TIME_SCALE`` to stretch the
+    time ceilings on slow machines.
+    """
+    ROOMS = 200
+    RESERVATIONS = 20000
+    budgets = {}
+    exempt = {}
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.rooms = seed_hotel(rooms=cls.ROOMS, reservations=cls.RESERVATIONS)
+        cls.room = cls.rooms[0]
+
+    def setUp(self):
+        self._reset()
+        self.client.raise_request_exception = False
+
+    def _reset(self):
+        # Start every request from cold caches so counts do not depend on test order
+        cache.clear()
+        stay_index.invalidate()
+
+    def assertUrlsBudgeted(self, patterns, namespace=''):
+        missing = url_names(patterns, namespace) - set(self.budgets) - set(self.exempt)
+        self.assertFalse(missing, f'URLs without a query budget: {sorted(missing)}')
+
+    def assertWithinBudget(self, name, kwargs=None, method='get', data=None, status=(200, 302), **extra):
+        """Request the URL ``name`` and check it against its budget; returns the response and the SQL run."""
+        max_queries, max_seconds = self.budgets[name]
+        max_seconds *= float(os.environ.get('PMS_TEST_TIME_SCALE', 1))
+        executed = []
+
+        def recorder(execute, sql, params, many, context):
+            executed.append(sql)
+            return execute(sql, params, many, context)
+
+        with connection.execute_wrapper(recorder):
+            started = time.perf_counter()
+            response = getattr(self.client, method)(reverse(name, kwargs=kwargs), data, **extra)
+            elapsed = time.perf_counter() - started
+
+        if status:
+            self.assertIn(response.status_code, status, f'{name} returned {response.status_code}')
+        self.assertLessEqual(
+            len(executed), max_queries,
+            f'{name} ran {len(executed)} queries (budget {max_queries}):\n' + '\n'.join(executed[:20])
+        )
+        self.assertLessEqual(elapsed, max_seconds, f'{name} took {elapsed:.2f} s (budget {max_seconds:.2f} s)')
+        return response, executed
+
+
+class PmsQueryBudgetTests(QueryBudgetTestCase):
+    # Constant query counts: none of these may grow with the number of rooms, guests or reservations
+    budgets = {
+        'dashboard': (5, 2),
+        'dashboard_api': (6, 2),
+        'create_reservation': (1, 1),
+        # One query over the visible window (plus the rooms for the timeline layout);
+        # was two per reservation ever made
+        'calendar_data': (2, 1),
+        'reservations_list': (2, 1),
+        'reservation_detail': (5, 1),
+        'confirm_reservation': (8, 1),
+        'checkin_reservation': (1, 1),
+        'checkout_reservation': (1, 1),
+        'cancel_reservation': (1, 1),
+        'edit_reservation': (3, 1),
+        # Was five queries per room (history, guest, occupancy, current guest and its guest)
+        'rooms_list': (4, 2),
+        'room_detail': (9, 1),
+        # Was three queries per guest row (reservation count and long-stay flag)
+        'guests': (5, 6),
+        # Was one query per reservation for its room
+        'guest_detail': (4, 1),
+        'guest_list_json': (1, 1),
+        'check_reservation_conflict': (2, 1),
+        'check_available_rooms': (2, 1),
+        'check_available_rooms_batch': (2, 1),
+        'flexible_availability': (2, 1),
+        'reports_home': (0, 1),
+        'occupancy_report': (2, 1),
+        # One grouped ledger query; was several per day and per breakdown
+        'revenue_report': (4, 1),
+        # Lookups joined into the reservations query and one grouped query for the
+        # monthly trends; was one query per reservation for its agent and payment method
+        'guest_analytics': (6, 2),
+        # One query grouped by source and status; was about ten per agent and per month
+        'booking_sources_report': (3, 2),
+        # Rooms grouped by type and status, reservations by day and status; was a few per day
+        'operational_report': (8, 1),
+        # One grouped query over arrival days (plus the ledger when the forecast
+        # models are fitted); was two per month and per quarter
+        'forecast_report': (4, 2),
+        'report_job': (1, 1),
+        'report_job_status': (1, 1),
+        'report_job_result': (1, 1),
+    }
+    exempt = {
+        'status_events': 'endless server-sent event stream; it runs no queries',
+    }
+
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        # A future booking: viewing it never moves its status (and writes) as a side effect
+        cls.reservation = Reservation.objects.filter(
+            room=cls.room, status='confirmed', check_in__gt=date.today() + timedelta(days=1)
+        ).first()
+        cls.pending = Reservation.objects.filter(status='pending').first()
+        cls.guest = Guest.objects.annotate(stays=Count('reservation')).order_by('-stays').first()
+
+    def test_every_url_has_a_budget(self):
+        from . import urls
+        self.assertUrlsBudgeted(urls.urlpatterns)
+
+    def test_pages(self):
+        today = date.today()
+        job = {'job_id': ReportJob.objects.create(report='occupancy_report', status='done', progress=100, result='<html></html>').id}
+        reservation = {'reservation_id': self.reservation.id}
+        requests = [
+            ('dashboard', None, None),
+            ('dashboard_api', None, None),
+            ('create_reservation', None, None),
+            ('calendar_data', None, None),
+            ('calendar_data', None, {'start': (today - timedelta(days=6)).isoformat(), 'end': (today + timedelta(days=36)).isoformat()}),
+            ('calendar_data', None, {'since': (timezone.now() - timedelta(minutes=5)).isoformat()}),
+            ('calendar_data', None, {'layout': 'timeline', 'start': today.isoformat(), 'end': (today + timedelta(days=90)).isoformat()}),
+            ('reservations_list', None, None),
+            ('reservations_list', None, {'sort': 'closest'}),
+            ('reservation_detail', reservation, None),
+            ('confirm_reservation', {'reservation_id': self.pending.id}, None),
+            ('checkin_reservation', reservation, None),
+            ('checkout_reservation', reservation, None),
+            ('cancel_reservation', reservation, None),
+            ('edit_reservation', reservation, None),
+            ('rooms_list', None, None),
+            ('room_detail', {'room_id': self.room.id}, None),
+            ('guests', None, None),
+            ('guest_detail', {'guest_id': self.guest.id}, None),
+            ('guest_list_json', None, None),
+            ('check_reservation_conflict', None, {
+                'room_id': self.room.id,
+                'check_in': self.reservation.check_in.isoformat(),
+                'check_out': self.reservation.check_out.isoformat(),
+            }),
+            ('check_available_rooms', None, {
+                'check_in': today.isoformat(), 'check_out': (today + timedelta(days=2)).isoformat(),
+            }),
+            ('flexible_availability', None, {'nights': 2, 'days': 30}),
+            ('reports_home', None, None),
+            ('occupancy_report', None, None),
+            ('revenue_report', None, None),
+            ('guest_analytics', None, None),
+            ('booking_sources_report', None, None),
+            ('operational_report', None, None),
+            ('forecast_report', None, None),
+            ('report_job', job, None),
+            ('report_job_status', job, None),
+            ('report_job_result', job, None),
+        ]
+        for name, kwargs, data in requests:
+            with self.subTest(url=name, params=data):
+                self._reset()
+                self.assertWithinBudget(name, kwargs, data=data)
+
+    def test_availability_batch(self):
+        today = date.today()
+        searches = [
+            {'check_in': (today + timedelta(days=i)).isoformat(), 'check_out': (today + timedelta(days=i + 2)).isoformat()}
+            for i in range(20)
+        ]
+        response, _ = self.assertWithinBudget(
+            'check_available_rooms_batch', method='post',
+            data=json.dumps({'searches': searches}), content_type='application/json'
+        )
+        self.assertEqual(len(response.json()['results']), 20)
+
+    def test_calendar_timeline_matches_events(self):
+        today = date.today()
+        window = {'start': (today - timedelta(days=30)).isoformat(), 'end': (today + timedelta(days=60)).isoformat()}
+        events = self.client.get(reverse('calendar_data'), window).json()
+        timeline = self.client.get(reverse('calendar_data'), {**window, 'layout': 'timeline'}).json()
+
+        start = date.fromisoformat(timeline['start'])
+        columns = timeline['events']
+        decoded = {
+            reservation_id: (
+                (start + timedelta(days=offset)).isoformat(),
+                (start + timedelta(days=offset + length)).isoformat(),
+                timeline['colors'][status],
+            )
+            for reservation_id, offset, length, status in zip(columns['id'], columns['start'], columns['length'], columns['status'])
+        }
+        self.assertEqual(decoded, {event['id']: (event['start'], event['end'], event['color']) for event in events})
+        self.assertEqual(len(timeline['resources']['id']), self.ROOMS)
+        self.assertTrue(set(columns['room']) <= set(timeline['resources']['id']))
+        self.assertEqual(self.client.get(reverse('calendar_data'), {'layout': 'grid'}).status_code, 400)
+
+    def test_revenue_summary_matches_reservations(self):
+        transfer = PaymentMethod.objects.create(name='Transfer', code='transfer')
+        direct = Agent.objects.create(name='Direct')
+        Reservation.objects.filter(id__in=Reservation.objects.order_by('id').values('id')[:5000]).update(
+            payment_method=transfer, agent=direct
+        )
+        start, end = date.today() - timedelta(days=200), date.today() + timedelta(days=165)
+
+        # Expected figures straight from the reservations, prorated night by night
+        revenue = {}
+        nights = {}
+        by_type = {}
+        by_payment = {}
+        stays = Reservation.objects.filter(check_in__lte=end, check_out__gt=start, status__in=OCCUPIED_STATUSES)
+        for stay in stays.select_related('room'):
+            for i, amount in enumerate(nightly_revenue(stay.total_amount, (stay.check_out - stay.check_in).days)):
+                night = stay.check_in + timedelta(days=i)
+                if start <= night <= end:
+                    revenue[night] = revenue.get(night, 0) + amount
+                    nights[night] = nights.get(night, 0) + 1
+                    by_type[stay.room.room_type] = by_type.get(stay.room.room_type, 0) + amount
+                    by_payment[stay.payment_method_id] = by_payment.get(stay.payment_method_id, 0) + amount
+
+        summary = RevenueSummary(start, end)
+        self.assertEqual(summary.daily_revenue, [revenue.get(day, 0) for day in summary.dates])
+        self.assertEqual(summary.daily_nights, [nights.get(day, 0) for day in summary.dates])
+        self.assertEqual({code: totals['revenue'] for code, totals in summary.by_room_type.items()}, by_type)
+        self.assertEqual({key: totals['revenue'] for key, totals in summary.by_payment_method.items()}, by_payment)
+        self.assertEqual(summary.by_agent[direct.id]['revenue'], by_payment[transfer.id])
+        self.assertEqual(summary.revpar, summary.total_revenue / (self.ROOMS * 366))
+
+        room_type = Room.ROOM_TYPES[0][0]
+        filtered = RevenueSummary(start, end, room_type=room_type)
+        self.assertEqual(filtered.total_revenue, by_type[room_type])
+
+    def test_booking_trends_match_reservations(self):
+        # A 31st makes stepping back by 30 days skip or repeat months
+        last_month = date(date.today().year, 3, 1)
+        start, end = add_months(last_month, -11), month_end(last_month)
+
+        monthly = {}
+        quarterly = {}
+        weekdays = {}
+        for stay in Reservation.objects.filter(check_in__range=[start, end], status__in=OCCUPIED_STATUSES):
+            figures = (1, stay.total_amount, (stay.check_out - stay.check_in).days)
+            for buckets, key in [
+                (monthly, stay.check_in.replace(day=1)),
+                (quarterly, f'Q{(stay.check_in.month - 1) // 3 + 1}'),
+                (weekdays, stay.check_in.strftime('%A')),
+            ]:
+                buckets[key] = tuple(a + b for a, b in zip(buckets.get(key, (0, 0, 0)), figures))
+
+        def flat(totals):
+            return (totals['reservations'], totals['revenue'], totals['nights'])
+
+        trends = BookingTrends(start, end)
+        months = trends.monthly(last_month, 12)
+        self.assertEqual([month for month, _ in months], [add_months(start, i) for i in range(12)])
+        self.assertEqual({month: flat(totals) for month, totals in months if totals['reservations']}, monthly)
+        self.assertEqual({quarter: flat(totals) for quarter, totals in trends.quarterly(start, end).items() if totals['reservations']}, quarterly)
+        self.assertEqual({day: flat(totals) for day, totals in trends.by_weekday(start, end).items() if totals['reservations']}, weekdays)
+        self.assertEqual(flat(trends.totals(start, end)), tuple(map(sum, zip(*monthly.values()))))
+
+
+class ReportCacheTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        seed_hotel(rooms=10, reservations=1000)
+
+    def setUp(self):
+        cache.clear()
+
+    def test_reports_are_served_from_cache(self):
+        for name, _ in REPORTS:
+            with self.subTest(report=name):
+                first = self.client.get(reverse(name))
+                with self.assertNumQueries(0):
+                    second = self.client.get(reverse(name))
+                self.assertEqual(second.status_code, 200)
+                self.assertEqual(first.content, second.content)
+        stats = {report['name']: report for report in report_cache_stats()}
+        self.assertEqual(stats['revenue_report']['hit_rate'], 50)
+
+    def test_writes_expire_reports_covering_their_dates(self):
+        today = date.today()
+        past_month = (today.replace(day=1) - timedelta(days=200)).replace(day=1)
+        past = {'start_date': past_month.isoformat(), 'end_date': (past_month + timedelta(days=27)).isoformat()}
+        current = {'start_date': today.replace(day=1).isoformat(), 'end_date': (today + timedelta(days=60)).isoformat()}
+        url = reverse('revenue_report')
+        self.client.get(url, past)
+        self.client.get(url, current)
+
+        reservation = Reservation.objects.filter(check_in__gte=today, check_in__lte=today + timedelta(days=20), status='confirmed').first()
+        reservation.total_amount += 100000
+        with self.captureOnCommitCallbacks(execute=True):
+            reservation.save()
+
+        with self.assertNumQueries(0):
+            self.client.get(url, past)
+        self.client.get(url, current)
+        self.assertEqual(self.revenue_stats(), (1, 3))
+
+        # Moving a stay expires the months it left as well as the ones it moved to
+        moved = Reservation.objects.filter(check_in__gte=past_month, check_out__lte=past_month + timedelta(days=27)).first()
+        moved.check_in += timedelta(days=365)
+        moved.check_out += timedelta(days=365)
+        with self.captureOnCommitCallbacks(execute=True):
+            moved.save()
+        self.client.get(url, past)
+        self.assertEqual(self.revenue_stats(), (1, 4))
+
+    @override_settings(PMS_REPORT_CACHE_TTL=604800, PMS_REPORT_CACHE_LIVE_TTL=600)
+    def test_per_process_cache_keeps_past_reports_briefly(self):
+        # The test cache is local memory: other workers' writes would go unseen for a week
+        self.assertFalse(cache_is_shared())
+        self.assertEqual(entry_timeout(live=False), 600)
+        with mock.patch('pms.report_cache.cache_is_shared', return_value=True):
+            self.assertEqual(entry_timeout(live=False), 604800)
+            self.assertEqual(entry_timeout(live=True), 600)
+
+    def test_forecast_expires_with_the_model_history(self):
+        # Older than the trend months, but inside the ledger history the forecast models read
+        past = date.today() - timedelta(days=600)
+        url = reverse('forecast_report')
+        self.client.get(url)
+        with self.captureOnCommitCallbacks(execute=True):
+            Reservation.objects.create(
+                guest=Guest.objects.first(), room=Room.objects.first(), check_in=past,
+                check_out=past + timedelta(days=2), status='checked_out', total_amount=Decimal('900000'),
+            )
+        self.client.get(url)
+        stats = {report['name']: report for report in report_cache_stats()}['forecast_report']
+        self.assertEqual((stats['hits'], stats['misses']), (0, 2))
+
+    def revenue_stats(self):
+        stats = {report['name']: report for report in report_cache_stats()}['revenue_report']
+        return stats['hits'], stats['misses']
+
+    def test_hub_shows_hit_rates(self):
+        self.client.get(reverse('occupancy_report'))
+        self.client.get(reverse('occupancy_report'))
+        response = self.client.get(reverse('reports_home'))
+        self.assertContains(response, 'Report Cache')
+        self.assertContains(response, '50.0%')
+
+
+@override_settings(PMS_REPORT_JOB_MIN_DAYS=400)
+class ReportJobTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        seed_hotel(rooms=5, reservations=300)
+
+    def setUp(self):
+        cache.clear()
+
+    def run_worker(self):
+        call_command('run_report_worker', processes=0, once=True, stdout=io.StringIO())
+
+    def test_long_windows_are_computed_by_the_worker(self):
+        today = date.today()
+        params = {'start_date': (today - timedelta(days=500)).isoformat(), 'end_date': today.isoformat()}
+        response = self.client.get(reverse('occupancy_report'), params)
+        job = ReportJob.objects.get()
+        self.assertRedirects(response, reverse('report_job', args=[job.id]))
+        self.assertEqual((job.status, job.params), ('queued', params))
+        self.assertContains(self.client.get(reverse('report_job', args=[job.id])), reverse('report_job_status', args=[job.id]))
+
+        # The same request while it is pending joins the queued job
+        self.client.get(reverse('occupancy_report'), params)
+        self.assertEqual(ReportJob.objects.count(), 1)
+
+        self.run_worker()
+        job.refresh_from_db()
+        self.assertEqual((job.status, job.progress), ('done', 100))
+        status = self.client.get(reverse('report_job_status', args=[job.id])).json()
+        self.assertEqual(status['result_url'], reverse('report_job_result', args=[job.id]))
+
+        result = self.client.get(status['result_url'])
+        self.assertContains(result, 'Occupancy')
+        with override_settings(PMS_REPORT_JOB_MIN_DAYS=10000):
+            inline = self.client.get(reverse('occupancy_report'), params)
+        self.assertEqual(result.content.decode(), inline.content.decode())
+
+        download = self.client.get(status['result_url'], {'download': 1})
+        self.assertTrue(download['Content-Disposition'].startswith('attachment; filename="occupancy_report-'))
+
+    def test_short_windows_stay_inline(self):
+        self.assertEqual(self.client.get(reverse('occupancy_report')).status_code, 200)
+        self.assertEqual(self.client.get(reverse('forecast_report')).status_code, 200)
+        self.assertFalse(ReportJob.objects.exists())
+
+    def test_long_forecast_and_failures(self):
+        self.client.get(reverse('forecast_report'), {'forecast_period': '90'})
+        forecast = ReportJob.objects.get(report='forecast_report')
+        broken = ReportJob.objects.create(report='occupancy_report', params={'start_date': 'not-a-date'}, params_key='x')
+
+        self.run_worker()
+        forecast.refresh_from_db()
+        broken.refresh_from_db()
+        self.assertEqual(forecast.status, 'done')
+        self.assertIn('Forecast', forecast.result)
+        self.assertEqual(broken.status, 'failed')
+        self.assertIn('not-a-date', broken.error)
+        self.assertTrue(broken.finished)
+        self.assertIsNotNone(broken.finished_at)
+        self.assertRedirects(
+            self.client.get(reverse('report_job_result', args=[broken.id])), reverse('report_job', args=[broken.id])
+        )
+
+
+class ForecastingTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        seed_hotel(rooms=10, reservations=1000)
+
+    def setUp(self):
+        cache.clear()
+
+    def test_holt_winters_learns_the_week(self):
+        # Weekends sell twice the weekdays, with a slow upward drift
+        series = [(10 if i % 7 < 5 else 20) + i * 0.01 + (i * 37 % 11 - 5) * 0.1 for i in range(364)]
+        model = HoltWinters.fit(series)
+        projections = model.forecast(28)
+        for h, (value, low, high) in enumerate(projections):
+            expected = (10 if (364 + h) % 7 < 5 else 20) + (364 + h) * 0.01
+            self.assertAlmostEqual(value, expected, delta=0.5)
+            self.assertLess(low, value)
+            self.assertLess(value, high)
+        self.assertGreater(projections[-1][2] - projections[-1][1], projections[0][2] - projections[0][1])
+
+        # Folding days in one at a time leaves the same state as running them all at once
+        partial = HoltWinters.fit(series[:300])
+        refolded = HoltWinters.start(series, partial.alpha, partial.beta, partial.gamma)
+        refolded.update(series)
+        partial.update(series[300:])
+        self.assertAlmostEqual(partial.level, refolded.level)
+        self.assertEqual(partial.observations, refolded.observations)
+
+    def test_models_are_cached_and_extended_as_days_close(self):
+        today = date.today()
+        projections = ledger_forecast(30, today, rooms=10)
+        self.assertEqual([day['date'] for day in projections], [today + timedelta(days=i) for i in range(30)])
+        for day in projections:
+            self.assertLessEqual(day['nights_low'], day['nights'])
+            self.assertLessEqual(day['nights'], day['nights_high'])
+            self.assertLessEqual(day['nights_high'], 10)
+            self.assertLessEqual(day['revenue_low'], day['revenue'])
+
+        with self.assertNumQueries(0):
+            ledger_forecast(365, today, rooms=10)
+
+        # The next day only the newly closed day is read and folded in
+        fitted = ledger_models(today)
+        with self.assertNumQueries(1):
+            models = ledger_models(today + timedelta(days=1))
+        self.assertEqual(models['fitted_through'], today)
+        self.assertEqual(models['fitted_on'], fitted['fitted_on'])
+        self.assertEqual(models['nights'].observations, fitted['nights'].observations + 1)
+
+        # A write in a closed month refits from the ledger
+        stay = Reservation.objects.filter(check_out__lt=today.replace(day=1) - timedelta(days=40), status='checked_out').first()
+        stay.total_amount += 100000
+        with self.captureOnCommitCallbacks(execute=True):
+            stay.save()
+        self.assertEqual(ledger_models(today + timedelta(days=1))['fitted_on'], today)
+
+
+class LedgerTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.room = Room.objects.create(room_number='L101', room_type='garden_view', rate=Decimal('500000'))
+        cls.other_room = Room.objects.create(room_number='L102', room_type='mountain_view', rate=Decimal('700000'))
+        cls.guest = Guest.objects.create(name='Ledger Guest')
+        cls.start = date.today() + timedelta(days=10)
+
+    def book(self, nights=3, total='1000000.00', status='confirmed'):
+        return Reservation.objects.create(
+            guest=self.guest, room=self.room, check_in=self.start, check_out=self.start + timedelta(days=nights),
+            status=status, total_amount=Decimal(total),
+        )
+
+    def assertLedgerMatches(self, reservation):
+        """The rows of ``reservation`` are exactly one per night, on its room and status, adding up to its total."""
+        rows = list(RoomNight.objects.filter(reservation=reservation).order_by('date').values_list('room_id', 'date', 'status', 'revenue'))
+        nights = (reservation.check_out - reservation.check_in).days
+        self.assertEqual([(room_id, night, status) for room_id, night, status, _ in rows], [
+            (reservation.room_id, reservation.check_in + timedelta(days=i), reservation.status) for i in range(nights)
+        ])
+        self.assertEqual(sum(revenue for *_, revenue in rows), reservation.total_amount)
+
+    def test_writes_keep_the_rows_exact(self):
+        # 1,000,000 over 3 nights does not split evenly; the last night takes the remainder
+        reservation = self.book()
+        self.assertLedgerMatches(reservation)
+        self.assertEqual(
+            list(RoomNight.objects.filter(reservation=reservation).order_by('date').values_list('revenue', flat=True)),
+            [Decimal('333333.33'), Decimal('333333.33'), Decimal('333333.34')],
+        )
+
+        reservation.check_in -= timedelta(days=2)
+        reservation.check_out += timedelta(days=1)
+        reservation.save()
+        self.assertLedgerMatches(reservation)
+
+        reservation.room = self.other_room
+        reservation.save()
+        self.assertLedgerMatches(reservation)
+        self.assertFalse(RoomNight.objects.filter(room=self.room).exists())
+
+        reservation.status = 'in_house'
+        reservation.total_amount = Decimal('1234567.89')
+        reservation.save()
+        self.assertLedgerMatches(reservation)
+
+        # Non-occupying statuses own no nights; back to an occupying one restores them
+        reservation.status = 'canceled'
+        reservation.save()
+        self.assertFalse(RoomNight.objects.filter(reservation=reservation).exists())
+        reservation.status = 'confirmed'
+        reservation.save()
+        self.assertLedgerMatches(reservation)
+
+        reservation_id = reservation.id
+        reservation.delete()
+        self.assertFalse(RoomNight.objects.filter(reservation_id=reservation_id).exists())
+        self.assertEqual(check_ledger(), {'missing': [], 'unexpected': [], 'mismatched': []})
+
+    def test_set_based_writes_are_resynced(self):
+        first, second = self.book(), self.book(status='pending')
+        Reservation.objects.filter(pk=first.pk).update(check_out=self.start + timedelta(days=5))
+        Reservation.objects.filter(pk=second.pk).update(status='confirmed')
+        sync_reservations(Reservation.objects.filter(pk__in=[first.pk, second.pk]))
+        for reservation in Reservation.objects.filter(pk__in=[first.pk, second.pk]):
+            self.assertLedgerMatches(reservation)
+
+        sync_reservation(Reservation.objects.get(pk=first.pk))
+        self.assertLedgerMatches(Reservation.objects.get(pk=first.pk))
+
+    def test_check_ledger_flags_drift(self):
+        missing, unexpected, mismatched = self.book(), self.book(), self.book()
+        RoomNight.objects.filter(reservation=missing).delete()
+        # update() bypasses save(), leaving nights for a canceled stay
+        Reservation.objects.filter(pk=unexpected.pk).update(status='canceled')
+        RoomNight.objects.filter(reservation=mismatched).update(revenue=1)
+        self.assertEqual(check_ledger(), {
+            'missing': [missing.pk], 'unexpected': [unexpected.pk], 'mismatched': [mismatched.pk],
+        })
+
+        out = io.StringIO()
+        call_command('rebuild_room_nights', '--check', stdout=out)
+        self.assertIn(f'missing: 1 reservation(s): {missing.pk}', out.getvalue())
+        self.assertIn(f'mismatched: 1 reservation(s): {mismatched.pk}', out.getvalue())
+
+        call_command('rebuild_room_nights', stdout=io.StringIO())
+        self.assertEqual(check_ledger(), {'missing': [], 'unexpected': [], 'mismatched': []})
+        out = io.StringIO()
+        call_command('rebuild_room_nights', '--check', stdout=out)
+        self.assertIn('Room-night ledger is consistent', out.getvalue())
+
+
+class StayIndexTests(SimpleTestCase):
+    day = date(2025, 8, 1)
+
+    def d(self, offset):
+        return self.day + timedelta(days=offset)
+
+    def index(self):
+        # Room 1: [0, 3) and [3, 5) back to back; a long legacy stay [10, 20) overlapping [12, 14)
+        return StayIndex.from_rows([
+            (1, self.d(0), self.d(3), 11),
+            (1, self.d(3), self.d(5), 12),
+            (1, self.d(10), self.d(20), 13),
+            (1, self.d(12), self.d(14), 14),
+            (2, self.d(0), self.d(30), 21),
+        ])
+
+    def test_conflicts_and_is_free(self):
+        index = self.index()
+        self.assertEqual(sorted(index.conflicts(1, self.d(2), self.d(4))), [11, 12])
+        # A check-out day is free for the next check-in, in both directions
+        self.assertEqual(index.conflicts(1, self.d(5), self.d(10)), [])
+        self.assertTrue(index.is_free(1, self.d(5), self.d(10)))
+        self.assertEqual(index.conflicts(1, self.d(-2), self.d(0)), [])
+        self.assertTrue(index.is_free(1, self.d(-2), self.d(0)))
+        # The later-starting short stay must not hide the long one that began earlier
+        self.assertEqual(sorted(index.conflicts(1, self.d(16), self.d(18))), [13])
+        self.assertFalse(index.is_free(1, self.d(16), self.d(18)))
+        self.assertEqual(sorted(index.conflicts(1, self.d(13), self.d(15))), [13, 14])
+        self.assertEqual(index.conflicts(1, self.d(13), self.d(15), exclude_pk=13), [14])
+        self.assertTrue(index.is_free(1, self.d(0), self.d(3), exclude_pk=11))
+        self.assertTrue(index.is_free(3, self.d(0), self.d(3)))
+        self.assertEqual(index.free_rooms([1, 2, 3], self.d(6), self.d(8)), [1, 3])
+
+    def test_update(self):
+        index = self.index()
+        # Moving a stay frees its old nights and blocks the new ones
+        index.update(21, room_id=1, check_in=self.d(6), check_out=self.d(8), status='confirmed')
+        self.assertTrue(index.is_free(2, self.d(0), self.d(30)))
+        self.assertEqual(index.conflicts(1, self.d(5), self.d(10)), [21])
+        # A stay that stops being active, and a deleted one, block nothing
+        index.update(21, room_id=1, check_in=self.d(6), check_out=self.d(8), status='canceled')
+        self.assertTrue(index.is_free(1, self.d(5), self.d(10)))
+        index.update(13)
+        self.assertTrue(index.is_free(1, self.d(16), self.d(18)))
+        self.assertEqual(index.conflicts(1, self.d(12), self.d(20)), [14])
+        # New stays land in check-in order
+        index.update(15, room_id=1, check_in=self.d(8), check_out=self.d(9), status='in_house')
+        self.assertEqual(index.conflicts(1, self.d(8), self.d(12)), [15])
+
+
+class ConflictCheckTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.room = Room.objects.create(room_number='C101', room_type='garden_view', rate=Decimal('500000'))
+        cls.guest = Guest.objects.create(name='Conflict Guest')
+        cls.check_in = date.today() + timedelta(days=5)
+
+    def setUp(self):
+        stay_index.invalidate()
+
+    def check(self):
+        return self.client.get(reverse('check_reservation_conflict'), {
+            'room_id': self.room.id,
+            'check_in': self.check_in.isoformat(),
+            'check_out': (self.check_in + timedelta(days=2)).isoformat(),
+        }).json()
+
+    def test_stays_removed_by_another_process_are_not_conflicts(self):
+        stay = Reservation.objects.create(
+            guest=self.guest, room=self.room, check_in=self.check_in,
+            check_out=self.check_in + timedelta(days=3), status='confirmed',
+        )
+        self.assertTrue(self.check()['conflict'])
+        self.assertEqual(first_conflict(self.room.id, self.check_in, self.check_in + timedelta(days=1)), stay)
+
+        # Index updates run on commit, which never happens here: the index still holds the stay
+        stay_id = stay.id
+        stay.delete()
+        self.assertEqual(stay_index.conflicts(self.room.id, self.check_in, self.check_in + timedelta(days=2)), [stay_id])
+        self.assertEqual(self.check(), {'conflict': False})
+        self.assertEqual(stay_index.conflicts(self.room.id, self.check_in, self.check_in + timedelta(days=2)), [])
+
+        other = Reservation.objects.create(
+            guest=self.guest, room=self.room, check_in=self.check_in,
+            check_out=self.check_in + timedelta(days=1), status='confirmed',
+        )
+        stay_index.invalidate()
+        self.assertTrue(self.check()['conflict'])
+        Reservation.objects.filter(pk=other.pk).update(status='canceled')
+        self.assertEqual(self.check(), {'conflict': False})
+
+
+class AvailabilityCalendarTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.today = date.today()
+        guest = Guest.objects.create(name='Calendar Guest')
+        cls.garden = Room.objects.create(room_number='A101', room_type='garden_view', rate=Decimal('500000'), max_occupancy=2)
+        cls.mountain = Room.objects.create(room_number='A102', room_type='mountain_view', rate=Decimal('700000'), max_occupancy=4)
+        # Under maintenance from today through day 4: free again from day 5
+        cls.repair = Room.objects.create(
+            room_number='A103', room_type='garden_view', rate=Decimal('500000'), max_occupancy=2,
+            status='maintenance', maintenance_end_date=cls.today + timedelta(days=4),
+        )
+        # Scheduled maintenance on days 10-11
+        cls.scheduled = Room.objects.create(
+            room_number='A104', room_type='mountain_view', rate=Decimal('700000'), max_occupancy=2,
+            maintenance_start_date=cls.today + timedelta(days=10), maintenance_end_date=cls.today + timedelta(days=11),
+        )
+        for room, first, last, status in [
+            (cls.garden, 1, 3, 'confirmed'),
+            (cls.garden, 3, 4, 'in_house'),
+            (cls.garden, 6, 7, 'canceled'),
+            (cls.mountain, 0, 2, 'expected_arrival'),
+            (cls.mountain, 5, 9, 'pending'),
+        ]:
+            Reservation.objects.create(
+                guest=guest, room=room, check_in=cls.today + timedelta(days=first),
+                check_out=cls.today + timedelta(days=last), status=status,
+            )
+
+    def setUp(self):
+        self.calendar = AvailabilityCalendar(horizon_days=20, ttl=3600)
+
+    def d(self, offset):
+        return self.today + timedelta(days=offset)
+
+    def blocked(self, room, night):
+        """The room is not bookable for ``night`` according to the database."""
+        in_maintenance = room.status in AvailabilityCalendar.BLOCKING_STATUSES and night <= room.maintenance_end_date
+        scheduled = room.maintenance_start_date and room.maintenance_start_date <= night <= room.maintenance_end_date
+        return bool(in_maintenance or scheduled or overlapping_reservations(room, night, night + timedelta(days=1)).exists())
+
+    def test_inventory_counts_free_rooms_per_night(self):
+        rooms = [self.garden, self.mountain, self.repair, self.scheduled]
+        expected = [sum(not self.blocked(room, self.d(i)) for room in rooms) for i in range(20)]
+        self.assertEqual(self.calendar.inventory(self.today, 20), expected)
+        self.assertEqual(self.calendar.inventory(self.d(-2), 4), [None, None] + expected[:2])
+        self.assertEqual(self.calendar.inventory(self.d(18), 4), expected[18:] + [None, None])
+
+        mountain = [sum(not self.blocked(room, self.d(i)) for room in [self.mountain, self.scheduled]) for i in range(20)]
+        self.assertEqual(self.calendar.inventory(self.today, 20, room_type='mountain_view'), mountain)
+        self.assertEqual(self.calendar.inventory(self.today, 3, guests=3), [0, 0, 1])
+
+    def test_flexible_search(self):
+        windows = dict(self.calendar.flexible_search(2, self.today, 8))
+        for offset in range(8):
+            check_in = self.d(offset)
+            expected = [
+                room for room in [self.garden, self.mountain, self.repair, self.scheduled]
+                if not any(self.blocked(room, check_in + timedelta(days=n)) for n in range(2))
+            ]
+            self.assertEqual(windows.get(check_in, []), expected, check_in)
+
+        # Rooms under maintenance stay blocked through their end date, scheduled ones during their window
+        self.assertNotIn(self.repair, windows[self.d(3)])
+        self.assertIn(self.repair, windows[self.d(5)])
+        self.assertEqual(dict(self.calendar.flexible_search(2, self.d(9), 3, room_type='mountain_view')), {
+            self.d(9): [self.mountain],
+            self.d(10): [self.mountain],
+            self.d(11): [self.mountain],
+        })
+        # Windows never run past the horizon
+        self.assertEqual([check_in for check_in, _ in self.calendar.flexible_search(3, self.d(16), 10)], [self.d(16), self.d(17)])
+        self.assertEqual(self.calendar.flexible_search(0, self.today, 5), [])
+
+    def test_free_for(self):
+        self.assertTrue(self.calendar.free_for(self.garden.id, self.d(4), self.d(10)))
+        self.assertFalse(self.calendar.free_for(self.garden.id, self.d(2), self.d(5)))
+        self.assertFalse(self.calendar.free_for(self.scheduled.id, self.d(11), self.d(13)))
+        self.assertFalse(self.calendar.free_for(0, self.d(4), self.d(5)))
+
+
+class PaginationTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.anchor = date(2025, 6, 15)
+        guest = Guest.objects.create(name='Paging Guest')
+        room = Room.objects.create(room_number='P101', room_type='garden_view', rate=Decimal('500000'))
+        cash = PaymentMethod.objects.create(name='Paging Cash')
+        # Runs of equal check-in dates on both sides of the anchor, with and without a payment method
+        for offset in [-9, -3, -3, -3, -1, 0, 0, 0, 0, 1, 3, 3, 3, 9, 9]:
+            check_in = cls.anchor + timedelta(days=offset)
+            Reservation.objects.create(
+                guest=guest, room=room, check_in=check_in, check_out=check_in + timedelta(days=1),
+                payment_method=cash if offset % 2 else None, status='canceled',
+            )
+        cls.reservations = list(Reservation.objects.select_related('payment_method'))
+
+    def walk(self, paginator):
+        """Ids of every row following next cursors from the first page, checked against the walk back by previous cursors."""
+        forward = []
+        page = paginator.page()
+        self.assertFalse(page.has_previous)
+        while True:
+            forward.extend(obj.pk for obj in page)
+            if not page.has_next:
+                break
+            page = paginator.page(page.next_cursor)
+        backward = [obj.pk for obj in page]
+        while page.has_previous:
+            page = paginator.page(page.previous_cursor)
+            self.assertTrue(page.has_next)
+            backward[:0] = [obj.pk for obj in page]
+        self.assertEqual(backward, forward)
+        return forward
+
+    def closest_order(self, anchor):
+        def position(obj):
+            upcoming = obj.check_in >= anchor
+            return (abs((obj.check_in - anchor).days), 0 if upcoming else 1, obj.pk if upcoming else -obj.pk)
+        return [obj.pk for obj in sorted(self.reservations, key=position)]
+
+    def test_keyset_walks_every_row_once(self):
+        queryset = Reservation.objects.all()
+        orderings = {
+            'check_in': lambda obj: (obj.check_in, obj.pk),
+            '-check_in': lambda obj: (-obj.check_in.toordinal(), -obj.pk),
+        }
+        for ordering, key in orderings.items():
+            for page_size in (1, 4, 15, 50):
+                with self.subTest(ordering=ordering, page_size=page_size):
+                    paginator = KeysetPaginator(queryset, [ordering], page_size=page_size)
+                    self.assertEqual(self.walk(paginator), [obj.pk for obj in sorted(self.reservations, key=key)])
+
+        # NULL payment methods sort as the empty name
+        paginator = KeysetPaginator(queryset, ['payment_method__name'], page_size=4, nullable={'payment_method__name': ''})
+        expected = sorted(self.reservations, key=lambda obj: (obj.payment_method.name if obj.payment_method else '', obj.pk))
+        self.assertEqual(self.walk(paginator), [obj.pk for obj in expected])
+
+    def test_closest_date_walks_every_row_once(self):
+        first, last = min(obj.check_in for obj in self.reservations), max(obj.check_in for obj in self.reservations)
+        # An anchor on a run of equal dates, and at and beyond either edge of the data
+        for anchor in [self.anchor, first, first - timedelta(days=5), last, last + timedelta(days=5)]:
+            for page_size in (1, 4, 15, 50):
+                with self.subTest(anchor=anchor, page_size=page_size):
+                    paginator = ClosestDatePaginator(Reservation.objects.all(), 'check_in', page_size=page_size, anchor=anchor)
+                    self.assertEqual(self.walk(paginator), self.closest_order(anchor))
+
+    def test_cursor_keeps_its_anchor(self):
+        paginator = ClosestDatePaginator(Reservation.objects.all(), 'check_in', page_size=4, anchor=self.anchor)
+        cursor = paginator.page().next_cursor
+        # The next day's paginator continues the walk started on the old anchor
+        later = ClosestDatePaginator(Reservation.objects.all(), 'check_in', page_size=4, anchor=self.anchor + timedelta(days=1))
+        self.assertEqual([obj.pk for obj in later.page(cursor)], self.closest_order(self.anchor)[4:8])
+
+    def test_stale_cursor_continues_after_the_deleted_row(self):
+        for paginator, expected in [
+            (KeysetPaginator(Reservation.objects.all(), ['check_in'], page_size=4),
+             [obj.pk for obj in sorted(self.reservations, key=lambda obj: (obj.check_in, obj.pk))]),
+            (ClosestDatePaginator(Reservation.objects.all(), 'check_in', page_size=4, anchor=self.anchor),
+             self.closest_order(self.anchor)),
+        ]:
+            with self.subTest(paginator=type(paginator).__name__):
+                page = paginator.page()
+                last = page.object_list[-1]
+                with transaction.atomic():
+                    Reservation.objects.filter(pk=last.pk).delete()
+                    self.assertEqual([obj.pk for obj in paginator.page(page.next_cursor)], expected[4:8])
+                    # Walking back from the next page skips the deleted row too
+                    following = paginator.page(page.next_cursor)
+                    self.assertEqual([obj.pk for obj in paginator.page(following.previous_cursor)], expected[:3])
+                    transaction.set_rollback(True)
+
+    def test_invalid_cursor_shows_the_first_page(self):
+        keyset = KeysetPaginator(Reservation.objects.all(), ['check_in'], page_size=4)
+        closest = ClosestDatePaginator(Reservation.objects.all(), 'check_in', page_size=4, anchor=self.anchor)
+        cursors = [
+            'not-a-cursor',
+            '!!!',
+            encode_cursor('sideways', ['2025-06-15', 1]),
+            encode_cursor('after', 'values'),
+            encode_cursor('after', ['2025-06-15']),
+            encode_cursor('after', ['2025-06-15', 'not-a-date', 1]),
+            encode_cursor('after', ['2025-06-15', '2025-06-15', 'not-an-id']),
+            encode_cursor('after', ['not-a-date', 1]),
+            encode_cursor('after', ['2025-06-15', 'not-an-id']),
+            encode_cursor('after', [None, 1]),
+            encode_cursor('after', [['2025-06-15'], 1]),
+        ]
+        for paginator in (keyset, closest):
+            first = [obj.pk for obj in paginator.page()]
+            for cursor in cursors:
+                with self.subTest(paginator=type(paginator).__name__, cursor=cursor):
+                    page = paginator.page(cursor)
+                    self.assertEqual([obj.pk for obj in page], first)
+                    self.assertFalse(page.has_previous)
+
+    def test_reservations_list_pages(self):
+        with mock.patch('pms.views.RESERVATIONS_PAGE_SIZE', 4):
+            response = self.client.get(reverse('reservations_list'), {'cursor': 'garbage'})
+            self.assertEqual(response.status_code, 200)
+            self.assertIsNone(response.context['previous_page_url'])
+            next_url = response.context['next_page_url']
+            response = self.client.get(reverse('reservations_list') + next_url)
+            self.assertEqual(response.status_code, 200)
+            self.assertIsNotNone(response.context['previous_page_url'])
+
+    def test_reservations_list_ignores_tampered_cursors(self):
+        cases = [
+            ({}, ['garbage', 1]),
+            ({'sort': 'guest'}, [None, 1]),
+            ({'sort': 'id'}, ['x']),
+            ({'sort': 'id'}, ['x', 'y']),
+        ]
+        for params, values in cases:
+            with self.subTest(params=params, values=values):
+                response = self.client.get(
+                    reverse('reservations_list'), {**params, 'cursor': encode_cursor('after', values)}
+                )
+                self.assertEqual(response.status_code, 200)
+                self.assertIsNone(response.context['previous_page_url'])
+
+
+class NightAuditTests(TestCase):
+    day = date(2025, 3, 10)
+
+    @classmethod
+    def setUpTestData(cls):
+        guest = Guest.objects.create(name='Audit Guest', email='audit@example.com')
+        rooms = [
+            Room.objects.create(room_number=f'N{number}', room_type='garden_view', rate=Decimal('500000'))
+            for number in range(101, 108)
+        ]
+
+        def stay(room, first, last, status):
+            return Reservation.objects.create(
+                guest=guest, room=room, check_in=cls.day + timedelta(days=first),
+                check_out=cls.day + timedelta(days=last), status=status, total_amount=Decimal('900000'),
+            )
+
+        cls.missed = stay(rooms[0], -1, 2, 'confirmed')
+        cls.missed_arrival = stay(rooms[1], -2, 1, 'expected_arrival')
+        cls.arriving = stay(rooms[2], 0, 3, 'confirmed')
+        cls.departing = stay(rooms[3], -3, 0, 'in_house')
+        cls.untouched = [
+            stay(rooms[4], -1, 2, 'in_house'),
+            stay(rooms[5], 1, 3, 'confirmed'),
+            stay(rooms[6], -1, 1, 'canceled'),
+        ]
+        # Room statuses from before the audit: the no-show's room still shows occupied, the arrival's vacant
+        Room.objects.filter(pk=rooms[0].pk).update(status='occupied')
+        Room.objects.filter(pk=rooms[2].pk).update(status='vacant_clean')
+        Room.objects.filter(pk=rooms[4].pk).update(status='occupied')
+        cls.rooms = rooms
+
+    def setUp(self):
+        patcher = mock.patch('pms.signals.email_service.send_reservation_notification', return_value=True)
+        self.send = patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def statuses(self):
+        return dict(Reservation.objects.values_list('id', 'status'))
+
+    def room_statuses(self):
+        return [room.status for room in Room.objects.order_by('room_number')]
+
+    def audit(self, *args, **kwargs):
+        with self.captureOnCommitCallbacks(execute=True):
+            return run_night_audit(*args, **kwargs)
+
+    def test_transitions_for_the_business_date(self):
+        before = self.statuses()
+        changed = self.audit(self.day)
+        self.assertEqual({status: sorted(ids) for status, ids in changed.items()}, {
+            'no_show': sorted([self.missed.pk, self.missed_arrival.pk]),
+            'expected_arrival': [self.arriving.pk],
+            'expected_departure': [self.departing.pk],
+        })
+        after = self.statuses()
+        self.assertEqual(after[self.missed.pk], 'no_show')
+        self.assertEqual(after[self.missed_arrival.pk], 'no_show')
+        self.assertEqual(after[self.arriving.pk], 'expected_arrival')
+        self.assertEqual(after[self.departing.pk], 'expected_departure')
+        for reservation in self.untouched:
+            self.assertEqual(after[reservation.pk], before[reservation.pk])
+
+        # The ledger follows the new statuses and the rooms are recomputed for the business date
+        self.assertEqual(check_ledger(), {'missing': [], 'unexpected': [], 'mismatched': []})
+        self.assertEqual(set(RoomNight.objects.filter(reservation=self.missed).values_list('status', flat=True)), {'no_show'})
+        self.assertEqual(self.room_statuses(), [
+            'vacant_clean', 'vacant_clean', 'occupied', 'vacant_clean', 'occupied', 'vacant_clean', 'vacant_clean',
+        ])
+        self.assertIsNotNone(Room.objects.get(pk=self.rooms[0].pk).status_changed_at)
+
+        # Guests are told about arrivals and departures, not about no-shows
+        notified = sorted((call.args[0].pk, call.args[1]) for call in self.send.call_args_list)
+        self.assertEqual(notified, sorted([
+            (self.arriving.pk, 'expected_arrival'), (self.departing.pk, 'expected_departure'),
+        ]))
+
+    def test_second_run_changes_nothing(self):
+        self.audit(self.day)
+        statuses, rooms = self.statuses(), self.room_statuses()
+        self.send.reset_mock()
+        with CaptureQueriesContext(connection) as queries:
+            changed = self.audit(self.day)
+        self.assertFalse([query['sql'] for query in queries if query['sql'].startswith(('UPDATE', 'INSERT', 'DELETE'))])
+        self.assertEqual(changed, {'no_show': [], 'expected_arrival': [], 'expected_departure': []})
+        self.assertEqual(self.statuses(), statuses)
+        self.assertEqual(self.room_statuses(), rooms)
+        self.send.assert_not_called()
+
+    def test_dry_run_writes_nothing(self):
+        statuses, rooms = self.statuses(), self.room_statuses()
+        nights = list(RoomNight.objects.order_by('id').values_list('id', 'status'))
+        out = io.StringIO()
+        call_command('night_audit', '--date', self.day.isoformat(), '--dry-run', stdout=out)
+        self.assertIn('Would move 2 reservation(s) to no_show', out.getvalue())
+        self.assertIn(f'Night audit for {self.day}: 4 reservation(s) would be updated', out.getvalue())
+        self.assertEqual(self.statuses(), statuses)
+        self.assertEqual(self.room_statuses(), rooms)
+        self.assertEqual(list(RoomNight.objects.order_by('id').values_list('id', 'status')), nights)
+        self.send.assert_not_called()
+
+    def test_command_without_notifications(self):
+        out = io.StringIO()
+        with self.captureOnCommitCallbacks(execute=True):
+            call_command('night_audit', '--date', self.day.isoformat(), '--no-notify', stdout=out)
+        self.assertIn(f'Night audit for {self.day}: 4 reservation(s) updated', out.getvalue())
+        self.assertEqual(self.statuses()[self.arriving.pk], 'expected_arrival')
+        self.send.assert_not_called()
+
+        with self.assertRaises(CommandError):
+            call_command('night_audit', '--date', '10/03/2025', stdout=io.StringIO())
+
+
+class RoomStatusUpdateTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.today = date.today()
+        cls.guest = Guest.objects.create(name='Status Guest')
+        cls.occupied = Room.objects.create(room_number='U101', room_type='garden_view', rate=Decimal('500000'))
+        cls.vacant = Room.objects.create(room_number='U102', room_type='garden_view', rate=Decimal('500000'))
+        cls.dirty = Room.objects.create(room_number='U103', room_type='garden_view', rate=Decimal('500000'))
+        cls.stay = Reservation.objects.create(
+            guest=cls.guest, room=cls.occupied, check_in=cls.today - timedelta(days=1),
+            check_out=cls.today + timedelta(days=2), status='in_house',
+        )
+        # Stale: the occupied room shows vacant and the empty one occupied; the dirty one is left alone
+        Room.objects.filter(pk=cls.occupied.pk).update(status='vacant_clean')
+        Room.objects.filter(pk=cls.vacant.pk).update(status='occupied')
+        Room.objects.filter(pk=cls.dirty.pk).update(status='vacant_dirty')
+
+    def rooms(self):
+        return {room.pk: room for room in Room.objects.all()}
+
+    def test_only_changed_rooms_are_written(self):
+        received = []
+        rooms_status_changed.connect(
+            lambda sender, rooms, **kwargs: received.extend(room.pk for room in rooms), weak=False, dispatch_uid='test'
+        )
+        self.addCleanup(rooms_status_changed.disconnect, dispatch_uid='test')
+
+        before = self.rooms()
+        with CaptureQueriesContext(connection) as queries:
+            self.assertEqual(Room.objects.update_statuses(self.today), 2)
+        updates = [query['sql'] for query in queries if query['sql'].startswith('UPDATE')]
+        self.assertEqual(len(updates), 1)
+        self.assertNotIn(f'"id" = {self.dirty.pk}', updates[0])
+        self.assertEqual(sorted(received), sorted([self.occupied.pk, self.vacant.pk]))
+
+        rooms = self.rooms()
+        self.assertEqual(rooms[self.occupied.pk].status, 'occupied')
+        self.assertEqual(rooms[self.vacant.pk].status, 'vacant_clean')
+        self.assertEqual(rooms[self.dirty.pk].status, 'vacant_dirty')
+        self.assertGreater(rooms[self.occupied.pk].status_changed_at, before[self.occupied.pk].status_changed_at)
+        self.assertGreater(rooms[self.vacant.pk].status_changed_at, before[self.vacant.pk].status_changed_at)
+        self.assertEqual(rooms[self.dirty.pk].status_changed_at, before[self.dirty.pk].status_changed_at)
+
+        # Nothing left to change: no write and no signal
+        received.clear()
+        with CaptureQueriesContext(connection) as queries:
+            self.assertEqual(Room.objects.update_statuses(self.today), 0)
+        self.assertEqual(len(queries), 1)
+        self.assertEqual(received, [])
+
+    def test_checkout_and_cancel_leave_the_room_dirty(self):
+        Room.objects.update_statuses(self.today)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.post(reverse('checkout_reservation', kwargs={'reservation_id': self.stay.pk}))
+        self.assertEqual(Reservation.objects.get(pk=self.stay.pk).status, 'checked_out')
+        self.assertEqual(Room.objects.get(pk=self.occupied.pk).status, 'vacant_dirty')
+
+        upcoming = Reservation.objects.create(
+            guest=self.guest, room=self.vacant, check_in=self.today + timedelta(days=3),
+            check_out=self.today + timedelta(days=5), status='confirmed',
+        )
+        changed_at = Room.objects.get(pk=self.vacant.pk).status_changed_at
+        self.client.post(reverse('cancel_reservation', kwargs={'reservation_id': upcoming.pk}))
+        self.assertEqual(Reservation.objects.get(pk=upcoming.pk).status, 'canceled')
+        room = Room.objects.get(pk=self.vacant.pk)
+        self.assertEqual(room.status, 'vacant_dirty')
+        self.assertGreater(room.status_changed_at, changed_at)
+
+        # Already dirty: cancelling again writes nothing
+        self.assertEqual(Room.objects.filter(pk=self.vacant.pk).update_statuses(mark_dirty=True), 0)
+
+
+class ReservationChangeTrackingTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.room = Room.objects.create(room_number='T101', room_type='garden_view', rate=Decimal('500000'))
+        cls.other_room = Room.objects.create(room_number='T102', room_type='garden_view', rate=Decimal('500000'))
+        cls.guest = Guest.objects.create(name='Tracking Guest')
+        cls.check_in = date.today() + timedelta(days=20)
+        cls.reservation = Reservation.objects.create(
+            guest=cls.guest, room=cls.room, check_in=cls.check_in, check_out=cls.check_in + timedelta(days=2),
+            status='confirmed', total_amount=Decimal('1000000.00'),
+        )
+
+    def setUp(self):
+        patcher = mock.patch('pms.ledger.sync_reservation')
+        self.sync = patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_unchanged_save_skips_the_ledger(self):
+        reservation = Reservation.objects.get(pk=self.reservation.pk)
+        self.assertFalse(reservation.has_changed())
+        self.assertEqual(reservation.loaded_value('status'), 'confirmed')
+        reservation.save()
+        # Untracked fields do not touch the ledger either
+        reservation.payment_notes = 'Paid at the desk'
+        reservation.save()
+        self.sync.assert_not_called()
+
+    def test_each_tracked_field_is_detected(self):
+        changes = {
+            'status': 'in_house',
+            'room_id': self.other_room.pk,
+            'check_in': self.check_in - timedelta(days=1),
+            'check_out': self.check_in + timedelta(days=3),
+            'total_amount': Decimal('1200000.00'),
+        }
+        self.assertEqual(set(changes), set(Reservation.TRACKED_FIELDS))
+        for field, value in changes.items():
+            with self.subTest(field=field):
+                self.sync.reset_mock()
+                reservation = Reservation.objects.get(pk=self.reservation.pk)
+                original = getattr(reservation, field)
+                setattr(reservation, field, value)
+                self.assertTrue(reservation.has_changed())
+                self.assertTrue(reservation.has_changed(field))
+                self.assertFalse(reservation.has_changed(*(other for other in changes if other != field)))
+                self.assertEqual(reservation.loaded_value(field), original)
+
+                reservation.save()
+                self.sync.assert_called_once_with(reservation)
+                # The saved values become the new baseline
+                self.assertFalse(reservation.has_changed())
+                self.assertEqual(reservation.loaded_value(field), value)
+
+                setattr(reservation, field, original)
+                reservation.save()
+
+    def test_unsaved_instances_count_as_changed(self):
+        reservation = Reservation(guest=self.guest, room=self.room, check_in=self.check_in, check_out=self.check_in + timedelta(days=1))
+        self.assertTrue(reservation.has_changed())
+        self.assertIsNone(reservation.loaded_value('status'))
+
+    def test_deferred_fields_are_not_tracked(self):
+        reservation = Reservation.objects.only('id', 'status', 'room').get(pk=self.reservation.pk)
+        self.assertEqual(reservation.loaded_value('status'), 'confirmed')
+        self.assertIsNone(reservation.loaded_value('check_in'))
+        self.assertFalse(reservation.has_changed('status', 'room_id'))
+        # Unknown database values are treated as changed, so the ledger is resynced rather than skipped
+        self.assertTrue(reservation.has_changed('check_in'))
+        self.assertEqual(reservation.check_in, self.check_in)
+
+        reservation = Reservation.objects.defer('check_in', 'total_amount').get(pk=self.reservation.pk)
+        reservation.status = 'in_house'
+        reservation.save()
+        self.sync.assert_called_once_with(reservation)
+        self.assertEqual(Reservation.objects.get(pk=self.reservation.pk).status, 'in_house')
+
+
+class DashboardSnapshotTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.today = date.today()
+        cls.guest = Guest.objects.create(name='Snapshot Guest')
+        cls.room = Room.objects.create(room_number='D101', room_type='garden_view', rate=Decimal('500000'))
+        cls.other_room = Room.objects.create(room_number='D102', room_type='mountain_view', rate=Decimal('700000'))
+
+    def setUp(self):
+        cache.clear()
+
+    def card(self, snapshot, room):
+        return next(card for card in snapshot['rooms'] if card.pk == room.pk)
+
+    def test_snapshot_is_cached_between_writes(self):
+        dashboard_snapshot(self.today)
+        with self.assertNumQueries(0):
+            snapshot = dashboard_snapshot(self.today)
+        self.assertEqual(snapshot['total_reservations'], 0)
+        self.assertEqual(self.card(snapshot, self.room).current_guests, [])
+
+    def test_reservation_write_rebuilds_the_snapshot(self):
+        dashboard_snapshot(self.today)
+        with self.captureOnCommitCallbacks(execute=True):
+            stay = Reservation.objects.create(
+                guest=self.guest, room=self.room, check_in=self.today - timedelta(days=1),
+                check_out=self.today + timedelta(days=2), status='in_house',
+            )
+        snapshot = dashboard_snapshot(self.today)
+        self.assertEqual(snapshot['status_counts']['in_house'], 1)
+        self.assertEqual(snapshot['total_reservations'], 1)
+        self.assertEqual(self.card(snapshot, self.room).current_guests, [
+            {'id': stay.pk, 'name': 'Snapshot Guest', 'icon': 'bi-person-fill', 'label': 'In House'},
+        ])
+        self.assertGreater(snapshot['daily_occupancy'], 0)
+
+        # Bulk status changes go through reservations_status_changed
+        with self.captureOnCommitCallbacks(execute=True):
+            Reservation.objects.filter(pk=stay.pk).set_status('checked_out', notify=False)
+        snapshot = dashboard_snapshot(self.today)
+        self.assertEqual(snapshot['status_counts']['in_house'], 0)
+        self.assertEqual(snapshot['status_counts']['checked_out'], 1)
+        self.assertEqual(self.card(snapshot, self.room).current_guests, [])
+
+    def test_room_write_rebuilds_the_snapshot(self):
+        dashboard_snapshot(self.today)
+        room = Room.objects.get(pk=self.room.pk)
+        room.status = 'maintenance'
+        with self.captureOnCommitCallbacks(execute=True):
+            room.save()
+        self.assertEqual(self.card(dashboard_snapshot(self.today), self.room).status, 'maintenance')
+
+        # Bulk room updates go through rooms_status_changed
+        with self.captureOnCommitCallbacks(execute=True):
+            Room.objects.filter(pk=self.other_room.pk).update_statuses(self.today, mark_dirty=True)
+        self.assertEqual(self.card(dashboard_snapshot(self.today), self.other_room).status, 'vacant_dirty')
+
+
+class DashboardApiTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.today = date.today()
+        cls.guest = Guest.objects.create(name='Polling Guest')
+        cls.room = Room.objects.create(room_number='E101', room_type='garden_view', rate=Decimal('500000'))
+
+    def setUp(self):
+        cache.clear()
+
+    def poll(self, etag=None):
+        headers = {'HTTP_IF_NONE_MATCH': etag} if etag else {}
+        return self.client.get(reverse('dashboard_api'), **headers)
+
+    def test_unchanged_data_is_not_modified(self):
+        response = self.poll()
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response['Cache-Control'], 'no-cache')
+        self.assertIn('Last-Modified', response)
+        # A matching ETag is answered from the version query alone
+        with self.assertNumQueries(1):
+            response = self.poll(response['ETag'])
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(response.content, b'')
+
+    def test_writes_change_the_etag(self):
+        etag = self.poll()['ETag']
+        stay = Reservation.objects.create(
+            guest=self.guest, room=self.room, check_in=self.today, check_out=self.today + timedelta(days=2),
+            status='expected_arrival',
+        )
+        writes = [
+            lambda: None,
+            lambda: Reservation.objects.filter(pk=stay.pk).set_status('in_house', notify=False),
+            lambda: Room.objects.filter(pk=self.room.pk).update_statuses(self.today, mark_dirty=True),
+            lambda: Room.objects.filter(pk=self.room.pk).update(rate=Decimal('600000'), updated_at=timezone.now()),
+            # Deletes leave no updated_at behind; the row count changes instead
+            lambda: Reservation.objects.filter(pk=stay.pk).delete(),
+        ]
+        # The first poll follows the create above
+        for write in writes:
+            write()
+            response = self.poll(etag)
+            self.assertEqual(response.status_code, 200)
+            self.assertNotEqual(response['ETag'], etag)
+            etag = response['ETag']
+
+    def test_new_version_is_never_served_a_stale_snapshot(self):
+        etag = self.poll()['ETag']
+        stay = Reservation.objects.create(
+            guest=self.guest, room=self.room, check_in=self.today - timedelta(days=1),
+            check_out=self.today + timedelta(days=1), status='in_house',
+        )
+        # No commit, so the on_commit invalidation never ran: the newer token still misses the cache
+        response = self.poll(etag)
+        self.assertEqual(response.status_code, 200)
+        data = response.json()
+        self.assertEqual(data['status_counts']['in_house'], 1)
+        room = next(room for room in data['rooms'] if room['id'] == self.room.pk)
+        self.assertEqual(room['guests'], [{'reservation_id': stay.pk, 'name': 'Polling Guest', 'status': 'In House'}])
+
+
+class GuestSearchTests(TestCase):
+    QUERIES = [
+        'a', 'an', 'LI', 'ana', 'ANA', 'kuz', 'smith', 'example.com', '@example', '812', '3456', '+62',
+        'quote', '"quote"', 'x"y', "o'n", 'AND', 'osé', 'zzz', ' ', '1',
+    ]
+
+    @classmethod
+    def setUpTestData(cls):
+        guests = [
+            ('Ana Maria', 'ana@example.com', '081234567'),
+            ('Anastasia Kuznetsova', None, ''),
+            ('Bob "Quote" Smith', 'bob@example.com', '+62 812 3456'),
+            ('José Ramos', 'jose@mail.test', ''),
+            ("Zoe O'Neil", 'zoe@example.org', '555 0101'),
+            ('Li', '', '1'),
+        ]
+        cls.guests = [Guest.objects.create(name=name, email=email, phone=phone) for name, email, phone in guests]
+        room = Room.objects.create(room_number='S812', room_type='garden_view', rate=Decimal('500000'))
+        for guest in cls.guests:
+            Reservation.objects.create(
+                guest=guest, room=room, check_in=date(2025, 1, 1), check_out=date(2025, 1, 2), status='canceled',
+            )
+
+    def setUp(self):
+        if not search_index_available():
+            self.skipTest('SQLite without the FTS5 trigram tokenizer: search falls back to icontains')
+
+    def icontains(self, text):
+        return set(Guest.objects.filter(Q(name__icontains=text) | Q(email__icontains=text) | Q(phone__icontains=text)))
+
+    def found(self, text):
+        return set(search_guests(Guest.objects.all(), text))
+
+    def test_index_finds_the_same_guests_as_icontains(self):
+        for text in self.QUERIES:
+            with self.subTest(text=text):
+                self.assertEqual(self.found(text), self.icontains(text))
+                sql = str(search_guests(Guest.objects.all(), text).query)
+                self.assertEqual(SEARCH_TABLE in sql, len(text) >= 3)
+
+    def test_reservation_search_matches_guests_and_rooms(self):
+        for text in self.QUERIES + ['S81', 's812']:
+            with self.subTest(text=text):
+                expected = set(Reservation.objects.filter(
+                    Q(guest__name__icontains=text) | Q(guest__email__icontains=text) |
+                    Q(room__room_number__icontains=text) | Q(guest__phone__icontains=text)
+                ))
+                self.assertEqual(set(search_reservations(Reservation.objects.all(), text)), expected)
+
+    def test_triggers_keep_the_index_in_step(self):
+        guest = Guest.objects.create(name='Wilhelmina Trigger', email='wil@hotel.test')
+        self.assertEqual(self.found('helmi'), {guest})
+
+        guest.name = 'Henrietta Trigger'
+        guest.save()
+        self.assertEqual(self.found('helmi'), set())
+        self.assertEqual(self.found('enriet'), {guest})
+
+        # Set-based writes bypass save() but not the triggers
+        Guest.objects.filter(pk=guest.pk).update(email='henrietta@hotel.test', phone='0777 123')
+        self.assertEqual(self.found('wil@'), set())
+        self.assertEqual(self.found('henrietta@'), {guest})
+        self.assertEqual(self.found('0777'), {guest})
+        created = Guest.objects.bulk_create([Guest(name='Bulk Trigger One'), Guest(name='Bulk Trigger Two')])
+        self.assertEqual(self.found('bulk trig'), set(Guest.objects.filter(pk__in=[g.pk for g in created])))
+
+        guest.delete()
+        self.assertEqual(self.found('enriet'), set())
+        Guest.objects.filter(name__startswith='Bulk Trigger').delete()
+        self.assertEqual(self.found('bulk trig'), set())
+        self.assertEqual(self.found('trigger'), self.icontains('trigger'))
+
+
+class OccupancyMatrixTests(TestCase):
+    start = date(2025, 4, 10)
+    end = date(2025, 4, 20)
+
+    @classmethod
+    def setUpTestData(cls):
+        guest = Guest.objects.create(name='Occupancy Guest')
+        cls.rooms = [
+            Room.objects.create(room_number=f'M{number}', room_type=room_type, rate=Decimal('500000'))
+            for number, room_type in [(101, 'garden_view'), (102, 'garden_view'), (103, 'mountain_view'), (104, 'mountain_view')]
+        ]
+        first, second, third, fourth = cls.rooms
+        for room, check_in, check_out, status in [
+            # Across the start edge, across the end edge, and across both
+            (first, -3, 2, 'checked_out'),
+            (first, 8, 14, 'confirmed'),
+            (second, -5, 20, 'in_house'),
+            # Checking out on the first day and in the day after the last: outside the window
+            (third, -4, 0, 'checked_out'),
+            (third, 11, 13, 'confirmed'),
+            # One night on each edge day
+            (third, 0, 1, 'expected_arrival'),
+            (third, 10, 11, 'expected_departure'),
+            # A no-show still sold the night; canceled and pending stays did not
+            (fourth, 2, 5, 'no_show'),
+            (fourth, 4, 8, 'canceled'),
+            (fourth, 6, 9, 'pending'),
+            # A double booking counts the room once
+            (fourth, 3, 4, 'confirmed'),
+        ]:
+            Reservation.objects.create(
+                guest=guest, room=room, check_in=cls.start + timedelta(days=check_in),
+                check_out=cls.start + timedelta(days=check_out), status=status,
+            )
+
+    def legacy_occupied(self, room, day):
+        # The per-room, per-day check the views ran before the matrix
+        return Reservation.objects.filter(
+            room=room,
+            check_in__lte=day,
+            check_out__gt=day,
+            status__in=['confirmed', 'in_house', 'expected_arrival', 'expected_departure', 'checked_out', 'no_show']
+        ).exists()
+
+    def test_matches_the_legacy_calculation(self):
+        matrix = OccupancyMatrix(self.start, self.end)
+        dates = [self.start + timedelta(days=i) for i in range((self.end - self.start).days + 1)]
+        self.assertEqual(matrix.dates, dates)
+
+        daily = []
+        room_occupancy = {}
+        for current_date in dates:
+            occupied_rooms = 0
+            for room in Room.objects.all():
+                if self.legacy_occupied(room, current_date):
+                    occupied_rooms += 1
+                    room_occupancy[room.room_number] = room_occupancy.get(room.room_number, 0) + 1
+            daily.append(occupied_rooms)
+
+        self.assertEqual(matrix.daily_counts(), daily)
+        self.assertEqual(list(matrix.room_nights().items()), list(room_occupancy.items()))
+        self.assertEqual(matrix.occupied_nights(), sum(daily))
+        self.assertEqual(matrix.occupied_nights(dates[2], dates[5]), sum(daily[2:6]))
+        self.assertEqual(matrix.occupied_on(self.end), daily[-1])
+        self.assertAlmostEqual(matrix.occupancy_rate(), sum(daily) / (4 * len(dates)) * 100)
+        self.assertAlmostEqual(matrix.occupancy_rate(self.start, self.start), daily[0] / 4 * 100)
+
+        for room_type, _ in Room.ROOM_TYPES:
+            type_rooms = Room.objects.filter(room_type=room_type)
+            legacy_nights = sum(self.legacy_occupied(room, day) for day in dates for room in type_rooms)
+            self.assertEqual(matrix.room_type_nights()[room_type], {'rooms': 2, 'occupied_nights': legacy_nights})
+
+    def test_room_subset_and_empty_window(self):
+        subset = Room.objects.filter(room_type='mountain_view')
+        matrix = OccupancyMatrix(self.start, self.end, rooms=subset)
+        self.assertEqual(matrix.room_count, 2)
+        self.assertEqual(matrix.daily_counts(), [
+            sum(self.legacy_occupied(room, self.start + timedelta(days=i)) for room in subset)
+            for i in range(matrix.num_days)
+        ])
+
+        empty = OccupancyMatrix(self.end, self.start)
+        self.assertEqual((empty.num_days, empty.daily_counts(), empty.occupancy_rate()), (0, [], 0))
+
+
+class StatusEventTests(SimpleTestCase):
+    def setUp(self):
+        self.broker = InProcessBroker(history=5, max_pending=3)
+        patcher = mock.patch('pms.events._broker', self.broker)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    async def next_event(self, subscription):
+        return await asyncio.wait_for(subscription.get(), timeout=1)
+
+    async def test_publish_reaches_every_subscriber(self):
+        first, second = self.broker.subscribe(), self.broker.subscribe()
+        self.assertEqual(self.broker.subscriber_count, 2)
+        event = publish('room_status', {'rooms': [{'id': 1, 'status': 'vacant_dirty'}]})
+        self.assertEqual(set(event), {'id', 'type', 'data', 'time'})
+        self.assertEqual((event['id'], event['type']), (1, 'room_status'))
+        self.assertEqual(await self.next_event(first), event)
+        self.assertEqual(await self.next_event(second), event)
+
+        self.broker.unsubscribe(second)
+        self.assertEqual(self.broker.subscriber_count, 1)
+        publish('reservation_status', {'ids': [7], 'status': 'in_house'})
+        self.assertEqual((await self.next_event(first))['id'], 2)
+        self.assertTrue(second.queue.empty())
+
+    async def test_publish_from_another_thread(self):
+        subscription = self.broker.subscribe()
+        await asyncio.to_thread(publish, 'reservation_status', {'ids': [1], 'status': 'confirmed'})
+        self.assertEqual((await self.next_event(subscription))['data'], {'ids': [1], 'status': 'confirmed'})
+
+    async def test_reconnect_replays_missed_events_and_slow_clients_drop_the_oldest(self):
+        for i in range(6):
+            publish('reservation_status', {'ids': [i], 'status': 'confirmed'})
+        # History keeps the last 5 events; at most max_pending of them are replayed
+        subscription = self.broker.subscribe(last_event_id=2)
+        self.assertEqual([(await self.next_event(subscription))['id'] for _ in range(3)], [4, 5, 6])
+        self.assertTrue(self.broker.subscribe().queue.empty())
+
+        for i in range(5):
+            publish('reservation_status', {'ids': [i], 'status': 'confirmed'})
+        await asyncio.sleep(0)
+        self.assertEqual(subscription.dropped, 2)
+        self.assertEqual([(await self.next_event(subscription))['id'] for _ in range(3)], [9, 10, 11])
+
+    @override_settings(PMS_LIVE_EVENTS=True, PMS_EVENT_KEEPALIVE=0.05)
+    async def test_stream_payload_and_disconnect(self):
+        response = await status_events(RequestFactory().get('/api/events/', HTTP_LAST_EVENT_ID='nonsense'))
+        self.assertEqual(response['Content-Type'], 'text/event-stream')
+        self.assertEqual(response['Cache-Control'], 'no-cache')
+        chunks = []
+
+        async def client():
+            async for chunk in response.streaming_content:
+                chunks.append(chunk.decode())
+
+        async def wait_for(condition):
+            for _ in range(100):
+                if condition():
+                    return
+                await asyncio.sleep(0.01)
+            self.fail(f'Timed out; received {chunks}')
+
+        task = asyncio.create_task(client())
+        await wait_for(lambda: self.broker.subscriber_count == 1 and chunks)
+        self.assertEqual(chunks[0], 'retry: 5000\n\n')
+        publish('reservation_status', {'ids': [3, 4], 'status': 'expected_arrival'})
+        await wait_for(lambda: any(chunk.startswith('id:') for chunk in chunks))
+        self.assertIn(
+            'id: 1\nevent: reservation_status\ndata: {"ids": [3, 4], "status": "expected_arrival"}\n\n', chunks
+        )
+        await wait_for(lambda: ': keep-alive\n\n' in chunks)
+
+        # A client going away cancels the stream, which drops its subscription
+        task.cancel()
+        await asyncio.gather(task, return_exceptions=True)
+        self.assertEqual(self.broker.subscriber_count, 0)
+
+    async def test_stream_is_off_by_default(self):
+        response = await status_events(RequestFactory().get('/api/events/'))
+        self.assertEqual(response.status_code, 204)
+        self.assertEqual(self.broker.subscriber_count, 0)
+
+
+class LiveEventsPageTests(TestCase):
+    def test_pages_only_subscribe_when_enabled(self):
+        for name in ('dashboard', 'reservations_list'):
+            with self.subTest(name=name):
+                self.assertNotContains(self.client.get(reverse(name)), 'new EventSource')
+                with self.settings(PMS_LIVE_EVENTS=True):
+                    self.assertContains(self.client.get(reverse(name)), 'new EventSource')
+        # Without the stream the dashboard polls its API
+        self.assertContains(self.client.get(reverse('dashboard')), 'setInterval')
@@ -0,0 +1,96 @@
+"""Booking trends by arrival date.
+
+The forecast report groups bookings by the day they check in. One grouped
+query returns, for every arrival day in a window, the number of bookings,
+their total amount and the nights they book; calendar months, quarters and
+weekdays are folded from those rows, so the cost depends on the number of
+days in the window rather than the number of reservations.
+"""
+from datetime import date, timedelta
+from decimal import Decimal
+
+from django.db.models import Count, DurationField, ExpressionWrapper, F, Sum
+
+from .models import Reservation
+from .occupancy import OCCUPIED_STATUSES
+
+ZERO = Decimal('0')
+
+QUARTERS = ['Q1', 'Q2', 'Q3', 'Q4']
+WEEKDAYS = ['Monday', 'Tuesday', 'Wednesday', 'Thursday', 'Friday', 'Saturday', 'Sunday']
+
+
+def add_months(month_start, months):
+    """First day of the calendar month ``months`` away from ``month_start``'s month."""
+    index = month_start.year * 12 + month_start.month - 1 + months
+    return date(index // 12, index % 12 + 1, 1)
+
+
+def month_end(month_start):
+    return add_months(month_start, 1) - timedelta(days=1)
+
+
+def _empty():
+    return {'reservations': 0, 'revenue': ZERO, 'nights': 0}
+
+
+def _add(bucket, reservations, revenue, nights):
+    bucket['reservations'] += reservations
+    bucket['revenue'] += revenue
+    bucket['nights'] += nights
+
+
+class BookingTrends:
+    """Bookings, revenue and nights per arrival day for an inclusive window."""
+
+    def __init__(self, start_date, end_date, statuses=None):
+        self.start_date = start_date
+        self.end_date = end_date
+        # {check_in: (reservations, revenue, nights)}
+        self.days = {}
+
+        rows = Reservation.objects.filter(
+            check_in__gte=start_date,
+            check_in__lte=end_date,
+            status__in=statuses or OCCUPIED_STATUSES,
+        ).values_list('check_in').annotate(
+            reservations=Count('id'),
+            revenue=Sum('total_amount'),
+            stay=Sum(ExpressionWrapper(F('check_out') - F('check_in'), output_field=DurationField())),
+        ).order_by()
+        for check_in, reservations, revenue, stay in rows:
+            self.days[check_in] = (reservations, revenue or ZERO, stay.days if stay else 0)
+
+    def _rows(self, start_date, end_date):
+        for check_in, totals in self.days.items():
+            if start_date <= check_in <= end_date:
+                yield check_in, totals
+
+    def totals(self, start_date, end_date):
+        """{reservations, revenue, nights} for arrivals from ``start_date`` to ``end_date``."""
+        result = _empty()
+        for _, (reservations, revenue, nights) in self._rows(start_date, end_date):
+            _add(result, reservations, revenue, nights)
+        return result
+
+    def monthly(self, last_month, months):
+        """[(month_start, totals)] for the ``months`` calendar months ending with ``last_month``, oldest first."""
+        first_month = add_months(last_month, 1 - months)
+        buckets = {add_months(first_month, i): _empty() for i in range(months)}
+        for check_in, (reservations, revenue, nights) in self._rows(first_month, month_end(last_month)):
+            _add(buckets[check_in.replace(day=1)], reservations, revenue, nights)
+        return list(buckets.items())
+
+    def quarterly(self, start_date, end_date):
+        """{quarter: totals} for arrivals in the window, every year's quarter pooled."""
+        buckets = {quarter: _empty() for quarter in QUARTERS}
+        for check_in, (reservations, revenue, nights) in self._rows(start_date, end_date):
+            _add(buckets[QUARTERS[(check_in.month - 1) // 3]], reservations, revenue, nights)
+        return buckets
+
+    def by_weekday(self, start_date, end_date):
+        """{weekday name: totals} for arrivals in the window, Monday first."""
+        buckets = {name: _empty() for name in WEEKDAYS}
+        for check_in, (reservations, revenue, nights) in self._rows(start_date, end_date):
+            _add(buckets[WEEKDAYS[check_in.weekday()]], reservations, revenue, nights)
+        return buckets
@@ -2,12 +2,13 @@ from django.urls import path
 from django.shortcuts import render
 # Update the imports to include revenue_report
 from .views import (
-    dashboard, create_reservation, calendar_data,
+    dashboard, dashboard_api, status_events, create_reservation, calendar_data,
     checkin_reservation, confirm_reservation,
     checkout_reservation, cancel_reservation, edit_reservation,
     reservations_list, reservation_detail, rooms_list, room_detail,
     guests, guest_detail, guest_list_json, check_reservation_conflict,
-    check_available_rooms, occupancy_report, reports_home, revenue_report, guest_analytics, booking_sources_report, operational_report, forecast_report
+    check_available_rooms, check_available_rooms_batch, flexible_availability, occupancy_report, reports_home, revenue_report, guest_analytics, booking_sources_report, operational_report, forecast_report,
+    report_job, report_job_status, report_job_result
 )
 
 urlpatterns = [
@@ -28,8 +29,12 @@ urlpatterns = [
     path('guests/', guests, name='guests'),
     path('guests/<int:guest_id>/', guest_detail, name='guest_detail'),
     path('guests/json/', guest_list_json, name='guest_list_json'),
+    path('api/dashboard/', dashboard_api, name='dashboard_api'),
+    path('api/events/', status_events, name='status_events'),
     path('api/check-conflict/', check_reservation_conflict, name='check_reservation_conflict'),
     path('api/check-available-rooms/', check_available_rooms, name='check_available_rooms'),
+    path('api/check-available-rooms/batch/', check_available_rooms_batch, name='check_available_rooms_batch'),
+    path('api/flexible-availability/', flexible_availability, name='flexible_availability'),
     path('reports/', reports_home, name='reports_home'),
     path('reports/occupancy/', occupancy_report, name='occupancy_report'),
     path('reports/revenue/', revenue_report, name='revenue_report'),
@@ -37,6 +42,9 @@ urlpatterns = [
     path('reports/booking-sources/', booking_sources_report, name='booking_sources_report'),
     path('reports/operational/', operational_report, name='operational_report'),
     path('reports/forecast/', forecast_report, name='forecast_report'),
+    path('reports/jobs/<int:job_id>/', report_job, name='report_job'),
+    path('reports/jobs/<int:job_id>/status/', report_job_status, name='report_job_status'),
+    path('reports/jobs/<int:job_id>/result/', report_job_result, name='report_job_result'),
 ]
 
 print("Debug: URL patterns loaded:")
@@ -1,15 +1,38 @@
 from django.shortcuts import render, redirect, get_object_or_404
 from django.contrib import messages
-from django.http import JsonResponse
+from django.conf import settings as django_settings
+from django.http import HttpResponse, JsonResponse, StreamingHttpResponse
+from django.urls import reverse
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
 from datetime import datetime, date, time, timedelta
 from calendar import monthrange
-from .models import Room, Reservation, HotelSettings, Guest, PaymentMethod, Agent
+from .models import Room, Reservation, HotelSettings, Guest, PaymentMethod, Agent, ReportJob
 from .forms import ReservationForm, CheckInGuestForm, ConfirmReservationForm
-from django.views.decorators.http import require_GET
+from .occupancy import OccupancyMatrix
+from .dashboard import dashboard_snapshot, dashboard_version
+from .events import get_broker
+from .pagination import KeysetPaginator, ClosestDatePaginator
+from .search import search_guests, search_reservations
+from .availability import stay_index, first_conflict, search_availability, availability_calendar
+from .responses import json_response
+from .revenue import RevenueSummary
+from .trends import BookingTrends, add_months, month_end
+from .forecasting import history_start, ledger_forecast
+from .report_cache import cached_report, report_response, report_cache_stats
+from .report_jobs import run_in_background, set_progress
+from django.views.decorators.http import require_GET, condition
+from django.views.decorators.csrf import csrf_exempt
+import json
+import asyncio
+
+# Upper bound on searches accepted by check_available_rooms_batch
+MAX_AVAILABILITY_SEARCHES = 100
+# Rows per page of reservations_list
+RESERVATIONS_PAGE_SIZE = 50
 
 def reservations_list(request):
     """View to display all reservations with appropriate actions"""
-    print("Debug: Accessing reservations list view")
     
     # Get sort and filter parameters from request
     sort_field = request.GET.get('sort', 'check_in')
@@ -20,19 +43,12 @@ def reservations_list(request):
     # Get search parameter
     search_query = request.GET.get('search', '').strip()
     
-    # Update all reservation statuses before displaying
-    reservations = Reservation.objects.all()
-    print(f"Debug: Found {len(reservations)} reservations")
-    
-    for reservation in reservations:
-        old_status = reservation.status
-        reservation.update_status()
-        print(f"Debug: Reservation {reservation.id} status: {old_status} -> {reservation.status}")
+    # Statuses are advanced by the night_audit command; this view only reads
+    reservations = Reservation.objects.select_related('guest', 'room', 'payment_method')
 
-    # Apply status filter
+    # Apply status filter on the status each reservation has today, even before the night audit ran
     if status_filter:
-        reservations = reservations.filter(status=status_filter)
-        print(f"Debug: Filtered by status '{status_filter}', found {len(reservations)} reservations")
+        reservations = reservations.in_effective_status(status_filter)
 
     # Apply date filter
     if date_filter == 'today':
@@ -41,26 +57,16 @@ def reservations_list(request):
             check_in__lte=today,
             check_out__gt=today
         )
-        print(f"Debug: Filtered by today's date, found {len(reservations)} reservations")
     elif date_filter == 'checking_in_today':
         today = date.today()
         reservations = reservations.filter(check_in=today)
-        print(f"Debug: Filtered by check-in today, found {len(reservations)} reservations")
     elif date_filter == 'checking_out_today':
         today = date.today()
         reservations = reservations.filter(check_out=today)
-        print(f"Debug: Filtered by check-out today, found {len(reservations)} reservations")
 
-    # Apply search filter if provided
+    # Apply search filter if provided (guest full-text index, see pms/search.py)
     if search_query:
-        from django.db.models import Q
-        reservations = reservations.filter(
-            Q(guest__name__icontains=search_query) |
-            Q(guest__email__icontains=search_query) |
-            Q(room__room_number__icontains=search_query) |
-            Q(guest__phone__icontains=search_query)
-        )
-        print(f"Debug: Filtered by search '{search_query}', found {len(reservations)} reservations")
+        reservations = search_reservations(reservations, search_query)
 
     # Define valid sort fields and their corresponding model fields
     valid_sort_fields = {
@@ -73,33 +79,49 @@ def reservations_list(request):
         'payment_method': 'payment_method__name'
     }
 
-    # Apply sorting
+    # Apply sorting, one page at a time (keyset pagination, see pms/pagination.py)
+    cursor = request.GET.get('cursor', '')
     if sort_field in valid_sort_fields:
         sort_by = valid_sort_fields[sort_field]
         if sort_direction == 'desc':
             sort_by = f'-{sort_by}'
-        reservations = reservations.order_by(sort_by)
+        page = KeysetPaginator(
+            reservations, [sort_by], page_size=RESERVATIONS_PAGE_SIZE,
+            nullable={'payment_method__name': ''}
+        ).page(cursor)
     else:
-        # Default sort: check-in date closest to today
-        today = date.today()
-        reservations = reservations.extra(
-            select={'date_diff': "ABS(JULIANDAY(date(check_in)) - JULIANDAY(date('%s')))" % today},
-            order_by=['date_diff']
-        )
+        # Default sort: check-in date closest to today, merged from two check_in index ranges
+        page = ClosestDatePaginator(reservations, 'check_in', page_size=RESERVATIONS_PAGE_SIZE).page(cursor)
+
+    # Page links keep every filter and replace only the cursor
+    params = request.GET.copy()
+    params.pop('cursor', None)
+    if page.has_next:
+        params['cursor'] = page.next_cursor
+        next_page_url = f'?{params.urlencode()}'
+    else:
+        next_page_url = None
+    if page.has_previous:
+        params['cursor'] = page.previous_cursor
+        previous_page_url = f'?{params.urlencode()}'
+    else:
+        previous_page_url = None
 
     # Get all available statuses for filter dropdown (from model choices)
     all_statuses = [choice[0] for choice in Reservation.STATUS_CHOICES]
     
     context = {
-        'reservations': reservations,
+        'reservations': page,
+        'next_page_url': next_page_url,
+        'previous_page_url': previous_page_url,
         'current_sort': sort_field,
         'current_direction': sort_direction,
         'current_status_filter': status_filter,
         'current_date_filter': date_filter,  # New context variable
         'current_search_query': search_query,
-        'all_statuses': all_statuses
+        'all_statuses': all_statuses,
+        'live_events': getattr(django_settings, 'PMS_LIVE_EVENTS', False),
     }
-    print("Debug: Rendering reservations list template")
     return render(request, 'pms/reservations.html', context)
 
 # View for check-in process
@@ -217,159 +239,251 @@ def checkin_reservation(request, reservation_id):
         messages.error(request, 'An error occurred during check-in')
         return redirect('reservations_list')
 
-def dashboard(request):
-    rooms = Room.objects.all()
+def _dashboard_version(request):
+    # Shared by the ETag and Last-Modified checks so the version query runs once
+    if not hasattr(request, '_dashboard_version'):
+        request._dashboard_version = dashboard_version()
+    return request._dashboard_version
+
+
+@require_GET
+@condition(
+    etag_func=lambda request: _dashboard_version(request)[0],
+    last_modified_func=lambda request: _dashboard_version(request)[1],
+)
+def dashboard_api(request):
+    """JSON version of the dashboard for polling front-desk screens.
+    Unchanged data is answered with 304 from the version query alone."""
     today = date.today()
+    snapshot = dashboard_snapshot(today, version=_dashboard_version(request)[0])
+
+    response = JsonResponse({
+        'business_date': today.isoformat(),
+        'status_counts': snapshot['status_counts'],
+        'total_reservations': snapshot['total_reservations'],
+        'daily_occupancy': round(snapshot['daily_occupancy'], 1),
+        'weekly_occupancy': round(snapshot['weekly_occupancy'], 1),
+        'monthly_occupancy': round(snapshot['monthly_occupancy'], 1),
+        'monthly_nights_sold': snapshot['monthly_nights_sold'],
+        'target_occupancy': 80,
+        'month_name': today.strftime('%B %Y'),
+        'rooms': [
+            {
+                'id': room.id,
+                'room_number': room.room_number,
+                'status': room.status,
+                'status_display': room.get_status_display(),
+                'guests': [
+                    {'reservation_id': guest['id'], 'name': guest['name'], 'status': guest['label']}
+                    for guest in room.current_guests
+                ],
+            }
+            for room in snapshot['rooms']
+        ],
+    })
+    # Let clients cache the body but revalidate on every poll
+    response['Cache-Control'] = 'no-cache'
+    return response
 
-    # Update reservation statuses and mark no-shows
-    no_show_updated = False
-    for reservation in Reservation.objects.all():
-        old_status = reservation.status
-        reservation.update_status()
-        # If a reservation was marked as no-show, update room status
-        if old_status != 'no_show' and reservation.status == 'no_show':
-            no_show_updated = True
-            reservation.room.update_status(today)
-
-    # Update room statuses
-    if no_show_updated:
-        for room in rooms:
-            room.update_status(today)
-
-    # Current reservations (active today) - Updated for consistency
-    actual_room_count = Room.objects.count()  # Use actual room count
-    occupied_rooms_today = 0
-    
-    for room in Room.objects.all():
-        is_occupied = Reservation.objects.filter(
-            room=room,
-            check_in__lte=today,
-            check_out__gt=today,  # Don't count check-out day
-            status__in=['confirmed', 'expected_arrival', 'expected_departure', 'in_house', 'checked_out', 'no_show']
-        ).exists()
-        if is_occupied:
-            occupied_rooms_today += 1
-    
-    daily_occupancy = (occupied_rooms_today / actual_room_count) * 100 if actual_room_count > 0 else 0
-    
-    # Get reservations for display purposes
-    reservations = Reservation.objects.filter(
-        check_in__lte=today,
-        check_out__gt=today,
-        status__in=['confirmed', 'expected_arrival', 'in_house']
-    )
 
-    # Weekly occupancy - Updated to match occupancy report logic
-    week_start = today - timedelta(days=today.weekday())
-    week_end = week_start + timedelta(days=7)
-    days_in_week = 7
-    actual_room_count = Room.objects.count()
-    total_room_nights_week = actual_room_count * days_in_week
-    booked_room_nights_week = 0
-    
-    # Calculate day-by-day for consistency
-    for current_date in [week_start + timedelta(days=i) for i in range(days_in_week)]:
-        for room in Room.objects.all():
-            is_occupied = Reservation.objects.filter(
-                room=room,
-                check_in__lte=current_date,
-                check_out__gt=current_date,  # Don't count check-out day
-                status__in=['confirmed', 'expected_arrival', 'expected_departure', 'in_house', 'checked_out', 'no_show']
-            ).exists()
-            if is_occupied:
-                booked_room_nights_week += 1
-    
-    weekly_occupancy = (booked_room_nights_week / total_room_nights_week) * 100 if total_room_nights_week > 0 else 0
-
-    # Monthly occupancy for current month (confirmed/arrival/departure/in_house/checked_out)
-    year = today.year
-    month = today.month
-    days_in_month = monthrange(year, month)[1]
-    actual_room_count = Room.objects.count()  # Get actual room count
-    total_room_nights = actual_room_count * days_in_month  # Use actual count instead of hardcoded 5
-    booked_room_nights = 0
-    month_start = date(year, month, 1)
-    month_end = month_start + timedelta(days=days_in_month)
-    
-    # Monthly occupancy - Updated to match occupancy report logic
-    for current_date in [month_start + timedelta(days=i) for i in range(days_in_month)]:
-        for room in Room.objects.all():
-            is_occupied = Reservation.objects.filter(
-                room=room,
-                check_in__lte=current_date,
-                check_out__gt=current_date,  # Don't count check-out day
-                status__in=['confirmed', 'expected_arrival', 'expected_departure', 'in_house', 'checked_out', 'no_show']
-            ).exists()
-            if is_occupied:
-                booked_room_nights += 1
-    sold_room_nights = 0
-    for current_date in [month_start + timedelta(days=i) for i in range(days_in_month)]:
-        for room in Room.objects.all():
-            is_sold = Reservation.objects.filter(
-                room=room,
-                check_in__lte=current_date,
-                check_out__gt=current_date,  # Don't count check-out day
-                status__in=['confirmed', 'expected_arrival', 'expected_departure', 'in_house', 'checked_out', 'no_show']
-            ).exists()
-            if is_sold:
-                sold_room_nights += 1
-    monthly_occupancy = (booked_room_nights / total_room_nights) * 100 if total_room_nights > 0 else 0
-
-    # Filter reservations by status
-    pending_reservations = Reservation.objects.filter(status='pending')
-    confirmed_reservations = Reservation.objects.filter(status='confirmed')  # Add this line
-    expected_arrivals = Reservation.objects.filter(status='expected_arrival')
-    checked_in_reservations = Reservation.objects.filter(status='in_house')
-    expected_departures = Reservation.objects.filter(status='expected_departure')
-    canceled_reservations = Reservation.objects.filter(status='canceled')
-    no_show_reservations = Reservation.objects.filter(status='no_show')
-    checked_out_reservations = Reservation.objects.filter(status='checked_out')
-    all_reservations = Reservation.objects.all()
+async def status_events(request):
+    """Server-sent event stream of reservation and room status changes.
+
+    Needs an ASGI server (see hotel_pms/asgi.py); each connected client is
+    one idle coroutine waiting on its broker subscription. Unless
+    ``PMS_LIVE_EVENTS`` is on, clients are told not to reconnect (204).
+    """
+    if not getattr(django_settings, 'PMS_LIVE_EVENTS', False):
+        return HttpResponse(status=204)
+    try:
+        last_event_id = int(request.headers.get('Last-Event-ID', ''))
+    except ValueError:
+        last_event_id = None
+    keepalive = getattr(django_settings, 'PMS_EVENT_KEEPALIVE', 15)
+
+    async def stream():
+        broker = get_broker()
+        subscription = broker.subscribe(last_event_id)
+        try:
+            yield 'retry: 5000\n\n'
+            while True:
+                try:
+                    event = await asyncio.wait_for(subscription.get(), timeout=keepalive)
+                except asyncio.TimeoutError:
+                    # Comment line keeps proxies from closing an idle connection
+                    yield ': keep-alive\n\n'
+                    continue
+                yield f"id: {event['id']}\nevent: {event['type']}\ndata: {json.dumps(event['data'])}\n\n"
+        finally:
+            broker.unsubscribe(subscription)
+
+    response = StreamingHttpResponse(stream(), content_type='text/event-stream')
+    response['Cache-Control'] = 'no-cache'
+    response['X-Accel-Buffering'] = 'no'
+    return response
+
+
+def dashboard(request):
+    today = date.today()
+    # Counters, occupancy and room cards come from the cached snapshot (pms/dashboard.py)
+    snapshot = dashboard_snapshot(today)
 
     return render(request, 'pms/dashboard.html', {
-        'rooms': rooms,
-        'reservations': reservations,
-        'pending_reservations': pending_reservations,
-        'confirmed_reservations': confirmed_reservations,  # Add this line
-        'expected_arrivals': expected_arrivals,
-        'checked_in_reservations': checked_in_reservations,
-        'expected_departures': expected_departures,
-        'canceled_reservations': canceled_reservations,
-        'no_show_reservations': no_show_reservations,
-        'checked_out_reservations': checked_out_reservations,
-        'daily_occupancy': daily_occupancy,
-        'weekly_occupancy': weekly_occupancy,
-        'monthly_occupancy': monthly_occupancy,
-        'monthly_nights_sold': sold_room_nights,
+        'rooms': snapshot['rooms'],
+        'status_counts': snapshot['status_counts'],
+        'total_reservations': snapshot['total_reservations'],
+        'daily_occupancy': snapshot['daily_occupancy'],
+        'weekly_occupancy': snapshot['weekly_occupancy'],
+        'monthly_occupancy': snapshot['monthly_occupancy'],
+        'monthly_nights_sold': snapshot['monthly_nights_sold'],
         'target_occupancy': 80,
         'month_name': today.strftime('%B %Y'),
-        'all_reservations': all_reservations
+        'live_events': getattr(django_settings, 'PMS_LIVE_EVENTS', False),
     })
 
 
 
+# Event colours of the reservation calendar, by status
+CALENDAR_COLORS = {
+    'pending': '#FF9800',  # Orange (Pending)
+    'confirmed': '#9C27B0',  # Purple (Confirmed)
+    'expected_arrival': '#4CAF50',  # Green (Expected Arrival)
+    'in_house': '#673AB7',  # Deep Purple (In House)
+    'expected_departure': '#2196F3',  # Blue (Expected Departure)
+    'checked_out': '#00bcd4',  # Cyan (Checked Out)
+    'canceled': '#795548',  # Brown (Canceled)
+    'no_show': '#F44336',  # Red (No Show)
+}
+# Changes are looked up this far before the client's version, so writes that
+# committed just after its previous fetch are not missed
+CALENDAR_SINCE_OVERLAP = timedelta(seconds=5)
+
+
+def _calendar_date(value):
+    # FullCalendar sends ISO datetimes with an offset ("2025-08-01T00:00:00+07:00"); only the date matters
+    try:
+        return date.fromisoformat(value[:10])
+    except ValueError:
+        return None
+
+
+def _calendar_event(row):
+    return {
+        'id': row['id'],
+        'title': f"{row['guest__name']} - {row['room__room_number']} ({row['status']})",
+        'start': row['check_in'].isoformat(),
+        'end': row['check_out'].isoformat(),
+        'color': CALENDAR_COLORS.get(row['status'], '#9C27B0'),
+    }
+
+
+def _calendar_timeline(rows, start):
+    """Columnar events for a room timeline: parallel arrays instead of one object per stay.
+
+    ``start`` offsets are days from the window start (negative for stays that
+    began before it), ``length`` is nights, ``status`` indexes the payload's
+    "statuses"/"colors" lists.
+    """
+    status_codes = {status: code for code, (status, _) in enumerate(Reservation.STATUS_CHOICES)}
+    origin = start.toordinal()
+    ids, rooms, offsets, lengths, statuses = [], [], [], [], []
+    for reservation_id, room_id, check_in, check_out, status in rows:
+        check_in = check_in.toordinal()
+        ids.append(reservation_id)
+        rooms.append(room_id)
+        offsets.append(check_in - origin)
+        lengths.append(check_out.toordinal() - check_in)
+        statuses.append(status_codes.get(status, -1))
+    return {'id': ids, 'room': rooms, 'start': offsets, 'length': lengths, 'status': statuses}
+
+
+def _calendar_timeline_data(request, start, end, version, since_time=None):
+    fields = ('id', 'room_id', 'check_in', 'check_out', 'status')
+    payload = {
+        'version': version.isoformat(),
+        'start': start.isoformat(),
+        'days': (end - start).days,
+        'statuses': [status for status, _ in Reservation.STATUS_CHOICES],
+        'colors': [CALENDAR_COLORS.get(status, '#9C27B0') for status, _ in Reservation.STATUS_CHOICES],
+    }
+    if since_time is not None:
+        changed = Reservation.objects.filter(updated_at__gte=since_time - CALENDAR_SINCE_OVERLAP).values_list(*fields)
+        rows = []
+        removed = []
+        for row in changed:
+            if row[2] < end and row[3] > start:
+                rows.append(row)
+            else:
+                removed.append(row[0])
+        payload['events'] = _calendar_timeline(rows, start)
+        payload['removed'] = removed
+        return json_response(payload, request)
+
+    resources = list(Room.objects.order_by('room_number').values_list('id', 'room_number'))
+    payload['resources'] = {
+        'id': [room_id for room_id, _ in resources],
+        'title': [room_number for _, room_number in resources],
+    }
+    # Grouped by room so a client can lay each resource row out in one pass
+    rows = Reservation.objects.filter(check_in__lt=end, check_out__gt=start).values_list(*fields).order_by('room_id', 'check_in', 'id')
+    payload['events'] = _calendar_timeline(rows, start)
+    return json_response(payload, request, headers={'X-Calendar-Version': payload['version']})
+
+
 def calendar_data(request):
-    reservations = Reservation.objects.all()
-    events = []
-    for reservation in reservations:
-        colors = {
-            'pending': '#FF9800',  # Orange (Pending)
-            'confirmed': '#9C27B0',  # Purple (Confirmed)
-            'expected_arrival': '#4CAF50',  # Green (Expected Arrival)
-            'in_house': '#673AB7',  # Deep Purple (In House)
-            'expected_departure': '#2196F3',  # Blue (Expected Departure)
-            'checked_out': '#00bcd4',  # Cyan (Checked Out)
-            'canceled': '#795548',  # Brown (Canceled)
-            'no_show': '#F44336',  # Red (No Show)
-        }
-        events.append({
-            'id': reservation.id,
-            'title': f"{reservation.guest.name} - {reservation.room.room_number} ({reservation.status})",
-            'start': reservation.check_in.isoformat(),
-            'end': reservation.check_out.isoformat(),
-            'color': colors.get(reservation.status, '#9C27B0'),
-        })
-    return JsonResponse(events, safe=False)
+    """Reservation events overlapping the calendar's visible range.
+
+    FullCalendar passes the range as ``start``/``end`` (end exclusive); without
+    them the current month is returned. The ``X-Calendar-Version`` header holds
+    the time of the read. Passing it back as ``since`` returns only what changed
+    after it, as {"version", "events", "removed"}: "removed" lists changed
+    reservations that no longer overlap the range. Deleted reservations drop out
+    on the next full fetch.
+
+    ``layout=timeline`` returns the same reservations for a room-resource
+    timeline in columnar form: the rooms as "resources" and the events as
+    parallel "id", "room", "start", "length" and "status" arrays (see
+    ``_calendar_timeline``), with the status colours sent once.
+    """
+    start = _calendar_date(request.GET.get('start', ''))
+    end = _calendar_date(request.GET.get('end', ''))
+    if not start or not end:
+        today = date.today()
+        start = date(today.year, today.month, 1)
+        end = start + timedelta(days=monthrange(today.year, today.month)[1])
+    if end <= start:
+        return JsonResponse({'error': 'end must be after start'}, status=400)
+
+    layout = request.GET.get('layout', 'events')
+    if layout not in ('events', 'timeline'):
+        return JsonResponse({'error': 'layout must be events or timeline'}, status=400)
+
+    version = timezone.now()
+    fields = ('id', 'check_in', 'check_out', 'status', 'guest__name', 'room__room_number')
+
+    since = request.GET.get('since')
+    since_time = None
+    if since:
+        since_time = parse_datetime(since)
+        if since_time is None:
+            return JsonResponse({'error': 'Invalid since version'}, status=400)
+    if layout == 'timeline':
+        return _calendar_timeline_data(request, start, end, version, since_time)
+
+    if since_time is not None:
+        changed = Reservation.objects.filter(updated_at__gte=since_time - CALENDAR_SINCE_OVERLAP).values(*fields)
+        events = []
+        removed = []
+        for row in changed:
+            if row['check_in'] < end and row['check_out'] > start:
+                events.append(_calendar_event(row))
+            else:
+                removed.append(row['id'])
+        return json_response({'version': version.isoformat(), 'events': events, 'removed': removed}, request)
+
+    # Only the window, as flat rows: one indexed range query, no model instances
+    rows = Reservation.objects.filter(check_in__lt=end, check_out__gt=start).values(*fields).order_by('check_in', 'id')
+    return json_response([_calendar_event(row) for row in rows], request, headers={'X-Calendar-Version': version.isoformat()})
 
 def reservation_detail(request, reservation_id):
     """View to display detailed information about a specific reservation"""
@@ -429,11 +543,9 @@ def checkout_reservation(request, reservation_id):
     if request.method == 'POST' and reservation.status in ['in_house', 'expected_departure']:
         reservation.status = 'checked_out'
         reservation.save()
-        # Update room status with today's date
+        # Room needs cleaning after check-out; only written if its status changes
         today = date.today()
-        reservation.room.status = 'vacant_dirty'
-        reservation.room.save()
-        reservation.room.update_status(today)
+        Room.objects.filter(pk=reservation.room_id).update_statuses(today, mark_dirty=True)
         return redirect('reservations_list')
     return redirect('reservations_list')
 
@@ -446,9 +558,7 @@ def cancel_reservation(request, reservation_id):
         reservation.cancellation_reason = reason
         reservation.save()
         # Set room status to vacant_dirty so it can be cleaned before rebooking
-        reservation.room.status = 'vacant_dirty'
-        reservation.room.save()
-        reservation.room.update_status()
+        Room.objects.filter(pk=reservation.room_id).update_statuses(mark_dirty=True)
         if request.headers.get('x-requested-with') == 'XMLHttpRequest':
             return JsonResponse({'success': True, 'status': 'canceled', 'reason': reason})
         return redirect('reservations_list')
@@ -462,6 +572,7 @@ def rooms_list(request):
     from django.shortcuts import redirect
     from django.contrib import messages
     from datetime import datetime, date
+    from collections import Counter
     
     if request.method == 'POST':
         action = request.POST.get('action')
@@ -526,32 +637,54 @@ def rooms_list(request):
         return redirect('rooms_list')
     
     # GET request - display rooms with enhanced information
-    rooms = Room.objects.all().order_by('room_number')
+    from django.db.models import Count, F, Window
+    from django.db.models.functions import RowNumber
+    rooms = list(Room.objects.all().order_by('room_number'))
+    today = date.today()
+    
+    # Per-room figures come from one query each instead of several queries per room
+    # Last five stays of every room (Room.get_reservation_history)
+    recent_reservations = {}
+    history = Reservation.objects.select_related('guest').annotate(
+        recent_rank=Window(RowNumber(), partition_by=[F('room_id')], order_by=[F('check_in').desc(), F('id').desc()])
+    ).filter(recent_rank__lte=5).order_by('room_id', 'recent_rank')
+    for reservation in history:
+        recent_reservations.setdefault(reservation.room_id, []).append(reservation)
+    
+    # Reservations overlapping the last 30 days (Room.get_occupancy_rate)
+    occupancy_start = today - timedelta(days=30)
+    overlapping_counts = dict(Reservation.objects.filter(
+        check_in__lt=today,
+        check_out__gt=occupancy_start,
+        status__in=['confirmed', 'in_house', 'checked_out', 'expected_arrival', 'expected_departure', 'no_show']
+    ).values_list('room_id').annotate(total=Count('id')).order_by())
+    
+    # Current in-house guest per room
+    current_guests = {}
+    in_house = Reservation.objects.select_related('guest').filter(
+        check_in__lte=today,
+        check_out__gt=today,
+        status='in_house'
+    ).order_by('-id')
+    for reservation in in_house:
+        current_guests[reservation.room_id] = reservation
     
-    # Add additional context for each room
     for room in rooms:
-        # Get recent reservations
-        room.recent_reservations = room.get_reservation_history(5)
-        # Get occupancy rate for last 30 days
-        room.occupancy_rate = room.get_occupancy_rate()
+        room.recent_reservations = recent_reservations.get(room.id, [])
+        room.occupancy_rate = overlapping_counts.get(room.id, 0) / 30 * 100
         # Get maintenance logs
         room.recent_maintenance = room.maintenance_logs.all()[:3]
-        # Check if room has current guest
-        today = date.today()
-        room.current_guest = room.reservation_set.filter(
-            check_in__lte=today,
-            check_out__gt=today,
-            status='in_house'
-        ).first()
+        room.current_guest = current_guests.get(room.id)
     
     # Room statistics
-    total_rooms = rooms.count()
-    vacant_clean = rooms.filter(status='vacant_clean').count()
-    vacant_dirty = rooms.filter(status='vacant_dirty').count()
-    occupied = rooms.filter(status='occupied').count()
-    maintenance = rooms.filter(status='maintenance').count()
-    out_of_order = rooms.filter(status='out_of_order').count()
-    out_of_service = rooms.filter(status='out_of_service').count()
+    status_totals = Counter(room.status for room in rooms)
+    total_rooms = len(rooms)
+    vacant_clean = status_totals['vacant_clean']
+    vacant_dirty = status_totals['vacant_dirty']
+    occupied = status_totals['occupied']
+    maintenance = status_totals['maintenance']
+    out_of_order = status_totals['out_of_order']
+    out_of_service = status_totals['out_of_service']
     
     context = {
         'rooms': rooms,
@@ -659,14 +792,14 @@ def room_detail(request, room_id):
     ).aggregate(total=Sum('total_amount'))['total'] or 0
     
     # Get current reservation if any
-    current_reservation = room.reservation_set.filter(
+    current_reservation = room.reservation_set.select_related('guest').filter(
         check_in__lte=date.today(),
         check_out__gt=date.today(),
         status='in_house'
     ).first()
     
     # Get upcoming reservations
-    upcoming_reservations = room.reservation_set.filter(
+    upcoming_reservations = room.reservation_set.select_related('guest').filter(
         check_in__gt=date.today(),
         status__in=['confirmed', 'expected_arrival']
     ).order_by('check_in')[:5]
@@ -741,6 +874,7 @@ def guests(request):
     from django.db.models import Count
     
     guests = Guest.objects.all().order_by('-id')
+    search_query = request.GET.get('search', '').strip()
     
     # Calculate metrics
     today = date.today()
@@ -773,8 +907,22 @@ def guests(request):
         ).filter(stay_duration__gt=1)
     ).distinct().count()
     
+    # Server-side search through the guest full-text index (see pms/search.py)
+    if search_query:
+        guests = search_guests(guests, search_query)
+
+    # Per-row figures for the client-side filters, in the same query as the list
+    from django.db.models import Exists, OuterRef
+    guests = guests.annotate(
+        reservation_count=Count('reservation'),
+        has_long_stay=Exists(Reservation.objects.filter(
+            guest=OuterRef('pk'), check_out__gt=F('check_in') + timedelta(days=1)
+        )),
+    )
+
     context = {
         'guests': guests,
+        'search_query': search_query,
         'total_guests': total_guests,
         'birthday_this_month': birthday_this_month,
         'recurring_guests': recurring_guests,
@@ -807,21 +955,21 @@ def guest_detail(request, guest_id):
         edit_mode = request.GET.get('edit', 'false').lower() == 'true'
     
     # Get guest's reservation history with nights calculation
-    reservations = Reservation.objects.filter(guest=guest).order_by('-check_in')
+    reservations = Reservation.objects.filter(guest=guest).select_related('room').order_by('-check_in')
     
     # Add nights calculation to each reservation
     for reservation in reservations:
         reservation.nights = (reservation.check_out - reservation.check_in).days
     
-    # Calculate guest statistics
-    total_reservations = reservations.count()
-    completed_stays = reservations.filter(status='completed').count()
+    # Calculate guest statistics from the loaded history
+    total_reservations = len(reservations)
+    completed_stays = sum(1 for reservation in reservations if reservation.status == 'completed')
     
     # Calculate total nights stayed
-    total_nights = 0
-    for reservation in reservations.filter(status__in=['completed', 'checked_out']):
-        nights = (reservation.check_out - reservation.check_in).days
-        total_nights += nights
+    total_nights = sum(
+        reservation.nights for reservation in reservations
+        if reservation.status in ['completed', 'checked_out']
+    )
     
     # Get upcoming reservations
     upcoming_reservations = reservations.filter(
@@ -829,8 +977,11 @@ def guest_detail(request, guest_id):
         check_in__gte=date.today()
     )
     
-    # Get current reservation (if any)
-    current_reservation = reservations.filter(status='in_house').first()
+    # Get current reservation (if any), the first in_house one by id
+    current_reservation = min(
+        (reservation for reservation in reservations if reservation.status == 'in_house'),
+        key=lambda reservation: reservation.id, default=None
+    )
     
     context = {
         'guest': guest,
@@ -847,6 +998,10 @@ def guest_detail(request, guest_id):
 
 def guest_list_json(request):
     guests = Guest.objects.all().order_by('-id')
+    # Optional ?q= narrows the list through the guest full-text index
+    search_query = request.GET.get('q', '').strip()
+    if search_query:
+        guests = search_guests(guests, search_query)
     data = [
         {
             "id": g.id, 
@@ -855,7 +1010,7 @@ def guest_list_json(request):
             "phone": g.phone or ""
         } for g in guests
     ]
-    return JsonResponse({"guests": data})
+    return json_response({"guests": data}, request)
 
 def check_reservation_conflict(request):
     """AJAX endpoint to check for reservation conflicts"""
@@ -879,21 +1034,14 @@ def check_reservation_conflict(request):
                     'message': 'Check-out date must be after check-in date'
                 })
             
-            # Check for overlapping reservations
-            active_statuses = ['confirmed', 'expected_arrival', 'in_house']
-            overlapping = Reservation.objects.filter(
-                room_id=room_id,
-                check_in__lt=check_out_date,
-                check_out__gt=check_in_date,
-                status__in=active_statuses
+            # Check for overlapping reservations in the in-memory stay index,
+            # excluding the current reservation if editing
+            conflicting_reservation = first_conflict(
+                int(room_id), check_in_date, check_out_date,
+                exclude_pk=int(current_reservation_id) if current_reservation_id else None
             )
             
-            # Exclude current reservation if editing
-            if current_reservation_id:
-                overlapping = overlapping.exclude(id=current_reservation_id)
-            
-            if overlapping.exists():
-                conflicting_reservation = overlapping.first()
+            if conflicting_reservation:
                 return JsonResponse({
                     'conflict': True,
                     'message': f'Room is already reserved by {conflicting_reservation.guest.name} from {conflicting_reservation.check_in} to {conflicting_reservation.check_out}'
@@ -927,22 +1075,12 @@ def check_available_rooms(request):
                     'error': 'Check-out date must be after check-in date'
                 }, status=400)
             
-            # Get all rooms
-            all_rooms = Room.objects.all()
-            
-            # Find rooms that have conflicting reservations
-            active_statuses = ['confirmed', 'expected_arrival', 'in_house']
-            conflicting_room_ids = Reservation.objects.filter(
-                check_in__lt=check_out_date,
-                check_out__gt=check_in_date,
-                status__in=active_statuses
-            ).values_list('room_id', flat=True)
-            
-            # Get available rooms (exclude conflicting ones and rooms not available for booking)
             # Rooms must be vacant_clean and not in maintenance/out of order/out of service
-            available_rooms = all_rooms.exclude(id__in=conflicting_room_ids).filter(
-                status='vacant_clean'
-            )
+            bookable_rooms = list(Room.objects.filter(status='vacant_clean'))
+            
+            # Exclude rooms with conflicting reservations using the in-memory stay index
+            free_ids = set(stay_index.free_rooms([room.id for room in bookable_rooms], check_in_date, check_out_date))
+            available_rooms = [room for room in bookable_rooms if room.id in free_ids]
             
             # Format response data
             rooms_data = []
@@ -951,14 +1089,14 @@ def check_available_rooms(request):
                     'id': room.id,
                     'room_number': room.room_number,
                     'room_type': room.room_type,
-                    'price_per_night': float(room.rate),
+                    'price_per_night': room.rate,
                     'status': room.status
                 })
             
-            return JsonResponse({
+            return json_response({
                 'available_rooms': rooms_data,
                 'total_available': len(rooms_data)
-            })
+            }, request)
             
         except ValueError:
             return JsonResponse({'error': 'Invalid date format'}, status=400)
@@ -968,16 +1106,48 @@ def check_available_rooms(request):
     return JsonResponse({'error': 'Method not allowed'}, status=405)
 
 
+def report_job(request, job_id):
+    """Progress page of a background report job; polls report_job_status until the result is ready"""
+    job = get_object_or_404(ReportJob, id=job_id)
+    return render(request, 'pms/reports/report_job.html', {'job': job})
+
+
+def report_job_status(request, job_id):
+    """API endpoint with the status and progress of a background report job"""
+    job = get_object_or_404(ReportJob.objects.defer('result'), id=job_id)
+    return JsonResponse({
+        'id': job.id,
+        'status': job.status,
+        'progress': job.progress,
+        'error': job.error,
+        'result_url': reverse('report_job_result', args=[job.id]) if job.status == 'done' else None,
+    })
+
+
+def report_job_result(request, job_id):
+    """The rendered report of a finished job; ?download=1 serves it as a file"""
+    job = get_object_or_404(ReportJob, id=job_id)
+    if job.status != 'done':
+        return redirect('report_job', job_id=job.id)
+    response = HttpResponse(job.result)
+    if request.GET.get('download'):
+        filename = f"{job.report}-{job.created_at:%Y%m%d}-{job.id}.html"
+        response['Content-Disposition'] = f'attachment; filename="{filename}"'
+    return response
+
+
 def reports_home(request):
     """View for reports dashboard/home page"""
-    # You can add any summary data here if needed
     context = {
-        'page_title': 'Reports Dashboard'
+        'page_title': 'Reports Dashboard',
+        # Hits and misses of the report result cache (pms/report_cache.py)
+        'report_cache_stats': report_cache_stats(),
     }
     return render(request, 'pms/reports/reports_home.html', context)
 
 
 
+@cached_report('revenue_report')
 def revenue_report(request):
     """View for generating detailed revenue reports"""
     # Get date range parameters
@@ -998,86 +1168,38 @@ def revenue_report(request):
     else:
         end_date = datetime.strptime(end_date_str, '%Y-%m-%d').date()
     
-    # Get reservations in date range
-    reservations = Reservation.objects.filter(
-        check_in__lte=end_date,
-        check_out__gte=start_date,
-        status__in=['confirmed', 'in_house', 'expected_arrival', 'expected_departure', 'checked_out', 'no_show']
-    )
-    
-    if room_type:
-        reservations = reservations.filter(room__room_type=room_type)
-    
-    # Calculate total revenue
-    total_revenue = sum(res.total_amount for res in reservations if res.total_amount)
-    
-    # Calculate occupied room nights and daily revenue
-    date_range = (end_date - start_date).days + 1
-    dates = [start_date + timedelta(days=i) for i in range(date_range)]
-    
-    occupied_nights = 0
-    daily_revenue = []
-    
-    for current_date in dates:
-        day_reservations = reservations.filter(
-            check_in__lte=current_date,
-            check_out__gt=current_date
-        )
-        day_revenue = 0
-        for res in day_reservations:
-            if res.total_amount:
-                nights = (res.check_out - res.check_in).days
-                day_revenue += res.total_amount / nights if nights > 0 else 0
-        
-        daily_revenue.append({
-            'date': current_date,
-            'revenue': day_revenue,
-            'occupied_rooms': day_reservations.count()
-        })
-        occupied_nights += day_reservations.count()
-    
-    # Calculate ADR (Average Daily Rate)
-    adr = total_revenue / occupied_nights if occupied_nights > 0 else 0
-    
-    # Calculate RevPAR (Revenue Per Available Room)
-    total_rooms = Room.objects.count()
-    available_room_nights = total_rooms * date_range
-    revpar = total_revenue / available_room_nights if available_room_nights > 0 else 0
+    # Prorated nightly revenue for the window, summed from the room-night ledger
+    summary = RevenueSummary(start_date, end_date, room_type=room_type)
+    total_revenue = summary.total_revenue
+    occupied_nights = summary.occupied_nights
+    daily_revenue = summary.daily()
+    adr = summary.adr
+    revpar = summary.revpar
     
     # Revenue by room type
     room_type_revenue = {}
     for room_type_choice, room_type_name in Room.ROOM_TYPES:
-        type_reservations = reservations.filter(room__room_type=room_type_choice)
-        type_revenue = sum(res.total_amount for res in type_reservations if res.total_amount)
-        type_nights = sum((res.check_out - res.check_in).days for res in type_reservations)
-        type_adr = type_revenue / type_nights if type_nights > 0 else 0
-        
-        if type_revenue > 0:  # Only include room types with revenue
+        totals = summary.by_room_type.get(room_type_choice)
+        if totals and totals['revenue'] > 0:  # Only include room types with revenue
             room_type_revenue[room_type_name] = {
-                'revenue': type_revenue,
-                'nights': type_nights,
-                'adr': type_adr
+                'revenue': totals['revenue'],
+                'nights': totals['nights'],
+                'adr': totals['revenue'] / totals['nights']
             }
     
-    # Revenue by payment method
+    # Revenue by payment method, for the active payment methods
     payment_method_revenue = {}
-    # Get active payment methods from the database
-    payment_methods = PaymentMethod.objects.filter(is_active=True)
-    for payment_method in payment_methods:
-        method_revenue = sum(res.total_amount for res in reservations 
-                           if res.payment_method == payment_method and res.total_amount)
-        if method_revenue > 0:  # Only include methods with revenue
-            payment_method_revenue[payment_method.name] = method_revenue
-    
-    # Revenue by agent/source
+    for payment_method in PaymentMethod.objects.filter(is_active=True):
+        totals = summary.by_payment_method.get(payment_method.id)
+        if totals and totals['revenue'] > 0:  # Only include methods with revenue
+            payment_method_revenue[payment_method.name] = totals['revenue']
+    
+    # Revenue by agent/source, for the active agents
     agent_revenue = {}
-    # Get active agents from the database
-    agents = Agent.objects.filter(is_active=True)
-    for agent in agents:
-        agent_rev = sum(res.total_amount for res in reservations 
-                       if res.agent == agent and res.total_amount)
-        if agent_rev > 0:  # Only include agents with revenue
-            agent_revenue[agent.name] = agent_rev
+    for agent in Agent.objects.filter(is_active=True):
+        totals = summary.by_agent.get(agent.id)
+        if totals and totals['revenue'] > 0:  # Only include agents with revenue
+            agent_revenue[agent.name] = totals['revenue']
     
     context = {
         'start_date': start_date,
@@ -1094,8 +1216,9 @@ def revenue_report(request):
         'selected_room_type': room_type
     }
     
-    return render(request, 'pms/reports/revenue_report.html', context)
+    return report_response(request, 'pms/reports/revenue_report.html', context, start_date, end_date)
 
+@cached_report('occupancy_report')
 def occupancy_report(request):
     """View for generating detailed occupancy reports"""
     # Get date range parameters
@@ -1118,6 +1241,11 @@ def occupancy_report(request):
     else:
         end_date = datetime.strptime(end_date_str, '%Y-%m-%d').date()
     
+    # Long windows are computed by the report worker instead of this request
+    job_response = run_in_background(request, 'occupancy_report', (end_date - start_date).days + 1)
+    if job_response:
+        return job_response
+    
     # Get all rooms, filtered by type if specified
     rooms = Room.objects.all()
     if room_type:
@@ -1127,32 +1255,18 @@ def occupancy_report(request):
     date_range = (end_date - start_date).days + 1
     dates = [start_date + timedelta(days=i) for i in range(date_range)]
     
+    # Build the rooms x days occupancy matrix in one query
+    occupancy = OccupancyMatrix(start_date, end_date, rooms=rooms)
+    set_progress(request, 60)
+    
     # Initialize data structures
     daily_occupancy = []
-    room_occupancy = {}
-    total_rooms = rooms.count()
+    total_rooms = occupancy.room_count
     total_room_nights = total_rooms * date_range
     occupied_room_nights = 0
     
     # Calculate occupancy for each day
-    for current_date in dates:
-        occupied_rooms = 0
-        for room in rooms:
-            # Check if room is occupied on this date
-            is_occupied = Reservation.objects.filter(
-                room=room,
-                check_in__lte=current_date,
-                check_out__gt=current_date,
-                status__in=['confirmed', 'in_house', 'expected_arrival', 'expected_departure', 'checked_out', 'no_show']
-            ).exists()
-            
-            if is_occupied:
-                occupied_rooms += 1
-                # Track occupancy by room
-                if room.room_number not in room_occupancy:
-                    room_occupancy[room.room_number] = 0
-                room_occupancy[room.room_number] += 1
-        
+    for current_date, occupied_rooms in zip(dates, occupancy.daily_counts()):
         # Calculate daily occupancy percentage
         daily_percentage = (occupied_rooms / total_rooms * 100) if total_rooms > 0 else 0
         occupied_room_nights += occupied_rooms
@@ -1165,27 +1279,19 @@ def occupancy_report(request):
             'percentage': daily_percentage
         })
     
+    # Track occupancy by room
+    room_occupancy = occupancy.room_nights()
+    
     # Calculate overall occupancy percentage
     overall_occupancy = (occupied_room_nights / total_room_nights * 100) if total_room_nights > 0 else 0
     
     # Calculate occupancy by room type
     room_type_occupancy = {}
+    type_nights = occupancy.room_type_nights()
     for room_type_choice, room_type_name in Room.ROOM_TYPES:
-        type_rooms = rooms.filter(room_type=room_type_choice)
-        type_room_count = type_rooms.count()
+        type_room_count = type_nights.get(room_type_choice, {}).get('rooms', 0)
         if type_room_count > 0:
-            type_occupied_nights = 0
-            for current_date in dates:
-                for room in type_rooms:
-                    is_occupied = Reservation.objects.filter(
-                        room=room,
-                        check_in__lte=current_date,
-                        check_out__gt=current_date,
-                        status__in=['confirmed', 'in_house', 'expected_arrival', 'expected_departure', 'checked_out', 'no_show']
-                    ).exists()
-                    if is_occupied:
-                        type_occupied_nights += 1
-            
+            type_occupied_nights = type_nights[room_type_choice]['occupied_nights']
             type_total_nights = type_room_count * date_range
             type_percentage = (type_occupied_nights / type_total_nights * 100) if type_total_nights > 0 else 0
             room_type_occupancy[room_type_name] = {
@@ -1228,14 +1334,13 @@ def occupancy_report(request):
         'selected_room_type': room_type
     }
     
-    return render(request, 'pms/reports/occupancy_report.html', context)
+    return report_response(request, 'pms/reports/occupancy_report.html', context, start_date, end_date)
 
 
+@cached_report('forecast_report', relative=True)
 def forecast_report(request):
     """View for generating forecast and trends analysis with industry best practices"""
-    from django.db.models import Count, Avg, Sum, Q
-    from collections import defaultdict
-    import calendar
+    from django.db.models import Count, Sum
     
     # Get date range parameters
     start_date_str = request.GET.get('start_date', '')
@@ -1274,66 +1379,47 @@ def forecast_report(request):
     # Calculate actual historical period used
     historical_days = (end_date - start_date).days
     
-    # Get historical data for analysis
-    historical_reservations = Reservation.objects.filter(
-        check_in__range=[start_date, end_date],
-        status__in=['confirmed', 'in_house', 'expected_arrival', 'expected_departure', 'checked_out', 'no_show']
-    )
+    # Long histories are computed by the report worker instead of this request
+    job_response = run_in_background(request, 'forecast_report', (forecast_end_date - start_date).days + 1)
+    if job_response:
+        return job_response
     
-    # Monthly trends analysis (last 12 months)
+    # Arrivals per day for the history window, the 12 trend months and the current month, in one query
+    total_rooms = Room.objects.count()
+    current_month_start = today.replace(day=1)
+    trend_start = add_months(current_month_start, -11)
+    trends = BookingTrends(min(start_date, trend_start), max(end_date, month_end(current_month_start)))
+    
+    # Monthly trends analysis (last 12 calendar months, oldest to newest)
     monthly_trends = []
-    for i in range(12):
-        month_start = today.replace(day=1) - timedelta(days=30*i)
-        month_start = month_start.replace(day=1)
-        if month_start.month == 12:
-            month_end = month_start.replace(year=month_start.year + 1, month=1, day=1) - timedelta(days=1)
-        else:
-            month_end = month_start.replace(month=month_start.month + 1, day=1) - timedelta(days=1)
-        
-        month_reservations = Reservation.objects.filter(
-            check_in__range=[month_start, month_end],
-            status__in=['confirmed', 'in_house', 'expected_arrival', 'expected_departure', 'checked_out', 'no_show']
-        )
-        
-        month_revenue = float(sum(r.total_amount for r in month_reservations))
-        month_nights = sum((r.check_out - r.check_in).days for r in month_reservations)
+    for month_start, totals in trends.monthly(current_month_start, 12):
+        month_revenue = float(totals['revenue'])
+        month_nights = totals['nights']
         
         # Calculate occupancy for the month
-        total_rooms = Room.objects.count()
-        days_in_month = (month_end - month_start).days + 1
-        total_room_nights = total_rooms * days_in_month
+        total_room_nights = total_rooms * month_end(month_start).day
         occupancy_rate = (month_nights / total_room_nights * 100) if total_room_nights > 0 else 0
         
         monthly_trends.append({
             'month': month_start.strftime('%b %Y'),
             'month_date': month_start,
-            'reservations': month_reservations.count(),
+            'reservations': totals['reservations'],
             'revenue': month_revenue,
             'nights': month_nights,
             'occupancy': occupancy_rate,
             'adr': month_revenue / month_nights if month_nights > 0 else 0
         })
     
-    monthly_trends.reverse()  # Show oldest to newest
+    set_progress(request, 40)
     
     # Seasonal analysis (by quarter)
     seasonal_data = {}
-    quarters = {
-        'Q1': [1, 2, 3],
-        'Q2': [4, 5, 6], 
-        'Q3': [7, 8, 9],
-        'Q4': [10, 11, 12]
-    }
-    
-    for quarter, months in quarters.items():
-        quarter_reservations = historical_reservations.filter(
-            check_in__month__in=months
-        )
-        quarter_revenue = float(sum(r.total_amount for r in quarter_reservations))
-        quarter_nights = sum((r.check_out - r.check_in).days for r in quarter_reservations)
+    for quarter, totals in trends.quarterly(start_date, end_date).items():
+        quarter_revenue = float(totals['revenue'])
+        quarter_nights = totals['nights']
         
         seasonal_data[quarter] = {
-            'reservations': quarter_reservations.count(),
+            'reservations': totals['reservations'],
             'revenue': quarter_revenue,
             'nights': quarter_nights,
             'avg_adr': quarter_revenue / quarter_nights if quarter_nights > 0 else 0
@@ -1341,16 +1427,13 @@ def forecast_report(request):
     
     # Day of week analysis
     weekday_analysis = {}
-    weekday_names = ['Monday', 'Tuesday', 'Wednesday', 'Thursday', 'Friday', 'Saturday', 'Sunday']
-    
-    for i, day_name in enumerate(weekday_names):
-        day_reservations = [r for r in historical_reservations if r.check_in.weekday() == i]
-        day_revenue = float(sum(r.total_amount for r in day_reservations))
+    for day_name, totals in trends.by_weekday(start_date, end_date).items():
+        day_revenue = float(totals['revenue'])
         
         weekday_analysis[day_name] = {
-            'reservations': len(day_reservations),
+            'reservations': totals['reservations'],
             'revenue': day_revenue,
-            'avg_revenue': day_revenue / len(day_reservations) if day_reservations else 0
+            'avg_revenue': day_revenue / totals['reservations'] if totals['reservations'] else 0
         }
     
     # Calculate forecast metrics based on historical trends with enhanced confidence
@@ -1365,12 +1448,15 @@ def forecast_report(request):
         # Long-term: Use last 6-12 months
         recent_months = monthly_trends[-8:] if len(monthly_trends) >= 8 else monthly_trends
     
-    avg_monthly_reservations = sum(m['reservations'] for m in recent_months) / len(recent_months) if recent_months else 0
-    avg_monthly_revenue = sum(m['revenue'] for m in recent_months) / len(recent_months) if recent_months else 0
-    avg_monthly_occupancy = sum(m['occupancy'] for m in recent_months) / len(recent_months) if recent_months else 0
+    # Daily projections with 95% intervals from the seasonal models fitted on the ledger
+    daily_forecast = ledger_forecast(forecast_days, today, rooms=total_rooms)
+    projected_nights = sum(day['nights'] for day in daily_forecast)
+    projected_revenue = sum(day['revenue'] for day in daily_forecast)
     
-    # Project forecast for the selected period
-    forecast_multiplier = forecast_days / 30  # Scale based on forecast period
+    # Reservations follow from the nights at the recent average length of stay
+    recent_reservations = sum(m['reservations'] for m in recent_months)
+    recent_nights = sum(m['nights'] for m in recent_months)
+    avg_stay = recent_nights / recent_reservations if recent_reservations else 0
     
     # Enhanced confidence calculation based on industry standards
     def calculate_confidence_level(historical_days, forecast_days, data_points):
@@ -1420,9 +1506,10 @@ def forecast_report(request):
     forecast_metrics = {
         'period_days': forecast_days,
         'end_date': forecast_end_date,
-        'projected_reservations': int(avg_monthly_reservations * forecast_multiplier),
-        'projected_revenue': avg_monthly_revenue * forecast_multiplier,
-        'projected_occupancy': avg_monthly_occupancy,
+        'projected_reservations': int(projected_nights / avg_stay) if avg_stay else 0,
+        'projected_revenue': projected_revenue,
+        'projected_nights': projected_nights,
+        'projected_occupancy': projected_nights / (total_rooms * forecast_days) * 100 if total_rooms and forecast_days else 0,
         'confidence_level': adjusted_confidence,
         'historical_days': historical_days,
         'data_quality': len(recent_months),
@@ -1442,25 +1529,19 @@ def forecast_report(request):
         revenue_growth = 0
         occupancy_growth = 0
     
-    # Key performance indicators
-    total_rooms = Room.objects.count()
-    current_month_start = today.replace(day=1)
-    current_month_reservations = Reservation.objects.filter(
-        check_in__gte=current_month_start,
-        check_in__lt=today,
-        status__in=['confirmed', 'in_house', 'expected_arrival', 'expected_departure', 'checked_out', 'no_show']
-    )
+    set_progress(request, 80)
     
-    current_month_revenue = float(sum(r.total_amount for r in current_month_reservations))
-    current_month_nights = sum((r.check_out - r.check_in).days for r in current_month_reservations)
+    # Key performance indicators
+    month_to_date = trends.totals(current_month_start, today - timedelta(days=1))
+    current_month_revenue = float(month_to_date['revenue'])
     
     # Upcoming reservations (next 30 days)
-    upcoming_reservations = Reservation.objects.filter(
+    upcoming = Reservation.objects.filter(
         check_in__range=[today, today + timedelta(days=30)],
         status__in=['confirmed', 'expected_arrival']
-    )
+    ).aggregate(count=Count('id'), revenue=Sum('total_amount'))
     
-    upcoming_revenue = float(sum(r.total_amount for r in upcoming_reservations))
+    upcoming_revenue = float(upcoming['revenue'] or 0)
     
     context = {
         'start_date': start_date,
@@ -1471,21 +1552,27 @@ def forecast_report(request):
         'seasonal_data': seasonal_data,
         'weekday_analysis': weekday_analysis,
         'forecast_metrics': forecast_metrics,
+        'daily_forecast': daily_forecast,
         'revenue_growth': revenue_growth,
         'occupancy_growth': occupancy_growth,
         'current_month_revenue': current_month_revenue,
-        'current_month_reservations': current_month_reservations.count(),
-        'upcoming_reservations': upcoming_reservations.count(),
+        'current_month_reservations': month_to_date['reservations'],
+        'upcoming_reservations': upcoming['count'],
         'upcoming_revenue': upcoming_revenue,
         'total_rooms': total_rooms,
     }
     
-    return render(request, 'pms/reports/forecast_report.html', context)
+    # Besides the history window: 12 months of trends, the ledger history of
+    # the forecast models and the next 30 days of bookings
+    return report_response(request, 'pms/reports/forecast_report.html', context,
+                           min(start_date, trend_start, history_start(today)),
+                           max(end_date, forecast_end_date, today + timedelta(days=30)))
 
 
+@cached_report('operational_report')
 def operational_report(request):
     """View for generating operational reports - housekeeping, maintenance, and operational KPIs"""
-    from django.db.models import Count, Q, Avg
+    from django.db.models import Count
     from collections import defaultdict
     
     # Get date range parameters (consistent with other reports)
@@ -1510,19 +1597,23 @@ def operational_report(request):
     date_range = (end_date - start_date).days + 1
     dates = [start_date + timedelta(days=i) for i in range(date_range)]
     
-    # Room Status Overview
-    room_status_counts = {}
-    for status_code, status_name in Room.STATUS_CHOICES:
-        count = Room.objects.filter(status=status_code).count()
-        room_status_counts[status_name] = count
-    
-    total_rooms = Room.objects.count()
+    # Room board: rooms per type and status, in one grouped query
+    room_counts = defaultdict(lambda: defaultdict(int))
+    status_totals = defaultdict(int)
+    for room_type_code, status_code, count in Room.objects.values_list('room_type', 'status').annotate(
+        count=Count('id')
+    ).order_by():
+        room_counts[room_type_code][status_code] += count
+        status_totals[status_code] += count
+
+    room_status_counts = {status_name: status_totals[status_code] for status_code, status_name in Room.STATUS_CHOICES}
+    total_rooms = sum(status_totals.values())
     
     # Housekeeping Metrics
-    rooms_needing_cleaning = Room.objects.filter(status='vacant_dirty').count()
-    rooms_out_of_order = Room.objects.filter(status='out_of_order').count()
-    rooms_in_maintenance = Room.objects.filter(status='maintenance').count()
-    rooms_ready = Room.objects.filter(status='vacant_clean').count()
+    rooms_needing_cleaning = status_totals['vacant_dirty']
+    rooms_out_of_order = status_totals['out_of_order']
+    rooms_in_maintenance = status_totals['maintenance']
+    rooms_ready = status_totals['vacant_clean']
     
     # Calculate housekeeping efficiency
     housekeeping_efficiency = (rooms_ready / total_rooms * 100) if total_rooms > 0 else 0
@@ -1539,42 +1630,40 @@ def operational_report(request):
         status__in=['in_house', 'expected_departure', 'checked_out']
     ).select_related('guest', 'room')
     
-    # Period Operations Summary (for entire date range)
-    period_arrivals = Reservation.objects.filter(
-        check_in__range=[start_date, end_date],
-        status__in=['confirmed', 'expected_arrival', 'in_house', 'checked_out']
-    )
-    
-    period_departures = Reservation.objects.filter(
-        check_out__range=[start_date, end_date],
-        status__in=['in_house', 'expected_departure', 'checked_out']
-    )
-    
-    # Check-in/Check-out Performance for the period
-    checked_in_period = Reservation.objects.filter(
-        check_in__range=[start_date, end_date],
-        status__in=['in_house', 'checked_out']
-    ).count()
-    
-    checked_out_period = Reservation.objects.filter(
+    # Arrivals and departures per day and status over the period, in two grouped queries;
+    # the daily trends and the period summary are folded from them
+    arrival_statuses = ['confirmed', 'expected_arrival', 'in_house', 'checked_out']
+    departure_statuses = ['in_house', 'expected_departure', 'checked_out']
+    daily_trends = {
+        current_date: {'date': current_date, 'arrivals': 0, 'departures': 0, 'no_shows': 0}
+        for current_date in dates
+    }
+    checked_in_period = no_shows_period = cancellations_period = total_expected_arrivals = 0
+    for check_in, status, count in Reservation.objects.filter(
+        check_in__range=[start_date, end_date]
+    ).values_list('check_in', 'status').annotate(count=Count('id')).order_by():
+        if status in arrival_statuses:
+            daily_trends[check_in]['arrivals'] += count
+            total_expected_arrivals += count
+        if status in ('in_house', 'checked_out'):
+            checked_in_period += count
+        elif status == 'no_show':
+            daily_trends[check_in]['no_shows'] += count
+            no_shows_period += count
+        elif status == 'canceled':
+            cancellations_period += count
+
+    checked_out_period = total_expected_departures = 0
+    for check_out, status, count in Reservation.objects.filter(
         check_out__range=[start_date, end_date],
-        status='checked_out'
-    ).count()
-    
-    # No-shows and cancellations for the period
-    no_shows_period = Reservation.objects.filter(
-        check_in__range=[start_date, end_date],
-        status='no_show'
-    ).count()
-    
-    cancellations_period = Reservation.objects.filter(
-        check_in__range=[start_date, end_date],
-        status='canceled'
-    ).count()
-    
-    # Calculate operational KPIs for the period
-    total_expected_arrivals = period_arrivals.count()
-    total_expected_departures = period_departures.count()
+        status__in=departure_statuses
+    ).values_list('check_out', 'status').annotate(count=Count('id')).order_by():
+        daily_trends[check_out]['departures'] += count
+        total_expected_departures += count
+        if status == 'checked_out':
+            checked_out_period += count
+
+    daily_trends = list(daily_trends.values())
     
     arrival_completion_rate = (checked_in_period / total_expected_arrivals * 100) if total_expected_arrivals > 0 else 0
     departure_completion_rate = (checked_out_period / total_expected_departures * 100) if total_expected_departures > 0 else 0
@@ -1586,39 +1675,14 @@ def operational_report(request):
         reservation__status='checked_out'
     ).distinct().count()
     
-    # Daily Operational Trends for the selected period
-    daily_trends = []
-    for current_date in dates:
-        daily_arrivals = Reservation.objects.filter(
-            check_in=current_date,
-            status__in=['confirmed', 'expected_arrival', 'in_house', 'checked_out']
-        ).count()
-        
-        daily_departures = Reservation.objects.filter(
-            check_out=current_date,
-            status__in=['in_house', 'expected_departure', 'checked_out']
-        ).count()
-        
-        daily_no_shows = Reservation.objects.filter(
-            check_in=current_date,
-            status='no_show'
-        ).count()
-        
-        daily_trends.append({
-            'date': current_date,
-            'arrivals': daily_arrivals,
-            'departures': daily_departures,
-            'no_shows': daily_no_shows
-        })
-    
     # Room Type Performance
     room_type_performance = {}
     for room_type_code, room_type_name in Room.ROOM_TYPES:
-        type_rooms = Room.objects.filter(room_type=room_type_code)
-        type_total = type_rooms.count()
-        type_occupied = type_rooms.filter(status='occupied').count()
-        type_dirty = type_rooms.filter(status='vacant_dirty').count()
-        type_maintenance = type_rooms.filter(status__in=['maintenance', 'out_of_order']).count()
+        type_counts = room_counts[room_type_code]
+        type_total = sum(type_counts.values())
+        type_occupied = type_counts['occupied']
+        type_dirty = type_counts['vacant_dirty']
+        type_maintenance = type_counts['maintenance'] + type_counts['out_of_order']
         
         room_type_performance[room_type_name] = {
             'total': type_total,
@@ -1628,25 +1692,21 @@ def operational_report(request):
             'ready': type_total - type_occupied - type_dirty - type_maintenance
         }
     
-    # Payment Method Analysis for the period
-    payment_method_stats = defaultdict(int)
+    # Payment Method and Agent Analysis for the period, grouped in the database
     period_reservations = Reservation.objects.filter(
         check_in__range=[start_date, end_date]
-    ).select_related('payment_method')
-    
-    for reservation in period_reservations:
-        if reservation.payment_method:
-            payment_method_stats[reservation.payment_method.name] += 1
-        else:
-            payment_method_stats['Not Specified'] += 1
+    )
+    payment_method_stats = defaultdict(int)
+    for name, count in period_reservations.values_list('payment_method__name').annotate(
+        count=Count('id')
+    ).order_by('-count'):
+        payment_method_stats[name or 'Not Specified'] += count
     
-    # Agent Performance for the period
     agent_stats = defaultdict(int)
-    for reservation in period_reservations:
-        if reservation.agent:
-            agent_stats[reservation.agent.name] += 1
-        else:
-            agent_stats['Direct Booking'] += 1
+    for name, count in period_reservations.values_list('agent__name').annotate(
+        count=Count('id')
+    ).order_by('-count'):
+        agent_stats[name or 'Direct Booking'] += count
     
     # Critical Alerts
     alerts = []
@@ -1708,11 +1768,14 @@ def operational_report(request):
         'alerts': alerts,
     }
     
-    return render(request, 'pms/reports/operational_report.html', context)
+    return report_response(request, 'pms/reports/operational_report.html', context, start_date, end_date, rooms=True)
 
 
+@cached_report('booking_sources_report')
 def booking_sources_report(request):
     """View for generating booking sources and channel performance reports"""
+    from django.db.models import Count, DurationField, ExpressionWrapper, F, Sum
+    from collections import defaultdict
     
     def calculate_performance_score(conversion_rate, booking_count, revenue, total_bookings, total_revenue):
         """
@@ -1788,155 +1851,105 @@ def booking_sources_report(request):
     if agent_filter:
         reservations = reservations.filter(agent__id=agent_filter)
     
-    total_reservations = reservations.count()
-    
-    # Calculate Potential Revenue (all bookings regardless of status)
-    potential_revenue = sum(res.total_amount for res in reservations if res.total_amount)
-    
-    # Calculate Actual Revenue (only revenue-generating statuses, including no_show since they typically still pay)
+    # Bookings, revenue and nights per source and status, in one grouped query
     actual_revenue_statuses = ['confirmed', 'in_house', 'expected_arrival', 'expected_departure', 'checked_out', 'no_show']
-    actual_revenue = sum(
-        res.total_amount for res in reservations.filter(status__in=actual_revenue_statuses) 
-        if res.total_amount
-    )
+    sources = defaultdict(lambda: {
+        'reservations': 0, 'potential_revenue': 0, 'actual_revenue': 0, 'nights': 0,
+        'confirmed': 0, 'canceled': 0, 'no_show': 0,
+    })
+    rows = reservations.values_list('agent_id', 'status').annotate(
+        count=Count('id'),
+        revenue=Sum('total_amount'),
+        stay=Sum(ExpressionWrapper(F('check_out') - F('check_in'), output_field=DurationField())),
+    ).order_by()
+    for agent_id, status, count, revenue, stay in rows:
+        source = sources[agent_id]
+        source['reservations'] += count
+        source['potential_revenue'] += revenue or 0
+        source['nights'] += stay.days if stay else 0
+        # no_show counts as confirmed since they typically still pay
+        if status in actual_revenue_statuses:
+            source['actual_revenue'] += revenue or 0
+            source['confirmed'] += count
+        if status == 'canceled':
+            source['canceled'] += count
+        elif status == 'no_show':
+            source['no_show'] += count
+
+    total_reservations = sum(source['reservations'] for source in sources.values())
+    
+    # Potential Revenue (all bookings regardless of status) and Actual Revenue (revenue-generating statuses)
+    potential_revenue = sum(source['potential_revenue'] for source in sources.values())
+    actual_revenue = sum(source['actual_revenue'] for source in sources.values())
+    
+    def source_performance(agent_id, source):
+        count = source['reservations']
+        conversion_rate = source['confirmed'] / count * 100
+        
+        # Average booking value and ADR are based on actual revenue
+        source_actual_revenue = source['actual_revenue']
+        source_potential_revenue = source['potential_revenue']
+        nights = source['nights']
+        return {
+            'agent_id': agent_id,
+            'reservations': count,
+            'potential_revenue': source_potential_revenue,
+            'actual_revenue': source_actual_revenue,
+            'revenue': source_actual_revenue,  # Keep for backward compatibility
+            'nights': nights,
+            'conversion_rate': conversion_rate,
+            'cancellation_rate': source['canceled'] / count * 100,
+            'no_show_rate': source['no_show'] / count * 100,
+            'avg_booking_value': source_actual_revenue / count,
+            'adr': source_actual_revenue / nights if nights > 0 else 0,
+            'market_share': (count / total_reservations * 100) if total_reservations > 0 else 0,
+            'revenue_share': (source_actual_revenue / actual_revenue * 100) if actual_revenue > 0 else 0,
+            'potential_revenue_share': (source_potential_revenue / potential_revenue * 100) if potential_revenue > 0 else 0,
+            'performance_score': calculate_performance_score(
+                conversion_rate, count, source_actual_revenue, total_reservations, actual_revenue
+            ),
+        }
     
-    # Agent/Source Performance Analysis
+    # Agent/Source Performance Analysis; only agents with bookings are included
     agent_performance = {}
-    agents = Agent.objects.filter(is_active=True)
+    agents = list(Agent.objects.filter(is_active=True))
     
     for agent in agents:
-        agent_reservations = reservations.filter(agent=agent)
-        agent_count = agent_reservations.count()
-        
-        # Calculate both potential and actual revenue for this agent
-        agent_potential_revenue = sum(res.total_amount for res in agent_reservations if res.total_amount)
-        agent_actual_revenue = sum(
-            res.total_amount for res in agent_reservations.filter(status__in=actual_revenue_statuses) 
-            if res.total_amount
-        )
-        
-        agent_nights = sum((res.check_out - res.check_in).days for res in agent_reservations)
-        
-        # Calculate conversion metrics (no_show now counts as confirmed since they generate revenue)
-        confirmed_reservations = agent_reservations.filter(
-            status__in=['confirmed', 'in_house', 'expected_arrival', 'expected_departure', 'checked_out', 'no_show']
-        ).count()
-        canceled_reservations = agent_reservations.filter(status='canceled').count()
-        no_show_reservations = agent_reservations.filter(status='no_show').count()
-        
-        conversion_rate = (confirmed_reservations / agent_count * 100) if agent_count > 0 else 0
-        cancellation_rate = (canceled_reservations / agent_count * 100) if agent_count > 0 else 0
-        no_show_rate = (no_show_reservations / agent_count * 100) if agent_count > 0 else 0
-        
-        # Calculate average booking value and ADR based on actual revenue
-        avg_booking_value = agent_actual_revenue / agent_count if agent_count > 0 else 0
-        adr = agent_actual_revenue / agent_nights if agent_nights > 0 else 0
-        
-        if agent_count > 0:  # Only include agents with bookings
-            # Calculate performance score based on multiple factors
-            performance_score = calculate_performance_score(
-                conversion_rate, agent_count, agent_actual_revenue, 
-                total_reservations, actual_revenue
-            )
-            
-            agent_performance[agent.name] = {
-                'agent_id': agent.id,
-                'reservations': agent_count,
-                'potential_revenue': agent_potential_revenue,
-                'actual_revenue': agent_actual_revenue,
-                'revenue': agent_actual_revenue,  # Keep for backward compatibility
-                'nights': agent_nights,
-                'conversion_rate': conversion_rate,
-                'cancellation_rate': cancellation_rate,
-                'no_show_rate': no_show_rate,
-                'avg_booking_value': avg_booking_value,
-                'adr': adr,
-                'market_share': (agent_count / total_reservations * 100) if total_reservations > 0 else 0,
-                'revenue_share': (agent_actual_revenue / actual_revenue * 100) if actual_revenue > 0 else 0,
-                'potential_revenue_share': (agent_potential_revenue / potential_revenue * 100) if potential_revenue > 0 else 0,
-                'performance_score': performance_score
-            }
+        if agent.id in sources:
+            agent_performance[agent.name] = source_performance(agent.id, sources[agent.id])
     
     # Handle reservations without agent
-    no_agent_reservations = reservations.filter(agent__isnull=True)
-    no_agent_count = no_agent_reservations.count()
-    if no_agent_count > 0:
-        no_agent_potential_revenue = sum(res.total_amount for res in no_agent_reservations if res.total_amount)
-        no_agent_actual_revenue = sum(
-            res.total_amount for res in no_agent_reservations.filter(status__in=actual_revenue_statuses) 
-            if res.total_amount
-        )
-        no_agent_nights = sum((res.check_out - res.check_in).days for res in no_agent_reservations)
-        
-        confirmed_no_agent = no_agent_reservations.filter(
-            status__in=['confirmed', 'in_house', 'expected_arrival', 'expected_departure', 'checked_out', 'no_show']
-        ).count()
-        canceled_no_agent = no_agent_reservations.filter(status='canceled').count()
-        no_show_no_agent = no_agent_reservations.filter(status='no_show').count()
-        
-        direct_conversion_rate = (confirmed_no_agent / no_agent_count * 100) if no_agent_count > 0 else 0
-        
-        # Calculate performance score for direct bookings
-        direct_performance_score = calculate_performance_score(
-            direct_conversion_rate, no_agent_count, no_agent_actual_revenue,
-            total_reservations, actual_revenue
-        )
-        
-        agent_performance['Direct/Unspecified'] = {
-            'agent_id': None,
-            'reservations': no_agent_count,
-            'potential_revenue': no_agent_potential_revenue,
-            'actual_revenue': no_agent_actual_revenue,
-            'revenue': no_agent_actual_revenue,  # Keep for backward compatibility
-            'nights': no_agent_nights,
-            'conversion_rate': direct_conversion_rate,
-            'cancellation_rate': (canceled_no_agent / no_agent_count * 100) if no_agent_count > 0 else 0,
-            'no_show_rate': (no_show_no_agent / no_agent_count * 100) if no_agent_count > 0 else 0,
-            'avg_booking_value': no_agent_actual_revenue / no_agent_count if no_agent_count > 0 else 0,
-            'adr': no_agent_actual_revenue / no_agent_nights if no_agent_nights > 0 else 0,
-            'market_share': (no_agent_count / total_reservations * 100) if total_reservations > 0 else 0,
-            'revenue_share': (no_agent_actual_revenue / actual_revenue * 100) if actual_revenue > 0 else 0,
-            'potential_revenue_share': (no_agent_potential_revenue / potential_revenue * 100) if potential_revenue > 0 else 0,
-            'performance_score': direct_performance_score
-        }
+    if None in sources:
+        agent_performance['Direct/Unspecified'] = source_performance(None, sources[None])
     
     # Sort by revenue (descending)
     sorted_agent_performance = sorted(agent_performance.items(), key=lambda x: x[1]['revenue'], reverse=True)
     
-    # Monthly booking trends by source
+    # Monthly booking trends by source for the last 6 months, folded from one grouped query
+    current_month = today.replace(day=1)
+    first_month = add_months(current_month, -5)
+    month_counts = defaultdict(lambda: defaultdict(int))
+    for check_in, agent_id, count in Reservation.objects.filter(
+        check_in__gte=first_month,
+        check_in__lte=month_end(current_month)
+    ).values_list('check_in', 'agent_id').annotate(count=Count('id')).order_by():
+        month_counts[check_in.replace(day=1)][agent_id] += count
+    
+    # Oldest to newest
     monthly_trends = {}
-    for i in range(6):  # Last 6 months
-        if today.month - i > 0:
-            month_start = today.replace(day=1, month=today.month - i)
-        else:
-            year_offset = (i - today.month) // 12 + 1
-            month_offset = (i - today.month) % 12
-            new_month = 12 - month_offset if month_offset > 0 else 12
-            month_start = today.replace(day=1, year=today.year - year_offset, month=new_month)
-        
-        last_day = monthrange(month_start.year, month_start.month)[1]
-        month_end = month_start.replace(day=last_day)
-        
-        month_reservations = Reservation.objects.filter(
-            check_in__gte=month_start,
-            check_in__lte=month_end
-        )
-        
+    for i in range(6):
+        month_start = add_months(first_month, i)
+        counts = month_counts[month_start]
         month_label = month_start.strftime('%b %Y')
         monthly_trends[month_label] = {}
         
         for agent in agents:
-            agent_month_count = month_reservations.filter(agent=agent).count()
-            if agent_month_count > 0:
-                monthly_trends[month_label][agent.name] = agent_month_count
+            if counts[agent.id] > 0:
+                monthly_trends[month_label][agent.name] = counts[agent.id]
         
         # Direct bookings
-        direct_month_count = month_reservations.filter(agent__isnull=True).count()
-        if direct_month_count > 0:
-            monthly_trends[month_label]['Direct/Unspecified'] = direct_month_count
-    
-    # Reverse to show oldest to newest
-    monthly_trends = dict(reversed(list(monthly_trends.items())))
+        if counts[None] > 0:
+            monthly_trends[month_label]['Direct/Unspecified'] = counts[None]
     
     # Top performing sources summary
     top_by_revenue = sorted_agent_performance[:5] if len(sorted_agent_performance) >= 5 else sorted_agent_performance
@@ -1948,11 +1961,9 @@ def booking_sources_report(request):
     overall_no_show_rate = 0
     
     if total_reservations > 0:
-        confirmed_total = reservations.filter(
-            status__in=['confirmed', 'in_house', 'expected_arrival', 'expected_departure', 'checked_out', 'no_show']
-        ).count()
-        canceled_total = reservations.filter(status='canceled').count()
-        no_show_total = reservations.filter(status='no_show').count()
+        confirmed_total = sum(source['confirmed'] for source in sources.values())
+        canceled_total = sum(source['canceled'] for source in sources.values())
+        no_show_total = sum(source['no_show'] for source in sources.values())
         
         overall_conversion_rate = (confirmed_total / total_reservations * 100)
         overall_cancellation_rate = (canceled_total / total_reservations * 100)
@@ -1976,12 +1987,13 @@ def booking_sources_report(request):
         'selected_agent': agent_filter
     }
     
-    return render(request, 'pms/reports/booking_sources_report.html', context)
+    return report_response(request, 'pms/reports/booking_sources_report.html', context, start_date, end_date)
 
 
+@cached_report('guest_analytics', relative=True)
 def guest_analytics(request):
     """View for generating detailed guest analytics reports"""
-    from django.db.models import Count, Avg, Q, F
+    from django.db.models import Count
     from collections import defaultdict
     
     # Get date range parameters
@@ -2007,7 +2019,7 @@ def guest_analytics(request):
     reservations = Reservation.objects.filter(
         check_in__gte=start_date,
         check_in__lte=end_date
-    ).select_related('guest', 'room')
+    ).select_related('guest__nationality', 'room', 'payment_method', 'agent')
     
     # Basic guest statistics
     total_guests = reservations.count()
@@ -2092,35 +2104,24 @@ def guest_analytics(request):
     # Convert to sorted list for display
     agent_data = sorted(agent_dict.items(), key=lambda x: x[1], reverse=True)
     
-    # Monthly booking trends (for the past 12 months)
+    # Monthly booking trends (for the past 12 months, oldest to newest), folded from one grouped query
+    current_month = today.replace(day=1)
+    first_month = add_months(current_month, -11)
+    month_bookings = defaultdict(int)
+    for check_in, count in Reservation.objects.filter(
+        check_in__gte=first_month,
+        check_in__lte=month_end(current_month)
+    ).values_list('check_in').annotate(count=Count('id')).order_by():
+        month_bookings[check_in.replace(day=1)] += count
+    
     monthly_trends = []
     for i in range(12):
-        # Calculate the month by going back i months from today
-        if today.month - i > 0:
-            month_start = today.replace(day=1, month=today.month - i)
-        else:
-            # Handle year rollover
-            year_offset = (i - today.month) // 12 + 1
-            month_offset = (i - today.month) % 12
-            new_month = 12 - month_offset if month_offset > 0 else 12
-            month_start = today.replace(day=1, year=today.year - year_offset, month=new_month)
-        
-        # Calculate month end using monthrange
-        last_day = monthrange(month_start.year, month_start.month)[1]
-        month_end = month_start.replace(day=last_day)
-        
-        month_bookings = Reservation.objects.filter(
-            check_in__gte=month_start,
-            check_in__lte=month_end
-        ).count()
-        
+        month_start = add_months(first_month, i)
         monthly_trends.append({
             'month': month_start.strftime('%b %Y'),
-            'bookings': month_bookings
+            'bookings': month_bookings[month_start]
         })
     
-    monthly_trends.reverse()  # Show oldest to newest
-    
     # Top guests by number of stays
     top_guests = (
         Guest.objects
@@ -2130,9 +2131,9 @@ def guest_analytics(request):
     )
     
     # Guest satisfaction metrics (based on status completion)
-    completed_stays = reservations.filter(status='checked_out').count()
-    canceled_stays = reservations.filter(status='canceled').count()
-    no_shows = reservations.filter(status='no_show').count()
+    completed_stays = sum(1 for reservation in reservations if reservation.status == 'checked_out')
+    canceled_stays = sum(1 for reservation in reservations if reservation.status == 'canceled')
+    no_shows = sum(1 for reservation in reservations if reservation.status == 'no_show')
     
     completion_rate = (completed_stays / total_guests * 100) if total_guests > 0 else 0
     cancellation_rate = (canceled_stays / total_guests * 100) if total_guests > 0 else 0
@@ -2159,7 +2160,8 @@ def guest_analytics(request):
         'no_show_rate': no_show_rate,
     }
     
-    return render(request, 'pms/reports/guest_analytics.html', context)
+    # Lifetime top guests and trends up to today: depends on every reservation
+    return report_response(request, 'pms/reports/guest_analytics.html', context)
 
 def create_reservation(request):
     initial_data = {}
@@ -2233,28 +2235,6 @@ def confirm_reservation(request, reservation_id):
         'has_conflicts': has_conflicts
     })
 
-def calendar_data(request):
-    reservations = Reservation.objects.all()
-    events = []
-    for reservation in reservations:
-        colors = {
-            'pending': '#FF9800',  # Orange (Pending)
-            'confirmed': '#9C27B0',  # Purple (Confirmed)
-            'expected_arrival': '#4CAF50',  # Green (Expected Arrival)
-            'in_house': '#673AB7',  # Deep Purple (In House)
-            'expected_departure': '#2196F3',  # Blue (Expected Departure)
-            'checked_out': '#00bcd4',  # Cyan (Checked Out)
-            'canceled': '#795548',  # Brown (Canceled)
-            'no_show': '#F44336',  # Red (No Show)
-        }
-        events.append({
-            'id': reservation.id,
-            'title': f"{reservation.guest.name} - {reservation.room.room_number} ({reservation.status})",
-            'start': reservation.check_in.isoformat(),
-            'end': reservation.check_out.isoformat(),
-            'color': colors.get(reservation.status, '#9C27B0'),
-        })
-    return JsonResponse(events, safe=False)
 
 def reservation_detail(request, reservation_id):
     """View to display detailed information about a specific reservation"""
@@ -2317,11 +2297,9 @@ def checkout_reservation(request, reservation_id):
     if request.method == 'POST' and reservation.status in ['in_house', 'expected_departure']:
         reservation.status = 'checked_out'
         reservation.save()
-        # Update room status with today's date
+        # Room needs cleaning after check-out; only written if its status changes
         today = date.today()
-        reservation.room.status = 'vacant_dirty'
-        reservation.room.save()
-        reservation.room.update_status(today)
+        Room.objects.filter(pk=reservation.room_id).update_statuses(today, mark_dirty=True)
         return redirect('reservations_list')
     return redirect('reservations_list')
 
@@ -2334,9 +2312,7 @@ def cancel_reservation(request, reservation_id):
         reservation.cancellation_reason = reason
         reservation.save()
         # Set room status to vacant_dirty so it can be cleaned before rebooking
-        reservation.room.status = 'vacant_dirty'
-        reservation.room.save()
-        reservation.room.update_status()
+        Room.objects.filter(pk=reservation.room_id).update_statuses(mark_dirty=True)
         if request.headers.get('x-requested-with') == 'XMLHttpRequest':
             return JsonResponse({'success': True, 'status': 'canceled', 'reason': reason})
         return redirect('reservations_list')
@@ -2401,6 +2377,7 @@ def guests(request):
     from django.db.models import Count
     
     guests = Guest.objects.all().order_by('-id')
+    search_query = request.GET.get('search', '').strip()
     
     # Calculate metrics
     today = date.today()
@@ -2433,8 +2410,22 @@ def guests(request):
         ).filter(stay_duration__gt=1)
     ).distinct().count()
     
+    # Server-side search through the guest full-text index (see pms/search.py)
+    if search_query:
+        guests = search_guests(guests, search_query)
+
+    # Per-row figures for the client-side filters, in the same query as the list
+    from django.db.models import Exists, OuterRef
+    guests = guests.annotate(
+        reservation_count=Count('reservation'),
+        has_long_stay=Exists(Reservation.objects.filter(
+            guest=OuterRef('pk'), check_out__gt=F('check_in') + timedelta(days=1)
+        )),
+    )
+
     context = {
         'guests': guests,
+        'search_query': search_query,
         'total_guests': total_guests,
         'birthday_this_month': birthday_this_month,
         'recurring_guests': recurring_guests,
@@ -2467,21 +2458,21 @@ def guest_detail(request, guest_id):
         edit_mode = request.GET.get('edit', 'false').lower() == 'true'
     
     # Get guest's reservation history with nights calculation
-    reservations = Reservation.objects.filter(guest=guest).order_by('-check_in')
+    reservations = Reservation.objects.filter(guest=guest).select_related('room').order_by('-check_in')
     
     # Add nights calculation to each reservation
     for reservation in reservations:
         reservation.nights = (reservation.check_out - reservation.check_in).days
     
-    # Calculate guest statistics
-    total_reservations = reservations.count()
-    completed_stays = reservations.filter(status='completed').count()
+    # Calculate guest statistics from the loaded history
+    total_reservations = len(reservations)
+    completed_stays = sum(1 for reservation in reservations if reservation.status == 'completed')
     
     # Calculate total nights stayed
-    total_nights = 0
-    for reservation in reservations.filter(status__in=['completed', 'checked_out']):
-        nights = (reservation.check_out - reservation.check_in).days
-        total_nights += nights
+    total_nights = sum(
+        reservation.nights for reservation in reservations
+        if reservation.status in ['completed', 'checked_out']
+    )
     
     # Get upcoming reservations
     upcoming_reservations = reservations.filter(
@@ -2489,8 +2480,11 @@ def guest_detail(request, guest_id):
         check_in__gte=date.today()
     )
     
-    # Get current reservation (if any)
-    current_reservation = reservations.filter(status='in_house').first()
+    # Get current reservation (if any), the first in_house one by id
+    current_reservation = min(
+        (reservation for reservation in reservations if reservation.status == 'in_house'),
+        key=lambda reservation: reservation.id, default=None
+    )
     
     context = {
         'guest': guest,
@@ -2507,6 +2501,10 @@ def guest_detail(request, guest_id):
 
 def guest_list_json(request):
     guests = Guest.objects.all().order_by('-id')
+    # Optional ?q= narrows the list through the guest full-text index
+    search_query = request.GET.get('q', '').strip()
+    if search_query:
+        guests = search_guests(guests, search_query)
     data = [
         {
             "id": g.id, 
@@ -2515,7 +2513,7 @@ def guest_list_json(request):
             "phone": g.phone or ""
         } for g in guests
     ]
-    return JsonResponse({"guests": data})
+    return json_response({"guests": data}, request)
 
 def check_reservation_conflict(request):
     """AJAX endpoint to check for reservation conflicts"""
@@ -2539,21 +2537,14 @@ def check_reservation_conflict(request):
                     'message': 'Check-out date must be after check-in date'
                 })
             
-            # Check for overlapping reservations
-            active_statuses = ['confirmed', 'expected_arrival', 'in_house']
-            overlapping = Reservation.objects.filter(
-                room_id=room_id,
-                check_in__lt=check_out_date,
-                check_out__gt=check_in_date,
-                status__in=active_statuses
+            # Check for overlapping reservations in the in-memory stay index,
+            # excluding the current reservation if editing
+            conflicting_reservation = first_conflict(
+                int(room_id), check_in_date, check_out_date,
+                exclude_pk=int(current_reservation_id) if current_reservation_id else None
             )
             
-            # Exclude current reservation if editing
-            if current_reservation_id:
-                overlapping = overlapping.exclude(id=current_reservation_id)
-            
-            if overlapping.exists():
-                conflicting_reservation = overlapping.first()
+            if conflicting_reservation:
                 return JsonResponse({
                     'conflict': True,
                     'message': f'Room is already reserved by {conflicting_reservation.guest.name} from {conflicting_reservation.check_in} to {conflicting_reservation.check_out}'
@@ -2587,22 +2578,12 @@ def check_available_rooms(request):
                     'error': 'Check-out date must be after check-in date'
                 }, status=400)
             
-            # Get all rooms
-            all_rooms = Room.objects.all()
-            
-            # Find rooms that have conflicting reservations
-            active_statuses = ['confirmed', 'expected_arrival', 'in_house']
-            conflicting_room_ids = Reservation.objects.filter(
-                check_in__lt=check_out_date,
-                check_out__gt=check_in_date,
-                status__in=active_statuses
-            ).values_list('room_id', flat=True)
-            
-            # Get available rooms (exclude conflicting ones and rooms not available for booking)
             # Rooms must be vacant_clean and not in maintenance/out of order/out of service
-            available_rooms = all_rooms.exclude(id__in=conflicting_room_ids).filter(
-                status='vacant_clean'
-            )
+            bookable_rooms = list(Room.objects.filter(status='vacant_clean'))
+            
+            # Exclude rooms with conflicting reservations using the in-memory stay index
+            free_ids = set(stay_index.free_rooms([room.id for room in bookable_rooms], check_in_date, check_out_date))
+            available_rooms = [room for room in bookable_rooms if room.id in free_ids]
             
             # Format response data
             rooms_data = []
@@ -2611,14 +2592,14 @@ def check_available_rooms(request):
                     'id': room.id,
                     'room_number': room.room_number,
                     'room_type': room.room_type,
-                    'price_per_night': float(room.rate),
+                    'price_per_night': room.rate,
                     'status': room.status
                 })
             
-            return JsonResponse({
+            return json_response({
                 'available_rooms': rooms_data,
                 'total_available': len(rooms_data)
-            })
+            }, request)
             
         except ValueError:
             return JsonResponse({'error': 'Invalid date format'}, status=400)
@@ -2628,6 +2609,130 @@ def check_available_rooms(request):
     return JsonResponse({'error': 'Method not allowed'}, status=405)
 
 
+@csrf_exempt
+def check_available_rooms_batch(request):
+    """API endpoint to get available rooms for many date ranges in one request.
+
+    Expects a JSON body like
+    {"searches": [{"check_in": "2025-08-01", "check_out": "2025-08-03",
+                   "room_type": "garden_view", "guests": 2}, ...]}
+    where room_type and guests are optional.
+    """
+    if request.method != 'POST':
+        return JsonResponse({'error': 'Method not allowed'}, status=405)
+    
+    try:
+        payload = json.loads(request.body or b'{}')
+    except ValueError:
+        return JsonResponse({'error': 'Invalid JSON body'}, status=400)
+    
+    raw_searches = payload.get('searches') if isinstance(payload, dict) else None
+    if not isinstance(raw_searches, list) or not raw_searches:
+        return JsonResponse({'error': 'Missing required parameter: searches'}, status=400)
+    if len(raw_searches) > MAX_AVAILABILITY_SEARCHES:
+        return JsonResponse({'error': f'At most {MAX_AVAILABILITY_SEARCHES} searches per request'}, status=400)
+    
+    # Validate every search up front; invalid ones get an error entry instead of failing the batch
+    valid_room_types = [choice[0] for choice in Room.ROOM_TYPES]
+    searches = []
+    errors = {}
+    for position, raw in enumerate(raw_searches):
+        try:
+            check_in_date = datetime.strptime(raw['check_in'], '%Y-%m-%d').date()
+            check_out_date = datetime.strptime(raw['check_out'], '%Y-%m-%d').date()
+            guests = int(raw.get('guests') or 1)
+        except (KeyError, TypeError, ValueError):
+            errors[position] = 'Invalid or missing check_in, check_out or guests'
+            continue
+        room_type = raw.get('room_type') or ''
+        if check_out_date <= check_in_date:
+            errors[position] = 'Check-out date must be after check-in date'
+        elif room_type and room_type not in valid_room_types:
+            errors[position] = f'Unknown room type: {room_type}'
+        elif guests < 1:
+            errors[position] = 'Guests must be at least 1'
+        else:
+            searches.append((position, {
+                'check_in': check_in_date,
+                'check_out': check_out_date,
+                'room_type': room_type,
+                'guests': guests,
+            }))
+    
+    available = search_availability([search for _, search in searches])
+    results = [{'error': errors.get(position)} for position in range(len(raw_searches))]
+    for (position, search), rooms in zip(searches, available):
+        rooms_data = [{
+            'id': room.id,
+            'room_number': room.room_number,
+            'room_type': room.room_type,
+            'max_occupancy': room.max_occupancy,
+            'price_per_night': float(room.rate),
+            'status': room.status
+        } for room in rooms]
+        results[position] = {
+            'check_in': search['check_in'].isoformat(),
+            'check_out': search['check_out'].isoformat(),
+            'room_type': search['room_type'],
+            'guests': search['guests'],
+            'available_rooms': rooms_data,
+            'total_available': len(rooms_data)
+        }
+    
+    return JsonResponse({'results': results})
+
+def flexible_availability(request):
+    """AJAX endpoint for flexible-date search, e.g. any 3-night stay in the next 60 days.
+
+    Parameters: nights (default 1), start (default today), days (number of
+    possible check-in dates, default 30), and optional room_type and guests.
+    """
+    if request.method != 'GET':
+        return JsonResponse({'error': 'Method not allowed'}, status=405)
+    
+    try:
+        nights = int(request.GET.get('nights', 1))
+        days = int(request.GET.get('days', 30))
+        guests = int(request.GET.get('guests') or 1)
+        start = request.GET.get('start')
+        start_date = datetime.strptime(start, '%Y-%m-%d').date() if start else date.today()
+    except ValueError:
+        return JsonResponse({'error': 'Invalid parameters'}, status=400)
+    
+    room_type = request.GET.get('room_type', '')
+    if nights < 1 or days < 1 or guests < 1:
+        return JsonResponse({'error': 'nights, days and guests must be at least 1'}, status=400)
+    if days > availability_calendar.get_horizon_days():
+        return JsonResponse({'error': 'Search window is beyond the availability horizon'}, status=400)
+    
+    windows = []
+    for check_in_date, rooms in availability_calendar.flexible_search(nights, start_date, days, room_type, guests):
+        windows.append({
+            'check_in': check_in_date.isoformat(),
+            'check_out': (check_in_date + timedelta(days=nights)).isoformat(),
+            'total_available': len(rooms),
+            'rooms': [{
+                'id': room.id,
+                'room_number': room.room_number,
+                'room_type': room.room_type,
+                'price_per_night': float(room.rate)
+            } for room in rooms]
+        })
+    
+    inventory = availability_calendar.inventory(start_date, days, room_type, guests)
+    
+    return JsonResponse({
+        'nights': nights,
+        'start': start_date.isoformat(),
+        'days': days,
+        'windows': windows,
+        'inventory': [{
+            'date': (start_date + timedelta(days=i)).isoformat(),
+            'available': count
+        } for i, count in enumerate(inventory)]
+    })
+
+@cached_report('occupancy_report')
 def occupancy_report(request):
     """View for generating detailed occupancy reports"""
     # Get date range parameters
@@ -2650,6 +2755,11 @@ def occupancy_report(request):
     else:
         end_date = datetime.strptime(end_date_str, '%Y-%m-%d').date()
     
+    # Long windows are computed by the report worker instead of this request
+    job_response = run_in_background(request, 'occupancy_report', (end_date - start_date).days + 1)
+    if job_response:
+        return job_response
+    
     # Get all rooms, filtered by type if specified
     rooms = Room.objects.all()
     if room_type:
@@ -2659,32 +2769,18 @@ def occupancy_report(request):
     date_range = (end_date - start_date).days + 1
     dates = [start_date + timedelta(days=i) for i in range(date_range)]
     
+    # Build the rooms x days occupancy matrix in one query
+    occupancy = OccupancyMatrix(start_date, end_date, rooms=rooms)
+    set_progress(request, 60)
+    
     # Initialize data structures
     daily_occupancy = []
-    room_occupancy = {}
-    total_rooms = rooms.count()
+    total_rooms = occupancy.room_count
     total_room_nights = total_rooms * date_range
     occupied_room_nights = 0
     
     # Calculate occupancy for each day
-    for current_date in dates:
-        occupied_rooms = 0
-        for room in rooms:
-            # Check if room is occupied on this date
-            is_occupied = Reservation.objects.filter(
-                room=room,
-                check_in__lte=current_date,
-                check_out__gt=current_date,
-                status__in=['confirmed', 'in_house', 'expected_arrival', 'expected_departure', 'checked_out', 'no_show']
-            ).exists()
-            
-            if is_occupied:
-                occupied_rooms += 1
-                # Track occupancy by room
-                if room.room_number not in room_occupancy:
-                    room_occupancy[room.room_number] = 0
-                room_occupancy[room.room_number] += 1
-        
+    for current_date, occupied_rooms in zip(dates, occupancy.daily_counts()):
         # Calculate daily occupancy percentage
         daily_percentage = (occupied_rooms / total_rooms * 100) if total_rooms > 0 else 0
         occupied_room_nights += occupied_rooms
@@ -2697,27 +2793,19 @@ def occupancy_report(request):
             'percentage': daily_percentage
         })
     
+    # Track occupancy by room
+    room_occupancy = occupancy.room_nights()
+    
     # Calculate overall occupancy percentage
     overall_occupancy = (occupied_room_nights / total_room_nights * 100) if total_room_nights > 0 else 0
     
     # Calculate occupancy by room type
     room_type_occupancy = {}
+    type_nights = occupancy.room_type_nights()
     for room_type_choice, room_type_name in Room.ROOM_TYPES:
-        type_rooms = rooms.filter(room_type=room_type_choice)
-        type_room_count = type_rooms.count()
+        type_room_count = type_nights.get(room_type_choice, {}).get('rooms', 0)
         if type_room_count > 0:
-            type_occupied_nights = 0
-            for current_date in dates:
-                for room in type_rooms:
-                    is_occupied = Reservation.objects.filter(
-                        room=room,
-                        check_in__lte=current_date,
-                        check_out__gt=current_date,
-                        status__in=['confirmed', 'in_house', 'expected_arrival', 'expected_departure', 'checked_out', 'no_show']
-                    ).exists()
-                    if is_occupied:
-                        type_occupied_nights += 1
-            
+            type_occupied_nights = type_nights[room_type_choice]['occupied_nights']
             type_total_nights = type_room_count * date_range
             type_percentage = (type_occupied_nights / type_total_nights * 100) if type_total_nights > 0 else 0
             room_type_occupancy[room_type_name] = {
@@ -2760,4 +2848,4 @@ def occupancy_report(request):
         'selected_room_type': room_type
     }
     
-    return render(request, 'pms/reports/occupancy_report.html', context)
\ No newline at end of file
+    return report_response(request, 'pms/reports/occupancy_report.html', context, start_date, end_date)
\ No newline at end of file